@@ -0,0 +1,79 @@
+# Compares batch analysis (analyze_fraud_records) with analyzing one record at a time.
+#
+#   python -m benchmarks.bench_analysis_batch --records 50000 --batch-sizes 16 256 5000
+#
+# Both modes analyze the valid records of the same seeded workload. Every run starts from a new
+# service, so the velocity counts start from zero, and from an empty IP address cache. Each mode
+# is timed --repeats times and the best run is reported, which filters out scheduler noise.
+import argparse
+import random
+import time
+from collections.abc import Callable
+
+from benchmarks.workload import WorkloadConfig, generate_fraud_records
+from fraud_detection_system.columnar_validators import BatchDataValidator
+from fraud_detection_system.fraud_analysis import FraudAnalysisService, parse_ip_address
+from fraud_detection_system.models import FraudRecord
+
+
+REPEATS = 5
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark batch fraud analysis against single records.")
+    parser.add_argument("--records", type=int, default=50_000, help="Number of generated records")
+    parser.add_argument("--seed", type=int, default=WorkloadConfig.seed)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 256, 5000], help="Records per batch")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="Timed runs per mode, the best one counts")
+    return parser.parse_args()
+
+
+def analyze_each(service: FraudAnalysisService, fraud_records: list[FraudRecord]) -> None:
+    for fraud_record in fraud_records:
+        service.analyze_fraud_record(fraud_record)
+
+
+def analyze_batches(batch_size: int) -> Callable[[FraudAnalysisService, list[FraudRecord]], None]:
+    def run(service: FraudAnalysisService, fraud_records: list[FraudRecord]) -> None:
+        for start in range(0, len(fraud_records), batch_size):
+            service.analyze_fraud_records(fraud_records[start:start + batch_size])
+
+    return run
+
+
+def best_records_per_second(
+    run: Callable[[FraudAnalysisService, list[FraudRecord]], None],
+    fraud_records: list[FraudRecord],
+    seed: int,
+    repeats: int,
+) -> float:
+    best = 0.0
+    for _ in range(repeats):
+        service = FraudAnalysisService()
+        parse_ip_address.cache_clear()
+        random.seed(seed)
+        started_at = time.perf_counter()
+        run(service, fraud_records)
+        best = max(best, len(fraud_records) / (time.perf_counter() - started_at))
+    return best
+
+
+def main() -> None:
+    args = parse_args()
+    fraud_records = list(generate_fraud_records(WorkloadConfig(records=args.records, seed=args.seed)))
+    validation_result = BatchDataValidator().validate(fraud_records)
+    valid_records = [
+        fraud_record for row, fraud_record in enumerate(fraud_records) if validation_result.is_valid(row)
+    ]
+
+    baseline = best_records_per_second(analyze_each, valid_records, args.seed, args.repeats)
+    print(f"{len(valid_records)} valid records, seed {args.seed}, best of {args.repeats} runs")
+    print(f"{'mode':<16}{'records/s':>14}{'speedup':>10}")
+    print(f"{'per record':<16}{baseline:>14,.0f}{1:>10.2f}")
+    for batch_size in args.batch_sizes:
+        rate = best_records_per_second(analyze_batches(batch_size), valid_records, args.seed, args.repeats)
+        print(f"{f'batches of {batch_size}':<16}{rate:>14,.0f}{rate / baseline:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
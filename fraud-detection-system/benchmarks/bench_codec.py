@@ -0,0 +1,67 @@
+# Compares the binary codec with pickle on encoding and decoding accounts.
+#
+#   python -m benchmarks.bench_codec --records 1000000
+import argparse
+import itertools
+import pickle
+import time
+from collections.abc import Callable
+
+from benchmarks.bench_memory import build_account
+from fraud_detection_system import codec
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the account codec against pickle.")
+    parser.add_argument("--records", type=int, default=1_000_000, help="Number of encoded and decoded records")
+    parser.add_argument("--distinct", type=int, default=10_000, help="Number of distinct accounts cycled through")
+    return parser.parse_args()
+
+
+def run_benchmark(
+    records: int, accounts: list, encode: Callable[[object], bytes], decode: Callable[[bytes], object]
+) -> dict[str, float]:
+    started_at = time.perf_counter()
+    for account in itertools.islice(itertools.cycle(accounts), records):
+        encode(account)
+    encode_seconds = time.perf_counter() - started_at
+
+    # Decoded records are dropped right away, like a store read that hands them to a caller
+    encoded = [encode(account) for account in accounts]
+    started_at = time.perf_counter()
+    for data in itertools.islice(itertools.cycle(encoded), records):
+        decode(data)
+    decode_seconds = time.perf_counter() - started_at
+
+    return {
+        "encodes/s": records / encode_seconds,
+        "decodes/s": records / decode_seconds,
+        "bytes": sum(map(len, encoded)) / len(encoded),
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    accounts = [build_account(index) for index in range(args.distinct)]
+    results = {
+        "pickle": run_benchmark(
+            args.records,
+            accounts,
+            lambda account: pickle.dumps(account, protocol=pickle.HIGHEST_PROTOCOL),
+            pickle.loads,
+        ),
+        "codec": run_benchmark(args.records, accounts, codec.encode, codec.decode),
+    }
+
+    print(f"{args.records} records")
+    print(f"{'format':<8}{'encodes/s':>14}{'decodes/s':>14}{'bytes':>8}")
+    for name, result in results.items():
+        print(f"{name:<8}{result['encodes/s']:>14,.0f}{result['decodes/s']:>14,.0f}{result['bytes']:>8,.0f}")
+    print(
+        f"codec speedup: encode {results['codec']['encodes/s'] / results['pickle']['encodes/s']:.1f}x, "
+        f"decode {results['codec']['decodes/s'] / results['pickle']['decodes/s']:.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
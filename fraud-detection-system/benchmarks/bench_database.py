@@ -0,0 +1,75 @@
+# Compares the in-memory DatabaseConnection with SQLiteDatabaseConnection.
+#
+#   python -m benchmarks.bench_database --accounts 1000000
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from fraud_detection_system.database import AbstractDatabaseConnection, DatabaseConnection
+from fraud_detection_system.models import Account
+from fraud_detection_system.sqlite_database import SQLiteDatabaseConnection
+from tests.fraud_detection_system.builder import FraudRecordBuilder
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the account stores.")
+    parser.add_argument("--accounts", type=int, default=1_000_000, help="Number of stored accounts")
+    parser.add_argument("--reads", type=int, default=100_000, help="Number of random reads")
+    return parser.parse_args()
+
+
+def run_benchmark(
+    name: str, database: AbstractDatabaseConnection, accounts: list[Account], reads: int
+) -> dict[str, float]:
+    started_at = time.perf_counter()
+    for account in accounts:
+        database.store_fraud_record(account.account_id, account)
+    if hasattr(database, "sync"):
+        database.sync()
+    write_seconds = time.perf_counter() - started_at
+
+    read_ids = [account.account_id for account in random.sample(accounts, min(reads, len(accounts)))]
+    started_at = time.perf_counter()
+    for account_id in read_ids:
+        database.get_fraud_record(account_id)
+    read_seconds = time.perf_counter() - started_at
+
+    started_at = time.perf_counter()
+    database.get_many(read_ids)
+    bulk_read_seconds = time.perf_counter() - started_at
+
+    return {
+        "store": name,
+        "writes/s": len(accounts) / write_seconds,
+        "reads/s": len(read_ids) / read_seconds,
+        "bulk reads/s": len(read_ids) / bulk_read_seconds,
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    # Accounts share one fraud record, so the benchmark measures the stores rather than the heap
+    fraud_record = FraudRecordBuilder().build()
+    accounts = [Account(fraud_record=fraud_record) for _ in range(args.accounts)]
+
+    results = [run_benchmark("dict", DatabaseConnection(), accounts, args.reads)]
+    with tempfile.TemporaryDirectory() as directory:
+        sqlite_database = SQLiteDatabaseConnection(os.path.join(directory, "accounts.db"))
+        try:
+            results.append(run_benchmark("sqlite", sqlite_database, accounts, args.reads))
+        finally:
+            sqlite_database.close()
+
+    print(f"{args.accounts} accounts, {args.reads} reads")
+    print(f"{'store':<8}{'writes/s':>14}{'reads/s':>14}{'bulk reads/s':>16}")
+    for result in results:
+        print(
+            f"{result['store']:<8}{result['writes/s']:>14,.0f}"
+            f"{result['reads/s']:>14,.0f}{result['bulk reads/s']:>16,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
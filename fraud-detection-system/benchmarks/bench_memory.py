@@ -0,0 +1,137 @@
+# Measures the bytes per stored Account, for the slotted models and for the plain dataclass
+# layout they replaced.
+#
+#   python -m benchmarks.bench_memory --accounts 100000
+import argparse
+import gc
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from uuid import uuid4
+
+from fraud_detection_system.models import (
+    Account,
+    AccountStatusEnum,
+    BankAccount,
+    DeviceInfo,
+    FraudRecord,
+    PaymentMethodEnum,
+    PersonalInfo,
+)
+
+
+# The models before they were slotted, an instance __dict__ each and the account id as a string
+@dataclass
+class LegacyPersonalInfo:
+    name: str
+    age: int
+    ssn: str
+    email: str | None = None
+    phone_number: str | None = None
+
+
+@dataclass
+class LegacyDeviceInfo:
+    ip_address: str
+
+
+@dataclass
+class LegacyBankAccount:
+    routing_number: int
+    account_number: int
+
+
+@dataclass
+class LegacyFraudRecord:
+    amount: float
+    personal_info: LegacyPersonalInfo
+    device_info: LegacyDeviceInfo
+    payment_method: PaymentMethodEnum
+    bank_account: LegacyBankAccount | None = None
+    credit_card: None = None
+
+
+@dataclass
+class LegacyAccount:
+    fraud_record: LegacyFraudRecord
+    status: AccountStatusEnum = AccountStatusEnum.PENDING
+    fraud_score: float = 0.00
+    data_validation_errors: list[str] = field(default_factory=list)
+    account_id: str = field(default_factory=lambda: str(uuid4()))
+
+
+def build_account(index: int) -> Account:
+    return Account(
+        fraud_record=FraudRecord(
+            amount=100.0 + index,
+            personal_info=PersonalInfo(
+                name=f"Customer {index}",
+                age=30,
+                ssn=f"{index % 1000:03d}-{index % 100:02d}-{index % 10000:04d}",
+                email=f"customer{index}@example.com",
+                phone_number=f"+1555{index % 10_000_000:07d}",
+            ),
+            device_info=DeviceInfo(ip_address=f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"),
+            payment_method=PaymentMethodEnum.ACH,
+            bank_account=BankAccount(routing_number=111000025, account_number=100_000_000 + index),
+        )
+    )
+
+
+def build_legacy_account(index: int) -> LegacyAccount:
+    account = build_account(index)
+    fraud_record = account.fraud_record
+    personal_info = fraud_record.personal_info
+    return LegacyAccount(
+        fraud_record=LegacyFraudRecord(
+            amount=fraud_record.amount,
+            personal_info=LegacyPersonalInfo(
+                name=personal_info.name,
+                age=personal_info.age,
+                ssn=personal_info.ssn,
+                email=personal_info.email,
+                phone_number=personal_info.phone_number,
+            ),
+            device_info=LegacyDeviceInfo(ip_address=fraud_record.device_info.ip_address),
+            payment_method=fraud_record.payment_method,
+            bank_account=LegacyBankAccount(
+                routing_number=fraud_record.bank_account.routing_number,
+                account_number=fraud_record.bank_account.account_number,
+            ),
+        )
+    )
+
+
+def bytes_per_account(build: Callable[[int], object], count: int) -> float:
+    # Accounts are kept in a dict keyed by account id, like DatabaseConnection does
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    store = {}
+    for index in range(count):
+        account = build(index)
+        store[account.account_id] = account
+    allocated = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return allocated / count
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Measure the memory used per stored account.")
+    parser.add_argument("--accounts", type=int, default=100_000, help="Number of stored accounts")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    legacy = bytes_per_account(build_legacy_account, args.accounts)
+    slotted = bytes_per_account(build_account, args.accounts)
+    print(f"{args.accounts} accounts")
+    print(f"{'layout':<10}{'bytes/account':>16}")
+    print(f"{'before':<10}{legacy:>16,.0f}")
+    print(f"{'after':<10}{slotted:>16,.0f}")
+    print(f"saved {1 - slotted / legacy:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# Compares in-process batch analysis with the process pool at increasing process counts.
+#
+#   python -m benchmarks.bench_process_pool --records 200000 --networks 100000
+#
+# Every analysis scores from local reference data, which the benchmark builds in a temporary
+# directory, so the run measures lookups rather than random.uniform. Worker start-up is
+# excluded by a warm-up call per pool.
+import argparse
+import ipaddress
+import os
+import random
+import tempfile
+import time
+
+from benchmarks.bench_memory import build_account
+from fraud_detection_system.domain_index import DomainSet
+from fraud_detection_system.fraud_analysis import (
+    DarkWebEmailDomainFraudAnalysis,
+    FraudAnalysisService,
+    FreeEmailDomainFraudAnalysis,
+    GeoIPAddressFraudAnalysis,
+    IPAddressRecordFraudAnalysis,
+    SpamRecordPhoneNumberFraudAnalysis,
+)
+from fraud_detection_system.ip_index import IPPrefixIndex
+from fraud_detection_system.models import FraudRecord
+from fraud_detection_system.phone_index import PhoneNumberIndex
+from fraud_detection_system.process_pool import (
+    CHUNK_SIZE,
+    ProcessPoolFraudAnalysisService,
+    ReferenceData,
+    load_reference_data,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark process pool fraud analysis.")
+    parser.add_argument("--records", type=int, default=200_000, help="Number of analyzed records")
+    parser.add_argument("--networks", type=int, default=100_000, help="Number of indexed IP networks")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Records per shared memory chunk")
+    parser.add_argument(
+        "--processes", type=int, nargs="+", help="Process counts to run, defaults to 1, 2, 4, ... up to the core count"
+    )
+    return parser.parse_args()
+
+
+def build_reference_data(directory: str, networks: int) -> ReferenceData:
+    rng = random.Random(0)
+
+    def write(name: str, data: bytes) -> str:
+        path = os.path.join(directory, name)
+        with open(path, "wb") as index_file:
+            index_file.write(data)
+        return path
+
+    ip_networks = [
+        (str(ipaddress.IPv4Network((rng.getrandbits(24) << 8, 24))), rng.random()) for _ in range(networks)
+    ]
+    domains = [f"domain{index}.example" for index in range(networks)]
+    phone_numbers = [f"+1555{index:07d}" for index in range(0, 10_000_000, 7)]
+    return {
+        IPAddressRecordFraudAnalysis: write("ip_reputation.idx", IPPrefixIndex.build(ip_networks)),
+        GeoIPAddressFraudAnalysis: write("geo_ip.idx", IPPrefixIndex.build(ip_networks[::2])),
+        FreeEmailDomainFraudAnalysis: write("free_domains.set", DomainSet.build(domains)),
+        DarkWebEmailDomainFraudAnalysis: write("dark_web_domains.set", DomainSet.build(domains[::3])),
+        SpamRecordPhoneNumberFraudAnalysis: write("spam_numbers.idx", PhoneNumberIndex.build(phone_numbers)),
+    }
+
+
+def records_per_second(service: FraudAnalysisService, fraud_records: list[FraudRecord]) -> float:
+    started_at = time.perf_counter()
+    service.analyze_fraud_records(fraud_records)
+    return len(fraud_records) / (time.perf_counter() - started_at)
+
+
+def main() -> None:
+    args = parse_args()
+    cores = os.cpu_count() or 1
+    process_counts = args.processes or [count for count in (1, 2, 4, 8, 16, 32, 64) if count <= cores]
+    fraud_records = [build_account(index).fraud_record for index in range(args.records)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        reference_data = build_reference_data(directory, args.networks)
+        results = []
+        for processes in process_counts:
+            with ProcessPoolFraudAnalysisService(
+                processes=processes, chunk_size=args.chunk_size, reference_data=reference_data
+            ) as service:
+                service.analyze_fraud_records(fraud_records[:args.chunk_size * processes])
+                results.append((f"{processes} processes", records_per_second(service, fraud_records)))
+
+        load_reference_data(reference_data)
+        baseline = records_per_second(FraudAnalysisService(), fraud_records)
+
+    print(f"{args.records} records, {args.networks} networks, {cores} cores")
+    print(f"{'mode':<14}{'records/s':>14}{'speedup':>10}")
+    print(f"{'in-process':<14}{baseline:>14,.0f}{1:>10.2f}")
+    for mode, rate in results:
+        print(f"{mode:<14}{rate:>14,.0f}{rate / baseline:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
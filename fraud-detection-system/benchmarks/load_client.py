@@ -0,0 +1,132 @@
+# Load client for the fraud review server, reports throughput and review latency.
+#
+#   python -m fraud_detection_system.server &
+#   python -m benchmarks.load_client --requests 100000 --connections 16 --pipeline 8
+#
+# With --serve the client starts a server in-process on a free port instead, which makes the
+# run self-contained but shares the event loop between client and server.
+import argparse
+import asyncio
+import json
+import time
+
+from fraud_detection_system.fraud_analysis import FraudAnalysisService
+from fraud_detection_system.fraud_detection_service import FraudDetectionService
+from fraud_detection_system.instrumentation import LatencyHistogram
+from fraud_detection_system.server import HOST, MAX_BATCH_SIZE, MAX_WAIT, PORT, FraudReviewServer
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load test the fraud review server.")
+    parser.add_argument("--host", type=str, default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--requests", type=int, default=100_000, help="Total number of review requests")
+    parser.add_argument("--connections", type=int, default=16, help="Number of client connections")
+    parser.add_argument("--pipeline", type=int, default=8, help="Requests in flight per connection")
+    parser.add_argument("--serve", action="store_true", help="Start a server in-process")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT * 1000)
+    return parser.parse_args()
+
+
+def review_request(index: int) -> bytes:
+    # Distinct IP addresses and SSNs, so velocity checks do not dominate the scores
+    record = {
+        "amount": 100.0,
+        "personal_info": {
+            "name": "John Doe",
+            "age": 30,
+            "ssn": f"{index % 900 + 100:03d}-45-{index % 10_000:04d}",
+            "email": "jdoe@example.com",
+            "phone_number": "+12345678900",
+        },
+        "device_info": {"ip_address": f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"},
+        "payment_method": "ACH",
+        "bank_account": {"routing_number": 111000025, "account_number": 123456789},
+    }
+    return json.dumps({"id": index, "action": "review", "record": record}).encode() + b"\n"
+
+
+async def run_connection(
+    host: str, port: int, request_ids: range, pipeline: int, latency: LatencyHistogram
+) -> int:
+    # Keeps up to pipeline requests in flight, returns the number of failed requests
+    reader, writer = await asyncio.open_connection(host, port)
+    sent_at = {}
+    failures = 0
+    pending = iter(request_ids)
+
+    def send(count: int) -> None:
+        for request_id in pending:
+            sent_at[request_id] = time.perf_counter()
+            writer.write(review_request(request_id))
+            count -= 1
+            if count == 0:
+                break
+
+    try:
+        send(pipeline)
+        while sent_at:
+            response = json.loads(await reader.readline())
+            latency.record(time.perf_counter() - sent_at.pop(response["id"]))
+            if not response["ok"]:
+                failures += 1
+            send(1)
+            await writer.drain()
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return failures
+
+
+async def run_load(args: argparse.Namespace) -> None:
+    server = None
+    port = args.port
+    if args.serve:
+        server = FraudReviewServer(
+            FraudDetectionService(fraud_analysis_service=FraudAnalysisService()),
+            max_batch_size=args.max_batch_size,
+            max_wait=args.max_wait_ms / 1000,
+        )
+        await server.start(args.host, 0)
+        port = server.port
+
+    latency = LatencyHistogram()
+    per_connection = -(-args.requests // args.connections)
+    started_at = time.perf_counter()
+    try:
+        failures = await asyncio.gather(
+            *(
+                run_connection(
+                    args.host,
+                    port,
+                    range(start, min(start + per_connection, args.requests)),
+                    args.pipeline,
+                    latency,
+                )
+                for start in range(0, args.requests, per_connection)
+            )
+        )
+        elapsed = time.perf_counter() - started_at
+    finally:
+        if server is not None:
+            batch_stats = server.batcher.stats
+            await server.close()
+
+    stats = latency.snapshot()
+    print(f"{args.requests} requests over {args.connections} connections, pipeline {args.pipeline}")
+    print(f"Throughput: {args.requests / elapsed:,.0f} requests/s, {sum(failures)} failed")
+    print(
+        "Latency: "
+        + ", ".join(f"{name} {stats[name] * 1000:.2f}ms" for name in ("p50", "p95", "p99", "max"))
+    )
+    if server is not None:
+        print(f"Batches: {batch_stats['batches']}, mean size {batch_stats['mean_batch_size']:.1f}")
+
+
+def main() -> None:
+    asyncio.run(run_load(parse_args()))
+
+
+if __name__ == "__main__":
+    main()
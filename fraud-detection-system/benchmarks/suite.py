@@ -0,0 +1,339 @@
+# Benchmarks validation, analysis, review and the account stores on a synthetic workload.
+#
+#   python -m benchmarks.suite --records 100000 --save-baseline baseline.json
+#   python -m benchmarks.suite --records 100000 --baseline baseline.json
+#
+# Every case runs over the same seeded records from benchmarks.workload and reports its
+# throughput and latency percentiles, per record for the single-record cases and per batch for
+# the batch cases. The analysis cases only get the records that pass validation, as in a
+# review. Every case is timed --repeats times and the fastest pass is reported, with its
+# latencies, so scheduler noise does not read as a regression. Peak memory is measured in a second pass under tracemalloc, which slows the
+# code down too much to share the timed pass. Every pass starts from an empty store, so the
+# results do not depend on which other cases run or in what order. Against a baseline, a case
+# regresses when its best throughput drops or its peak memory grows by more than the tolerance, and
+# the exit status is 1. Baselines only compare on the machine and workload they were saved with.
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator, Sequence
+from dataclasses import asdict, dataclass
+
+from benchmarks.workload import WorkloadConfig, generate_fraud_records
+from fraud_detection_system.columnar_validators import BatchDataValidator
+from fraud_detection_system.database import DatabaseConnection
+from fraud_detection_system.fraud_analysis import FraudAnalysisService
+from fraud_detection_system.fraud_detection_service import FraudDetectionService
+from fraud_detection_system.instrumentation import LatencyHistogram
+from fraud_detection_system.models import Account, FraudRecord, PaymentMethodEnum
+from fraud_detection_system.sqlite_database import SQLiteDatabaseConnection
+from fraud_detection_system.validators import DataValidator, DataValidatorBuilder
+
+
+BATCH_SIZE = 256
+REPEATS = 5
+TOLERANCE = 0.1
+
+# Runs a case over the records and records one latency per unit of work in the histogram
+CaseRunner = Callable[[Sequence[FraudRecord], LatencyHistogram], None]
+
+
+@dataclass(frozen=True)
+class CaseResult:
+    case: str
+    records: int
+    records_per_second: float
+    p50: float
+    p95: float
+    p99: float
+    max: float
+    peak_memory: int | None = None
+    repeats: int = 1
+
+
+def empty_database() -> DatabaseConnection:
+    # The in-memory store is a process-wide singleton, emptied so every run starts from scratch
+    database = DatabaseConnection()
+    database.clear()
+    return database
+
+
+def batches(fraud_records: Sequence[FraudRecord], batch_size: int) -> Iterator[Sequence[FraudRecord]]:
+    for start in range(0, len(fraud_records), batch_size):
+        yield fraud_records[start:start + batch_size]
+
+
+def data_validators(payment_method: PaymentMethodEnum) -> list[DataValidator]:
+    # The validators a review runs for the payment method
+    validator_builder = DataValidatorBuilder()
+    validator_builder.with_personal_info_validator()
+    if payment_method is PaymentMethodEnum.CREDIT_CARD:
+        validator_builder.with_credit_card_data_validator()
+    else:
+        validator_builder.with_ach_data_validator()
+    return validator_builder.build_data_validators()
+
+
+def validate(fraud_records: Sequence[FraudRecord], latency: LatencyHistogram) -> None:
+    validators = {payment_method: data_validators(payment_method) for payment_method in PaymentMethodEnum}
+    for fraud_record in fraud_records:
+        started_at = time.perf_counter()
+        for validator in validators[fraud_record.payment_method]:
+            validator.validate(fraud_record)
+        latency.record(time.perf_counter() - started_at)
+
+
+def validate_batch(batch_size: int) -> CaseRunner:
+    def run(fraud_records: Sequence[FraudRecord], latency: LatencyHistogram) -> None:
+        validator = BatchDataValidator()
+        for batch in batches(fraud_records, batch_size):
+            started_at = time.perf_counter()
+            validator.validate(batch)
+            latency.record(time.perf_counter() - started_at)
+
+    return run
+
+
+def analyze(fraud_records: Sequence[FraudRecord], latency: LatencyHistogram) -> None:
+    service = FraudAnalysisService()
+    for fraud_record in fraud_records:
+        started_at = time.perf_counter()
+        service.analyze_fraud_record(fraud_record)
+        latency.record(time.perf_counter() - started_at)
+
+
+def analyze_batch(batch_size: int) -> CaseRunner:
+    def run(fraud_records: Sequence[FraudRecord], latency: LatencyHistogram) -> None:
+        service = FraudAnalysisService()
+        for batch in batches(fraud_records, batch_size):
+            started_at = time.perf_counter()
+            service.analyze_fraud_records(batch)
+            latency.record(time.perf_counter() - started_at)
+
+    return run
+
+
+def review(fraud_records: Sequence[FraudRecord], latency: LatencyHistogram) -> None:
+    service = FraudDetectionService(FraudAnalysisService(), empty_database())
+    for fraud_record in fraud_records:
+        account = Account(fraud_record=fraud_record)
+        started_at = time.perf_counter()
+        service.review_fraud_record(account)
+        latency.record(time.perf_counter() - started_at)
+
+
+def review_batch(batch_size: int) -> CaseRunner:
+    def run(fraud_records: Sequence[FraudRecord], latency: LatencyHistogram) -> None:
+        service = FraudDetectionService(FraudAnalysisService(), empty_database())
+        for batch in batches(fraud_records, batch_size):
+            accounts = [Account(fraud_record=fraud_record) for fraud_record in batch]
+            started_at = time.perf_counter()
+            service.review_fraud_records(accounts)
+            latency.record(time.perf_counter() - started_at)
+
+    return run
+
+
+def store(fraud_records: Sequence[FraudRecord], latency: LatencyHistogram) -> None:
+    # One write and one read per account
+    database = empty_database()
+    for fraud_record in fraud_records:
+        account = Account(fraud_record=fraud_record)
+        started_at = time.perf_counter()
+        database.store_fraud_record(account.account_id, account)
+        database.get_fraud_record(account.account_id)
+        latency.record(time.perf_counter() - started_at)
+
+
+def store_sqlite(batch_size: int) -> CaseRunner:
+    # One bulk write and one bulk read per batch, synced to disk at the end
+    def run(fraud_records: Sequence[FraudRecord], latency: LatencyHistogram) -> None:
+        with tempfile.TemporaryDirectory() as directory:
+            database = SQLiteDatabaseConnection(os.path.join(directory, "accounts.db"))
+            try:
+                for batch in batches(fraud_records, batch_size):
+                    accounts = {account.account_id: account for account in map(Account, batch)}
+                    started_at = time.perf_counter()
+                    database.put_many(accounts)
+                    database.get_many(accounts)
+                    latency.record(time.perf_counter() - started_at)
+                started_at = time.perf_counter()
+                database.sync()
+                latency.record(time.perf_counter() - started_at)
+            finally:
+                database.close()
+
+    return run
+
+
+# Cases that only run on valid records, the analyzers expect well-formed fields
+VALID_RECORD_CASES = frozenset({"analyze", "analyze_batch"})
+
+
+def build_cases(batch_size: int) -> dict[str, CaseRunner]:
+    return {
+        "validate": validate,
+        "validate_batch": validate_batch(batch_size),
+        "analyze": analyze,
+        "analyze_batch": analyze_batch(batch_size),
+        "review": review,
+        "review_batch": review_batch(batch_size),
+        "store": store,
+        "store_sqlite": store_sqlite(batch_size),
+    }
+
+
+def run_case(
+    name: str,
+    run: CaseRunner,
+    fraud_records: Sequence[FraudRecord],
+    seed: int,
+    measure_memory: bool,
+    repeats: int = REPEATS,
+) -> CaseResult:
+    # The fastest of the timed passes counts, together with its latencies
+    elapsed = None
+    snapshot = None
+    for _ in range(repeats):
+        # The analyzers score with the random module, seeding it keeps runs comparable
+        random.seed(seed)
+        gc.collect()
+        latency = LatencyHistogram()
+        started_at = time.perf_counter()
+        run(fraud_records, latency)
+        pass_elapsed = time.perf_counter() - started_at
+        if elapsed is None or pass_elapsed < elapsed:
+            elapsed = pass_elapsed
+            snapshot = latency.snapshot()
+
+    peak_memory = None
+    if measure_memory:
+        random.seed(seed)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run(fraud_records, LatencyHistogram())
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return CaseResult(
+        case=name,
+        records=len(fraud_records),
+        records_per_second=len(fraud_records) / elapsed,
+        p50=snapshot["p50"],
+        p95=snapshot["p95"],
+        p99=snapshot["p99"],
+        max=snapshot["max"],
+        peak_memory=peak_memory,
+        repeats=repeats,
+    )
+
+
+def find_regressions(results: list[CaseResult], baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    baseline_results = baseline["results"]
+    for result in results:
+        expected = baseline_results.get(result.case)
+        if expected is None:
+            continue
+        if result.records_per_second < expected["records_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{result.case}: {result.records_per_second:,.0f} records/s, "
+                f"baseline {expected['records_per_second']:,.0f}"
+            )
+        if (
+            result.peak_memory is not None
+            and expected.get("peak_memory") is not None
+            and result.peak_memory > expected["peak_memory"] * (1 + tolerance)
+        ):
+            regressions.append(
+                f"{result.case}: {result.peak_memory:,} bytes peak, baseline {expected['peak_memory']:,}"
+            )
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the benchmark suite on a synthetic workload.")
+    parser.add_argument("--records", type=int, default=50_000, help="Number of generated records")
+    parser.add_argument("--seed", type=int, default=WorkloadConfig.seed)
+    parser.add_argument("--invalid-share", type=float, default=WorkloadConfig.invalid_share)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Records per batch of the batch cases")
+    parser.add_argument("--cases", nargs="+", help="Cases to run, defaults to all of them")
+    parser.add_argument("--repeats", type=int, default=REPEATS, help="Timed passes per case, the fastest counts")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory pass")
+    parser.add_argument("--save-baseline", type=str, help="Write the results to this JSON file")
+    parser.add_argument("--baseline", type=str, help="Compare the results with this JSON file")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="Allowed relative regression")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    cases = build_cases(args.batch_size)
+    unknown = set(args.cases or ()) - set(cases)
+    if unknown:
+        sys.exit(f"Unknown cases: {', '.join(sorted(unknown))}, choose from {', '.join(cases)}")
+
+    config = WorkloadConfig(records=args.records, seed=args.seed, invalid_share=args.invalid_share)
+    fraud_records = list(generate_fraud_records(config))
+    validation_result = BatchDataValidator().validate(fraud_records)
+    valid_records = [
+        fraud_record for row, fraud_record in enumerate(fraud_records) if validation_result.is_valid(row)
+    ]
+    results = [
+        run_case(
+            name,
+            cases[name],
+            valid_records if name in VALID_RECORD_CASES else fraud_records,
+            args.seed,
+            not args.no_memory,
+            args.repeats,
+        )
+        for name in args.cases or cases
+    ]
+
+    print(
+        f"{args.records} records, seed {args.seed}, batches of {args.batch_size}, "
+        f"best of {args.repeats} passes, latencies in ms"
+    )
+    print(f"{'case':<16}{'records':>9}{'records/s':>12}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'peak MiB':>10}")
+    for result in results:
+        peak = "-" if result.peak_memory is None else f"{result.peak_memory / 2**20:.1f}"
+        print(
+            f"{result.case:<16}{result.records:>9}{result.records_per_second:>12,.0f}{result.p50 * 1e3:>10.3f}"
+            f"{result.p95 * 1e3:>10.3f}{result.p99 * 1e3:>10.3f}{result.max * 1e3:>10.3f}{peak:>10}"
+        )
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as baseline_file:
+            json.dump(
+                {
+                    "workload": asdict(config),
+                    "batch_size": args.batch_size,
+                    "results": {result.case: asdict(result) for result in results},
+                },
+                baseline_file,
+                indent=2,
+            )
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline["workload"] != asdict(config) or baseline["batch_size"] != args.batch_size:
+            print("warning: the baseline was saved with a different workload", file=sys.stderr)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+# Seeded synthetic FraudRecord workloads for benchmarks.
+#
+#   python -m benchmarks.workload records.jsonl --records 1000000 --seed 7
+#
+# The same config always yields the same records. IP addresses and email domains are drawn
+# from Zipf-distributed pools, so a few of them repeat a lot, like shared NATs and large email
+# providers do. A share of the SSNs is reused, credit cards and ACH accounts are mixed, and a
+# configurable share of the records carries one invalid field. Records are generated lazily,
+# so millions of them can be streamed without holding them in memory.
+import argparse
+import itertools
+import json
+import random
+from bisect import bisect
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+from fraud_detection_system.batch import fraud_record_to_dict
+from fraud_detection_system.models import (
+    BankAccount,
+    CreditCard,
+    DeviceInfo,
+    FraudRecord,
+    PaymentMethodEnum,
+    PersonalInfo,
+)
+
+
+FIRST_NAMES = ("James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth")
+LAST_NAMES = ("Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez")
+# The most common domains lead the pool, so the Zipf draw favors them
+POPULAR_DOMAINS = ("gmail.com", "yahoo.com", "outlook.com", "hotmail.com", "icloud.com", "aol.com")
+
+
+@dataclass(frozen=True)
+class WorkloadConfig:
+    records: int = 100_000
+    seed: int = 0
+    credit_card_share: float = 0.6
+    invalid_share: float = 0.05
+    # Pool sizes of the repeating values, None scales them with the number of records
+    distinct_ips: int | None = None
+    distinct_domains: int = 5_000
+    repeated_ssn_share: float = 0.02
+    # Zipf exponents of the pools, higher means more repetition
+    ip_skew: float = 0.8
+    domain_skew: float = 1.1
+
+    @property
+    def ip_pool_size(self) -> int:
+        return self.distinct_ips or max(1, self.records // 10)
+
+
+class _ZipfPool:
+    def __init__(self, values: list, skew: float) -> None:
+        self._values = values
+        self._cumulative_weights = list(itertools.accumulate(1 / rank**skew for rank in range(1, len(values) + 1)))
+
+    def draw(self, rng: random.Random) -> object:
+        return self._values[bisect(self._cumulative_weights, rng.random() * self._cumulative_weights[-1])]
+
+
+class WorkloadGenerator:
+    def __init__(self, config: WorkloadConfig = WorkloadConfig()) -> None:
+        self._config = config
+
+    @property
+    def config(self) -> WorkloadConfig:
+        return self._config
+
+    def __iter__(self) -> Iterator[FraudRecord]:
+        config = self._config
+        rng = random.Random(config.seed)
+        ip_pool = _ZipfPool(
+            [f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+             for _ in range(config.ip_pool_size)],
+            config.ip_skew,
+        )
+        domain_pool = _ZipfPool(
+            [*POPULAR_DOMAINS, *(f"mail{index}.example" for index in range(config.distinct_domains))],
+            config.domain_skew,
+        )
+        ssn_pool = [self._ssn(rng) for _ in range(max(1, config.records // 1_000))]
+        for index in range(config.records):
+            fraud_record = self._fraud_record(rng, index, ip_pool, domain_pool, ssn_pool)
+            if rng.random() < config.invalid_share:
+                self._invalidate(rng, fraud_record)
+            yield fraud_record
+
+    def _fraud_record(
+        self, rng: random.Random, index: int, ip_pool: _ZipfPool, domain_pool: _ZipfPool, ssn_pool: list[str]
+    ) -> FraudRecord:
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        ssn = rng.choice(ssn_pool) if rng.random() < self._config.repeated_ssn_share else self._ssn(rng)
+        personal_info = PersonalInfo(
+            name=f"{first_name} {last_name}",
+            age=min(90, 18 + int(rng.expovariate(1 / 20))),
+            ssn=ssn,
+            email=f"{first_name.lower()}.{last_name.lower()}{index}@{domain_pool.draw(rng)}",
+            phone_number=f"+1{rng.randint(200, 999)}{rng.randint(0, 9_999_999):07d}",
+        )
+        # Amounts are log-normal, most are small with a long tail of large ones
+        amount = round(rng.lognormvariate(4, 1.2), 2)
+        if rng.random() < self._config.credit_card_share:
+            return FraudRecord(
+                amount=amount,
+                personal_info=personal_info,
+                device_info=DeviceInfo(ip_address=ip_pool.draw(rng)),
+                payment_method=PaymentMethodEnum.CREDIT_CARD,
+                credit_card=CreditCard(
+                    card_number=4_000_000_000_000_000 + rng.randint(0, 999_999_999_999_999),
+                    expiry_date=f"{rng.randint(1, 12):02d}/{rng.randint(26, 32)}",
+                    cvv=rng.randint(100, 999),
+                    zip_code=f"{rng.randint(501, 99950):05d}",
+                ),
+            )
+        return FraudRecord(
+            amount=amount,
+            personal_info=personal_info,
+            device_info=DeviceInfo(ip_address=ip_pool.draw(rng)),
+            payment_method=PaymentMethodEnum.ACH,
+            bank_account=BankAccount(
+                routing_number=rng.randint(10_000_000, 399_999_999),
+                account_number=rng.randint(10_000_000, 999_999_999_999),
+            ),
+        )
+
+    @staticmethod
+    def _ssn(rng: random.Random) -> str:
+        return f"{rng.randint(1, 899):03d}-{rng.randint(1, 99):02d}-{rng.randint(1, 9999):04d}"
+
+    @staticmethod
+    def _invalidate(rng: random.Random, fraud_record: FraudRecord) -> None:
+        # Breaks one field the validators reject
+        personal_info = fraud_record.personal_info
+        field = rng.randrange(6)
+        if field == 0:
+            personal_info.phone_number = personal_info.phone_number[-7:]
+        elif field == 1:
+            personal_info.email = personal_info.email.replace("@", "")
+        elif field == 2:
+            personal_info.age = rng.randint(13, 17)
+        elif field == 3:
+            personal_info.ssn = personal_info.ssn.replace("-", "")
+        elif field == 4:
+            personal_info.name = ""
+        elif fraud_record.credit_card is not None:
+            fraud_record.credit_card.cvv = rng.randint(10, 99)
+        else:
+            fraud_record.bank_account.account_number = 0
+
+
+def generate_fraud_records(config: WorkloadConfig = WorkloadConfig()) -> Iterator[FraudRecord]:
+    return iter(WorkloadGenerator(config))
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Write a synthetic fraud record workload as JSONL.")
+    parser.add_argument("output_path", type=str, help="JSONL file, readable by fraud_detection_system.batch")
+    parser.add_argument("--records", type=int, default=WorkloadConfig.records)
+    parser.add_argument("--seed", type=int, default=WorkloadConfig.seed)
+    parser.add_argument("--credit-card-share", type=float, default=WorkloadConfig.credit_card_share)
+    parser.add_argument("--invalid-share", type=float, default=WorkloadConfig.invalid_share)
+    parser.add_argument("--distinct-ips", type=int, help="Defaults to a tenth of the records")
+    parser.add_argument("--distinct-domains", type=int, default=WorkloadConfig.distinct_domains)
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    config = WorkloadConfig(
+        records=args.records,
+        seed=args.seed,
+        credit_card_share=args.credit_card_share,
+        invalid_share=args.invalid_share,
+        distinct_ips=args.distinct_ips,
+        distinct_domains=args.distinct_domains,
+    )
+    with open(args.output_path, "w") as output_file:
+        for fraud_record in generate_fraud_records(config):
+            output_file.write(json.dumps(fraud_record_to_dict(fraud_record)) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+# Non-interactive bulk review of fraud records.
+#
+#   python -m fraud_detection_system.batch records.jsonl results.jsonl --workers 8
+#
+# Records are streamed from a JSONL or CSV file and reviewed on a worker pool. At most a fixed
+# number of records is in flight, and results are written in input order as soon as they are
+# ready, so memory stays constant however large the input is. Reviewed accounts go to a SQLite
+# database (a temporary one unless --database is given) instead of the in-memory store.
+import argparse
+import csv
+import dataclasses
+import json
+import os
+import tempfile
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO
+
+from fraud_detection_system.events import EventBus, JSONLinesFileSink
+from fraud_detection_system.fraud_analysis import FraudAnalysisService
+from fraud_detection_system.fraud_detection_service import FraudDetectionService
+from fraud_detection_system.instrumentation import LatencyHistogram
+from fraud_detection_system.models import (
+    Account,
+    BankAccount,
+    CreditCard,
+    DeviceInfo,
+    FraudRecord,
+    PaymentMethodEnum,
+    PersonalInfo,
+)
+from fraud_detection_system.risk_model import load_risk_model
+from fraud_detection_system.sqlite_database import SQLiteDatabaseConnection
+
+
+WORKERS = 4
+IN_FLIGHT_PER_WORKER = 16
+# The flat CSV layout, the bank account and credit card columns stay empty when not used
+CSV_COLUMNS = (
+    "amount",
+    "name",
+    "age",
+    "ssn",
+    "email",
+    "phone_number",
+    "ip_address",
+    "payment_method",
+    "routing_number",
+    "account_number",
+    "card_number",
+    "expiry_date",
+    "cvv",
+    "zip_code",
+)
+RESULT_COLUMNS = ("row", "account_id", "status", "fraud_score", "validation_errors", "error")
+
+BatchResult = dict[str, object]
+
+
+class BatchInputError(Exception):
+    pass
+
+
+def fraud_record_from_dict(data: dict) -> FraudRecord:
+    # Parses the nested JSON layout, which mirrors the models. Numbers may also come as strings,
+    # like in the CSV layout, any other mistyped field rejects the record.
+    try:
+        if not isinstance(data, dict):
+            raise TypeError(f"expected a JSON object, got {type(data).__name__}")
+        personal_info = _nested(data, "personal_info")
+        device_info = _nested(data, "device_info")
+        bank_account = _nested(data, "bank_account", optional=True)
+        credit_card = _nested(data, "credit_card", optional=True)
+        return FraudRecord(
+            amount=_field(data, "amount", float),
+            personal_info=PersonalInfo(
+                name=_field(personal_info, "name", str),
+                age=_field(personal_info, "age", int),
+                ssn=_field(personal_info, "ssn", str),
+                email=_field(personal_info, "email", str, optional=True),
+                phone_number=_field(personal_info, "phone_number", str, optional=True),
+            ),
+            device_info=DeviceInfo(ip_address=_field(device_info, "ip_address", str)),
+            payment_method=PaymentMethodEnum(_field(data, "payment_method", str)),
+            bank_account=None if bank_account is None else BankAccount(
+                routing_number=_field(bank_account, "routing_number", int),
+                account_number=_field(bank_account, "account_number", int),
+            ),
+            credit_card=None if credit_card is None else CreditCard(
+                card_number=_field(credit_card, "card_number", int),
+                expiry_date=_field(credit_card, "expiry_date", str),
+                cvv=_field(credit_card, "cvv", int),
+                zip_code=_field(credit_card, "zip_code", str),
+            ),
+        )
+    except (KeyError, TypeError, ValueError) as error:
+        raise BatchInputError(f"Invalid record: {error!r}") from error
+
+
+def _nested(data: dict, name: str, optional: bool = False) -> dict | None:
+    value = data.get(name) if optional else data[name]
+    if value is None and optional:
+        return None
+    if not isinstance(value, dict):
+        raise TypeError(f"{name} must be an object")
+    return value
+
+
+def _field(data: dict, name: str, field_type: type[int | float | str], optional: bool = False):
+    value = data.get(name) if optional else data[name]
+    if value is None and optional:
+        return None
+    if field_type is str:
+        if not isinstance(value, str):
+            raise TypeError(f"{name} must be a string")
+        return value
+    # Booleans are ints to Python and floats would be truncated, neither is a valid number here
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise TypeError(f"{name} must be a number")
+    if field_type is int and isinstance(value, float):
+        raise TypeError(f"{name} must be an integer")
+    try:
+        return field_type(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {value!r}") from None
+
+
+def fraud_record_to_dict(fraud_record: FraudRecord) -> dict:
+    # The nested JSON layout read by fraud_record_from_dict
+    data = dataclasses.asdict(fraud_record)
+    data["payment_method"] = str(fraud_record.payment_method)
+    return data
+
+
+def fraud_record_from_csv_row(row: dict[str, str]) -> FraudRecord:
+    try:
+        payment_method = PaymentMethodEnum(row["payment_method"].upper())
+        bank_account, credit_card = None, None
+        if payment_method is PaymentMethodEnum.ACH:
+            bank_account = BankAccount(
+                routing_number=int(row["routing_number"]),
+                account_number=int(row["account_number"]),
+            )
+        else:
+            credit_card = CreditCard(
+                card_number=int(row["card_number"]),
+                expiry_date=row["expiry_date"],
+                cvv=int(row["cvv"]),
+                zip_code=row["zip_code"],
+            )
+        return FraudRecord(
+            amount=float(row["amount"]),
+            personal_info=PersonalInfo(
+                name=row["name"],
+                age=int(row["age"]),
+                ssn=row["ssn"],
+                email=row["email"],
+                phone_number=row["phone_number"],
+            ),
+            device_info=DeviceInfo(ip_address=row["ip_address"]),
+            payment_method=payment_method,
+            bank_account=bank_account,
+            credit_card=credit_card,
+        )
+    except (KeyError, TypeError, ValueError, AttributeError) as error:
+        raise BatchInputError(f"Invalid record: {error!r}") from error
+
+
+def read_rows(input_file: IO[str], input_format: str) -> Iterator[Callable[[], FraudRecord]]:
+    # Yields one parser per record, parsing runs on the workers and a bad record only fails
+    # its own row
+    if input_format == "csv":
+        for row in csv.DictReader(input_file):
+            yield lambda row=row: fraud_record_from_csv_row(row)
+    else:
+        for line in input_file:
+            if line.strip():
+                yield lambda line=line: _parse_json_line(line)
+
+
+def _parse_json_line(line: str) -> FraudRecord:
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError as error:
+        raise BatchInputError(f"Invalid JSON: {error}") from error
+    return fraud_record_from_dict(data)
+
+
+class BatchReviewer:
+    _fraud_detection_service: FraudDetectionService
+    _latency: LatencyHistogram
+
+    def __init__(self, fraud_detection_service: FraudDetectionService, workers: int = WORKERS) -> None:
+        self._fraud_detection_service = fraud_detection_service
+        self._workers = workers
+        self._latency = LatencyHistogram()
+
+    @property
+    def latency(self) -> LatencyHistogram:
+        return self._latency
+
+    def review_rows(self, rows: Iterable[Callable[[], FraudRecord]]) -> Iterator[BatchResult]:
+        # Results come out in input order, with at most workers * IN_FLIGHT_PER_WORKER pending
+        max_in_flight = self._workers * IN_FLIGHT_PER_WORKER
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            in_flight = deque()
+            for row_number, parse in enumerate(rows, start=1):
+                in_flight.append(executor.submit(self._review_row, row_number, parse))
+                if len(in_flight) >= max_in_flight:
+                    yield in_flight.popleft().result()
+            while in_flight:
+                yield in_flight.popleft().result()
+
+    def _review_row(self, row_number: int, parse: Callable[[], FraudRecord]) -> BatchResult:
+        started_at = time.perf_counter()
+        try:
+            fraud_record = parse()
+        except BatchInputError as error:
+            return {"row": row_number, "error": str(error)}
+
+        try:
+            account = self._fraud_detection_service.review_fraud_record(Account(fraud_record=fraud_record))
+        except Exception as error:
+            # A record the parser let through but the review cannot handle only fails its row
+            return {"row": row_number, "error": f"Review failed: {error!r}"}
+        self._latency.record(time.perf_counter() - started_at)
+        return {
+            "row": row_number,
+            "account_id": account.account_id,
+            "status": str(account.status),
+            "fraud_score": account.fraud_score,
+            "validation_errors": account.data_validation_errors,
+        }
+
+
+def write_results(results: Iterable[BatchResult], output_file: IO[str], output_format: str) -> tuple[int, int]:
+    # Returns the number of reviewed and of rejected records
+    reviewed, rejected = 0, 0
+    if output_format == "csv":
+        writer = csv.DictWriter(output_file, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+    for result in results:
+        if "error" in result:
+            rejected += 1
+        else:
+            reviewed += 1
+        if output_format == "csv":
+            writer.writerow({**result, "validation_errors": "; ".join(result.get("validation_errors", ()))})
+        else:
+            output_file.write(json.dumps(result) + "\n")
+    return reviewed, rejected
+
+
+def file_format(path: str, file_format: str | None) -> str:
+    if file_format is not None:
+        return file_format
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Review fraud records in bulk.")
+    parser.add_argument("input_path", type=str, help="JSONL or CSV file with one fraud record per row")
+    parser.add_argument("output_path", type=str, help="JSONL or CSV file receiving one result per record")
+    parser.add_argument("--input-format", choices=("jsonl", "csv"), help="Defaults to the input file extension")
+    parser.add_argument("--output-format", choices=("jsonl", "csv"), help="Defaults to the output file extension")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Number of review worker threads")
+    parser.add_argument("--database", type=str, help="SQLite database keeping the reviewed accounts")
+    parser.add_argument("--risk-model", type=str, help="JSON weights file of the risk model, defaults to the mean")
+    parser.add_argument("--events", type=str, help="JSONL file receiving an event per account change")
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    event_bus = EventBus()
+    if args.events:
+        event_bus.add_sink(JSONLinesFileSink(args.events))
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        database = SQLiteDatabaseConnection(
+            args.database or os.path.join(temporary_directory, "accounts.db")
+        )
+        reviewer = BatchReviewer(
+            FraudDetectionService(
+                fraud_analysis_service=FraudAnalysisService(),
+                database_connection=database,
+                risk_model=load_risk_model(args.risk_model) if args.risk_model else None,
+                event_bus=event_bus,
+            ),
+            workers=args.workers,
+        )
+        started_at = time.perf_counter()
+        try:
+            with open(args.input_path, newline="") as input_file, open(args.output_path, "w", newline="") as output_file:
+                rows = read_rows(input_file, file_format(args.input_path, args.input_format))
+                reviewed, rejected = write_results(
+                    reviewer.review_rows(rows), output_file, file_format(args.output_path, args.output_format)
+                )
+        finally:
+            database.close()
+            event_bus.close()
+        elapsed = time.perf_counter() - started_at
+
+    latency = reviewer.latency.snapshot()
+    print(f"Reviewed {reviewed} records, rejected {rejected} invalid rows in {elapsed:.2f}s")
+    print(f"Throughput: {(reviewed + rejected) / elapsed:,.0f} records/s")
+    print(
+        "Latency: "
+        + ", ".join(f"{name} {latency[name] * 1000:.2f}ms" for name in ("p50", "p95", "p99", "max"))
+    )
+    if args.events:
+        stats, lag = event_bus.stats, event_bus.lag.snapshot()
+        print(
+            f"Events: {stats['delivered']} delivered in {stats['batches']} batches, {stats['dropped']} dropped, "
+            f"lag p99 {lag['p99'] * 1000:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+# A compact binary encoding for Account and FraudRecord.
+#
+# Every model has a fixed schema (SCHEMAS): its fields are written in schema order, without
+# names or type tags.
+#   int       a width byte followed by the two's complement little-endian bytes. Values fitting
+#             64 bits take 1, 2, 4 or 8 bytes (a varint whose width is known upfront, so it
+#             decodes in one struct call), wider values take as many bytes as they need
+#   float     8 byte little-endian double
+#   str       varint (LEB128) byte length followed by UTF-8
+#   enum      one byte, the index of the member
+#   optional  a presence byte followed by the value
+#   list      varint item count followed by the items
+# An encoded record starts with a version byte and a tag telling an Account from a bare
+# FraudRecord. Records of older codec versions decode through their LEGACY_SCHEMAS, fields they
+# lack take a default. The encoder and decoder of every model are generated from its schema once, like
+# dataclasses generates __init__, so no per-field dispatch happens at runtime. Decoding reads
+# straight from the given buffer or memoryview and sets the model slots directly, without going
+# through dicts or the model constructors.
+import struct
+from collections.abc import Callable
+from enum import Enum
+
+from fraud_detection_system.models import (
+    Account,
+    AccountStatusEnum,
+    BankAccount,
+    CreditCard,
+    DeviceInfo,
+    FraudRecord,
+    PaymentMethodEnum,
+    PersonalInfo,
+)
+
+
+CODEC_VERSION = 2
+FRAUD_RECORD_TAG = 0
+ACCOUNT_TAG = 1
+FLOAT64 = struct.Struct("<d")
+INT_STRUCTS = {1: struct.Struct("<b"), 2: struct.Struct("<h"), 4: struct.Struct("<i"), 8: struct.Struct("<q")}
+# The encoded width of an int by its bit length, up to 63 bits
+INT_WIDTHS = tuple(min(width for width in INT_STRUCTS if 8 * width > bit_length) for bit_length in range(64))
+
+INT = "int"
+FLOAT = "float"
+STR = "str"
+# A packed Account id, 16 UUID bytes or a string
+ACCOUNT_ID = "account_id"
+
+Buffer = bytes | bytearray | memoryview
+FieldType = str | type | tuple
+
+
+def optional(field_type: FieldType) -> tuple:
+    return ("optional", field_type)
+
+
+def list_of(field_type: FieldType) -> tuple:
+    return ("list", field_type)
+
+
+def default(value: object) -> tuple:
+    # A field missing from an older codec version, decoded as value without reading any bytes
+    return ("default", value)
+
+
+SCHEMAS: dict[type, tuple[tuple[str, FieldType], ...]] = {
+    PersonalInfo: (
+        ("name", STR),
+        ("age", INT),
+        ("ssn", STR),
+        ("email", optional(STR)),
+        ("phone_number", optional(STR)),
+    ),
+    DeviceInfo: (
+        ("ip_address", STR),
+    ),
+    BankAccount: (
+        ("routing_number", INT),
+        ("account_number", INT),
+    ),
+    CreditCard: (
+        ("card_number", INT),
+        ("expiry_date", STR),
+        ("cvv", INT),
+        ("zip_code", STR),
+    ),
+    FraudRecord: (
+        ("amount", FLOAT),
+        ("personal_info", PersonalInfo),
+        ("device_info", DeviceInfo),
+        ("payment_method", PaymentMethodEnum),
+        ("bank_account", optional(BankAccount)),
+        ("credit_card", optional(CreditCard)),
+    ),
+    Account: (
+        ("fraud_record", FraudRecord),
+        ("status", AccountStatusEnum),
+        ("fraud_score", FLOAT),
+        ("data_validation_errors", list_of(STR)),
+        ("_account_id", ACCOUNT_ID),
+        ("version", INT),
+    ),
+}
+# Schemas of the older codec versions that still decode, by codec version
+LEGACY_SCHEMAS: dict[int, dict[type, tuple[tuple[str, FieldType], ...]]] = {
+    1: {**SCHEMAS, Account: (*SCHEMAS[Account][:-1], ("version", default(0)))},
+}
+
+
+class CodecError(Exception):
+    pass
+
+
+def _write_length(buffer: bytearray, length: int) -> None:
+    while length > 0x7F:
+        buffer.append(length & 0x7F | 0x80)
+        length >>= 7
+    buffer.append(length)
+
+
+def _read_length(view: Buffer, offset: int) -> tuple[int, int]:
+    length = 0
+    shift = 0
+    while True:
+        byte = view[offset]
+        offset += 1
+        length |= (byte & 0x7F) << shift
+        if byte <= 0x7F:
+            return length, offset
+        shift += 7
+
+
+class _CodeWriter:
+    def __init__(self, memoryview_input: bool = False, schemas: dict = SCHEMAS) -> None:
+        # Slices of bytes decode faster through bytes.decode, memoryviews have no decode method
+        self._memoryview_input = memoryview_input
+        self.schemas = schemas
+        self.lines = []
+        self.namespace = {
+            "_write_length": _write_length,
+            "_read_length": _read_length,
+            "_pack_float": FLOAT64.pack,
+            "_unpack_float": FLOAT64.unpack_from,
+            "_from_bytes": int.from_bytes,
+            "_int_widths": INT_WIDTHS,
+            "_int_unpackers": {width: int_struct.unpack_from for width, int_struct in INT_STRUCTS.items()},
+            "_new": object.__new__,
+        }
+        self._indent = 1
+        self._counter = 0
+
+    def decode_text(self, data: str) -> str:
+        return f"str({data}, 'utf-8')" if self._memoryview_input else f"{data}.decode()"
+
+    def line(self, text: str) -> None:
+        self.lines.append("    " * self._indent + text)
+
+    def indent(self, levels: int) -> None:
+        self._indent += levels
+
+    def variable(self, prefix: str) -> str:
+        self._counter += 1
+        return f"{prefix}{self._counter}"
+
+    def constant(self, prefix: str, value: object) -> str:
+        name = self.variable(f"_{prefix}")
+        self.namespace[name] = value
+        return name
+
+    def compile(self, signature: str) -> Callable:
+        source = f"def generated{signature}:\n" + "\n".join(self.lines)
+        exec(source, self.namespace)
+        return self.namespace["generated"]
+
+
+def _generate_encode(writer: _CodeWriter, field_type: FieldType, value: str) -> None:
+    # Appends the code encoding the expression value
+    if field_type == INT:
+        width = writer.variable("width")
+        writer.line(f"{width} = {value}.bit_length()")
+        writer.line(f"{width} = _int_widths[{width}] if {width} < 64 else ({width} + 8) >> 3")
+        writer.line(f"append({width})")
+        writer.line(f"extend({value}.to_bytes({width}, 'little', signed=True))")
+    elif field_type == FLOAT:
+        writer.line(f"extend(_pack_float({value}))")
+    elif field_type == STR:
+        data = writer.variable("data")
+        writer.line(f"{data} = {value}.encode()")
+        writer.line(f"if len({data}) < 0x80: append(len({data}))")
+        writer.line(f"else: _write_length(buffer, len({data}))")
+        writer.line(f"extend({data})")
+    elif field_type == ACCOUNT_ID:
+        writer.line(f"if {value}.__class__ is bytes:")
+        writer.indent(1)
+        writer.line("append(0)")
+        writer.line(f"extend({value})")
+        writer.indent(-1)
+        writer.line("else:")
+        writer.indent(1)
+        writer.line("append(1)")
+        _generate_encode(writer, STR, value)
+        writer.indent(-1)
+    elif isinstance(field_type, type) and issubclass(field_type, Enum):
+        indexes = writer.constant("indexes", {member: index for index, member in enumerate(field_type)})
+        writer.line(f"append({indexes}[{value}])")
+    elif isinstance(field_type, tuple) and field_type[0] == "optional":
+        writer.line(f"if {value} is None: append(0)")
+        writer.line("else:")
+        writer.indent(1)
+        writer.line("append(1)")
+        _generate_encode(writer, field_type[1], value)
+        writer.indent(-1)
+    elif isinstance(field_type, tuple) and field_type[0] == "list":
+        item = writer.variable("item")
+        writer.line(f"_write_length(buffer, len({value}))")
+        writer.line(f"for {item} in {value}:")
+        writer.indent(1)
+        _generate_encode(writer, field_type[1], item)
+        writer.indent(-1)
+    elif field_type in SCHEMAS:
+        for name, nested_type in SCHEMAS[field_type]:
+            nested_value = writer.variable("value")
+            writer.line(f"{nested_value} = {value}.{name}")
+            _generate_encode(writer, nested_type, nested_value)
+    else:
+        raise CodecError(f"Unsupported field type {field_type!r}")
+
+
+def _generate_decode(writer: _CodeWriter, field_type: FieldType, target: str) -> None:
+    # Appends the code decoding the value at offset into the variable target
+    if field_type == INT:
+        writer.line("end = offset + 1 + view[offset]")
+        writer.line("unpack = _int_unpackers.get(end - offset - 1)")
+        writer.line(f"if unpack: {target} = unpack(view, offset + 1)[0]")
+        writer.line(f"else: {target} = _from_bytes(view[offset + 1:end], 'little', signed=True)")
+        writer.line("offset = end")
+    elif field_type == FLOAT:
+        writer.line(f"{target} = _unpack_float(view, offset)[0]")
+        writer.line("offset += 8")
+    elif field_type == STR:
+        writer.line("end = view[offset]")
+        writer.line("if end < 0x80: offset += 1")
+        writer.line("else: end, offset = _read_length(view, offset)")
+        writer.line("end += offset")
+        writer.line(f"{target} = {writer.decode_text('view[offset:end]')}")
+        writer.line("offset = end")
+    elif field_type == ACCOUNT_ID:
+        writer.line("if view[offset] == 0:")
+        writer.indent(1)
+        writer.line(f"{target} = bytes(view[offset + 1:offset + 17])")
+        writer.line("offset += 17")
+        writer.indent(-1)
+        writer.line("else:")
+        writer.indent(1)
+        writer.line("offset += 1")
+        _generate_decode(writer, STR, target)
+        writer.indent(-1)
+    elif isinstance(field_type, type) and issubclass(field_type, Enum):
+        members = writer.constant("members", tuple(field_type))
+        writer.line(f"{target} = {members}[view[offset]]")
+        writer.line("offset += 1")
+    elif isinstance(field_type, tuple) and field_type[0] == "optional":
+        writer.line("offset += 1")
+        writer.line(f"if view[offset - 1] == 0: {target} = None")
+        writer.line("else:")
+        writer.indent(1)
+        _generate_decode(writer, field_type[1], target)
+        writer.indent(-1)
+    elif isinstance(field_type, tuple) and field_type[0] == "default":
+        writer.line(f"{target} = {writer.constant('default', field_type[1])}")
+    elif isinstance(field_type, tuple) and field_type[0] == "list":
+        count, item = writer.variable("count"), writer.variable("item")
+        writer.line(f"{count}, offset = _read_length(view, offset)")
+        writer.line(f"{target} = []")
+        writer.line(f"for _ in range({count}):")
+        writer.indent(1)
+        _generate_decode(writer, field_type[1], item)
+        writer.line(f"{target}.append({item})")
+        writer.indent(-1)
+    elif field_type in writer.schemas:
+        model_cls = writer.constant("cls", field_type)
+        writer.line(f"{target} = _new({model_cls})")
+        for name, nested_type in writer.schemas[field_type]:
+            nested_value = writer.variable("value")
+            _generate_decode(writer, nested_type, nested_value)
+            writer.line(f"{target}.{name} = {nested_value}")
+    else:
+        raise CodecError(f"Unsupported field type {field_type!r}")
+
+
+def _compile_encoder(model_cls: type) -> Callable[[bytearray, object], None]:
+    writer = _CodeWriter()
+    writer.line("append = buffer.append")
+    writer.line("extend = buffer.extend")
+    _generate_encode(writer, model_cls, "value")
+    return writer.compile("(buffer, value)")
+
+
+def _compile_decoder(
+    model_cls: type, memoryview_input: bool, schemas: dict = SCHEMAS
+) -> Callable[[Buffer, int], tuple[object, int]]:
+    writer = _CodeWriter(memoryview_input, schemas)
+    _generate_decode(writer, model_cls, "instance")
+    writer.line("return instance, offset")
+    return writer.compile("(view, offset)")
+
+
+_encode_fraud_record = _compile_encoder(FraudRecord)
+_encode_account = _compile_encoder(Account)
+# Decoders by codec version and record tag, for bytes-like buffers and for memoryviews
+_DECODERS = {
+    version: {
+        tag: (_compile_decoder(model_cls, False, schemas), _compile_decoder(model_cls, True, schemas))
+        for tag, model_cls in ((ACCOUNT_TAG, Account), (FRAUD_RECORD_TAG, FraudRecord))
+    }
+    for version, schemas in ((CODEC_VERSION, SCHEMAS), *LEGACY_SCHEMAS.items())
+}
+
+
+def encode_into(buffer: bytearray, record: FraudRecord | Account) -> None:
+    # Appends the encoded record to the buffer, a field of the wrong type leaves the buffer as it was
+    start = len(buffer)
+    try:
+        buffer.append(CODEC_VERSION)
+        if isinstance(record, Account):
+            buffer.append(ACCOUNT_TAG)
+            _encode_account(buffer, record)
+        else:
+            buffer.append(FRAUD_RECORD_TAG)
+            _encode_fraud_record(buffer, record)
+    except (AttributeError, TypeError, ValueError, OverflowError, struct.error) as error:
+        del buffer[start:]
+        raise CodecError(f"Cannot encode {type(record).__name__}: {error}") from error
+
+
+def encode(record: FraudRecord | Account) -> bytes:
+    buffer = bytearray()
+    encode_into(buffer, record)
+    return bytes(buffer)
+
+
+def decode_from(view: Buffer, offset: int = 0) -> tuple[FraudRecord | Account, int]:
+    # Returns the record starting at offset and the offset right after it
+    try:
+        version, tag = view[offset], view[offset + 1]
+        if (version_decoders := _DECODERS.get(version)) is None:
+            raise CodecError(f"Unsupported codec version {version}")
+        if (decoders := version_decoders.get(tag)) is None:
+            raise CodecError(f"Unknown record tag {tag}")
+        record, end = decoders[view.__class__ is memoryview](view, offset + 2)
+    except (IndexError, struct.error, UnicodeDecodeError) as error:
+        raise CodecError(f"Truncated or corrupted record: {error}") from error
+
+    # Slices past the end come back short instead of failing, so the end is checked once here
+    if end > len(view):
+        raise CodecError("Truncated record")
+    return record, end
+
+
+def decode(view: Buffer) -> FraudRecord | Account:
+    record, end = decode_from(view)
+    if end != len(view):
+        raise CodecError(f"{len(view) - end} trailing bytes after the record")
+    return record
@@ -0,0 +1,240 @@
+# Columnar counterparts of the per-record validations, for validating large batches.
+#
+# A batch is transposed into one list per field. Each rule runs over a whole column at once
+# (map over a precompiled regex or a builtin predicate, so the loop runs in C) and only the
+# failing rows are visited to set the rule's bit in the row's error bitmask. The bits are in
+# the same order as the errors of the per-record validation, so turning a bitmask into
+# ValidationErrors reproduces its result exactly. That only happens when a caller asks for it.
+import operator
+from abc import ABC, abstractmethod
+from array import array
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from itertools import compress, repeat
+from operator import attrgetter
+from typing import Self
+
+from fraud_detection_system.instrumentation import instrumentation
+from fraud_detection_system.models import FraudRecord, PaymentMethodEnum
+from fraud_detection_system.validators import (
+    EMAIL_PATTERN,
+    PHONE_NUMBER_PATTERN,
+    SSN_PATTERN,
+    ValidationError,
+)
+
+
+@dataclass(slots=True)
+class PersonalInfoColumns:
+    names: Sequence[str]
+    ages: Sequence[int]
+    ssns: Sequence[str]
+    phone_numbers: Sequence[str]
+    emails: Sequence[str]
+
+    @classmethod
+    def from_records(cls, fraud_records: Sequence[FraudRecord]) -> Self:
+        personal_infos = list(map(attrgetter("personal_info"), fraud_records))
+        return cls(
+            names=list(map(attrgetter("name"), personal_infos)),
+            ages=list(map(attrgetter("age"), personal_infos)),
+            ssns=list(map(attrgetter("ssn"), personal_infos)),
+            phone_numbers=list(map(attrgetter("phone_number"), personal_infos)),
+            emails=list(map(attrgetter("email"), personal_infos)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+@dataclass(slots=True)
+class ACHColumns:
+    account_numbers: Sequence[int]
+    routing_numbers: Sequence[int]
+
+    @classmethod
+    def from_records(cls, fraud_records: Sequence[FraudRecord]) -> Self:
+        bank_accounts = list(map(attrgetter("bank_account"), fraud_records))
+        return cls(
+            account_numbers=list(map(attrgetter("account_number"), bank_accounts)),
+            routing_numbers=list(map(attrgetter("routing_number"), bank_accounts)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.account_numbers)
+
+
+@dataclass(slots=True)
+class CreditCardColumns:
+    card_numbers: Sequence[int]
+    expiry_dates: Sequence[str]
+    cvvs: Sequence[int]
+    zip_codes: Sequence[str]
+
+    @classmethod
+    def from_records(cls, fraud_records: Sequence[FraudRecord]) -> Self:
+        credit_cards = list(map(attrgetter("credit_card"), fraud_records))
+        return cls(
+            card_numbers=list(map(attrgetter("card_number"), credit_cards)),
+            expiry_dates=list(map(attrgetter("expiry_date"), credit_cards)),
+            cvvs=list(map(attrgetter("cvv"), credit_cards)),
+            zip_codes=list(map(attrgetter("zip_code"), credit_cards)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.card_numbers)
+
+
+class BatchValidationResult:
+    # One error bitmask per row, bit i set means ERRORS[i] applies to the row
+    _masks: array
+    _errors: tuple[str, ...]
+
+    def __init__(self, masks: array, errors: tuple[str, ...]) -> None:
+        self._masks = masks
+        self._errors = errors
+
+    @property
+    def masks(self) -> array:
+        return self._masks
+
+    def __len__(self) -> int:
+        return len(self._masks)
+
+    def is_valid(self, row: int) -> bool:
+        return not self._masks[row]
+
+    def invalid_rows(self) -> list[int]:
+        return list(compress(range(len(self._masks)), self._masks))
+
+    def errors(self, row: int) -> list[ValidationError]:
+        return [ValidationError(message) for message in self.error_messages(row)]
+
+    def error_messages(self, row: int) -> list[str]:
+        mask = self._masks[row]
+        return [message for bit, message in enumerate(self._errors) if mask >> bit & 1]
+
+
+class ColumnarDataValidation(ABC):
+    # The error messages in the order the per-record validation reports them
+    ERRORS: tuple[str, ...] = ()
+
+    @abstractmethod
+    def failures(self, columns) -> tuple[Iterable, ...]:
+        # One iterable of per-row failure flags for each entry of ERRORS
+        pass
+
+    def validate_columns(self, columns) -> BatchValidationResult:
+        row_count = len(columns)
+        masks = array("I", bytes(4 * row_count))
+        for bit, failed in enumerate(self.failures(columns)):
+            flag = 1 << bit
+            for row in compress(range(row_count), failed):
+                masks[row] |= flag
+        return BatchValidationResult(masks, self.ERRORS)
+
+
+def _missing(column: Iterable) -> Iterable[bool]:
+    return map(operator.not_, column)
+
+
+def _mismatches(pattern, column: Iterable[str]) -> Iterable[bool]:
+    return map(operator.not_, map(pattern.match, column))
+
+
+class PersonalInfoColumnarValidation(ColumnarDataValidation):
+    ERRORS = (
+        "Name is missing",
+        "Invalid age",
+        "Age must be at least 18",
+        "SSN is missing",
+        "Invalid SSN format",
+        "Phone number is missing",
+        "Invalid phone number format",
+        "Email is missing",
+        "Invalid email format",
+    )
+
+    def failures(self, columns: PersonalInfoColumns) -> tuple[Iterable, ...]:
+        return (
+            _missing(columns.names),
+            map(operator.or_, _missing(columns.ages), map(operator.lt, columns.ages, repeat(0))),
+            map(operator.lt, columns.ages, repeat(18)),
+            _missing(columns.ssns),
+            _mismatches(SSN_PATTERN, columns.ssns),
+            _missing(columns.phone_numbers),
+            _mismatches(PHONE_NUMBER_PATTERN, columns.phone_numbers),
+            _missing(columns.emails),
+            _mismatches(EMAIL_PATTERN, columns.emails),
+        )
+
+
+class ACHColumnarValidation(ColumnarDataValidation):
+    ERRORS = (
+        "Account number is missing",
+        "Routing number is missing",
+    )
+
+    def failures(self, columns: ACHColumns) -> tuple[Iterable, ...]:
+        return (
+            _missing(columns.account_numbers),
+            _missing(columns.routing_numbers),
+        )
+
+
+class CreditCardColumnarValidation(ColumnarDataValidation):
+    ERRORS = (
+        "Card number is missing",
+        "Expiry date is missing",
+        "CVV is missing",
+        "CVV must be 3 digits",
+        "Zip code is missing",
+    )
+
+    def failures(self, columns: CreditCardColumns) -> tuple[Iterable, ...]:
+        return (
+            _missing(columns.card_numbers),
+            _missing(columns.expiry_dates),
+            _missing(columns.cvvs),
+            map((3).__ne__, map(len, map(str, columns.cvvs))),
+            _missing(columns.zip_codes),
+        )
+
+
+class BatchDataValidator:
+    # Validates like the validators ReviewAccountState builds: personal info for every record,
+    # then ACH or credit card details depending on the payment method. The payment errors take
+    # the bits after the personal info errors.
+    ERRORS = (
+        PersonalInfoColumnarValidation.ERRORS
+        + ACHColumnarValidation.ERRORS
+        + CreditCardColumnarValidation.ERRORS
+    )
+
+    def __init__(self) -> None:
+        self._personal_info_validation = PersonalInfoColumnarValidation()
+        self._ach_validation = ACHColumnarValidation()
+        self._credit_card_validation = CreditCardColumnarValidation()
+
+    def validate(self, fraud_records: Sequence[FraudRecord]) -> BatchValidationResult:
+        with instrumentation.span("validation", self.__class__.__name__):
+            masks = self._personal_info_validation.validate_columns(
+                PersonalInfoColumns.from_records(fraud_records)
+            ).masks
+            payment_methods = list(map(attrgetter("payment_method"), fraud_records))
+            shift = len(PersonalInfoColumnarValidation.ERRORS)
+            for validation, columns_cls, payment_method in (
+                (self._ach_validation, ACHColumns, PaymentMethodEnum.ACH),
+                (self._credit_card_validation, CreditCardColumns, PaymentMethodEnum.CREDIT_CARD),
+            ):
+                rows = list(
+                    compress(range(len(fraud_records)), map(payment_method.__eq__, payment_methods))
+                )
+                payment_masks = validation.validate_columns(
+                    columns_cls.from_records([fraud_records[row] for row in rows])
+                ).masks
+                for row, payment_mask in compress(zip(rows, payment_masks), payment_masks):
+                    masks[row] |= payment_mask << shift
+                shift += len(validation.ERRORS)
+
+        return BatchValidationResult(masks, self.ERRORS)
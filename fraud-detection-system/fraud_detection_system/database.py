@@ -1,11 +1,134 @@
 # This method will act as a dummy database by initializing an in-memory store using a dictionary.
+# The store is split into shards with one lock each (lock striping by account_id hash), so
+# threads working on different accounts rarely contend on the same lock. Every shard keeps
+# secondary indexes over the accounts it holds, so lookups by SSN, IP address, card number or
+# status never scan the store.
 import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from collections.abc import Callable, Hashable, Iterable, Mapping
 from typing import Self
 
-from fraud_detection_system.models import FraudRecord
+from fraud_detection_system.models import Account, AccountStatusEnum, FraudRecord
 
-class DatabaseConnection:
-    _fraud_record_db: dict[str, FraudRecord] = {}
+
+SHARD_COUNT = 64
+
+IndexKey = tuple[str, Hashable]  # index name, indexed value
+
+
+def index_keys(fraud_record: FraudRecord) -> tuple[IndexKey, ...]:
+    # Stores hold both accounts and bare fraud records, only accounts have a status
+    keys = []
+    if isinstance(fraud_record, Account):
+        keys.append(("status", fraud_record.status))
+        fraud_record = fraud_record.fraud_record
+    keys.append(("ssn", fraud_record.personal_info.ssn))
+    keys.append(("ip_address", fraud_record.device_info.ip_address))
+    if fraud_record.credit_card is not None:
+        keys.append(("card_number", fraud_record.credit_card.card_number))
+    return tuple(keys)
+
+
+def stored_version(fraud_record: FraudRecord | None) -> int | None:
+    # The version compare_and_store checks, None when nothing is stored and 0 for bare records
+    if fraud_record is None:
+        return None
+    return fraud_record.version if isinstance(fraud_record, Account) else 0
+
+
+class SecondaryIndex:
+    # Maps every index key to the ids of the accounts holding it. The keys each account was
+    # indexed under are kept as well: records are mutated in place (a reapply swaps the
+    # fraud_record of the stored account), so the old keys cannot be derived from the record
+    # that replaces them. Not thread-safe, callers hold the lock guarding the records.
+    _account_ids: dict[IndexKey, set[str]]
+    _keys: dict[str, tuple[IndexKey, ...]]
+
+    def __init__(self) -> None:
+        self._account_ids = {}
+        self._keys = {}
+
+    def update(self, account_id: str, fraud_record: FraudRecord) -> None:
+        keys = index_keys(fraud_record)
+        previous_keys = self._keys.get(account_id, ())
+        if keys == previous_keys:
+            return
+
+        for key in previous_keys:
+            if key not in keys:
+                account_ids = self._account_ids[key]
+                account_ids.discard(account_id)
+                if not account_ids:
+                    del self._account_ids[key]
+        for key in keys:
+            self._account_ids.setdefault(key, set()).add(account_id)
+        self._keys[account_id] = keys
+
+    def find(self, index_name: str, value: Hashable) -> list[str]:
+        return list(self._account_ids.get((index_name, value), ()))
+
+
+class AbstractDatabaseConnection(ABC):
+    @abstractmethod
+    def get_fraud_record(self, account_id: str) -> FraudRecord:
+        pass
+
+    @abstractmethod
+    def store_fraud_record(self, account_id: str, fraud_record: FraudRecord) -> None:
+        pass
+
+    @abstractmethod
+    def update_fraud_record(
+        self, account_id: str, update: Callable[[FraudRecord | None], FraudRecord]
+    ) -> FraudRecord:
+        pass
+
+    @abstractmethod
+    def compare_and_store(self, account_id: str, expected_version: int | None, fraud_record: FraudRecord) -> bool:
+        # Stores the record only if the stored one still has expected_version (None: nothing is
+        # stored yet), atomically. Returns whether it was stored.
+        pass
+
+    def compare_and_store_many(
+        self, fraud_records: Mapping[str, FraudRecord], expected_versions: Mapping[str, int | None]
+    ) -> set[str]:
+        # compare_and_store for every record, returns the account ids that were stored
+        return {
+            account_id
+            for account_id, fraud_record in fraud_records.items()
+            if self.compare_and_store(account_id, expected_versions[account_id], fraud_record)
+        }
+
+    @abstractmethod
+    def get_many(self, account_ids: Iterable[str]) -> dict[str, FraudRecord]:
+        pass
+
+    @abstractmethod
+    def put_many(self, fraud_records: Mapping[str, FraudRecord]) -> None:
+        pass
+
+    @abstractmethod
+    def _find_by(self, index_name: str, value: Hashable) -> dict[str, FraudRecord]:
+        pass
+
+    def find_by_ssn(self, ssn: str) -> dict[str, FraudRecord]:
+        return self._find_by("ssn", ssn)
+
+    def find_by_ip(self, ip_address: str) -> dict[str, FraudRecord]:
+        return self._find_by("ip_address", ip_address)
+
+    def find_by_card_number(self, card_number: int) -> dict[str, FraudRecord]:
+        return self._find_by("card_number", card_number)
+
+    def find_by_status(self, status: AccountStatusEnum) -> dict[str, FraudRecord]:
+        return self._find_by("status", status)
+
+
+class DatabaseConnection(AbstractDatabaseConnection):
+    _shards: list[dict[str, FraudRecord]] = [{} for _ in range(SHARD_COUNT)]
+    _shard_locks: list[threading.Lock] = [threading.Lock() for _ in range(SHARD_COUNT)]
+    _shard_indexes: list[SecondaryIndex] = [SecondaryIndex() for _ in range(SHARD_COUNT)]
     _lock: threading.Lock = threading.Lock()
     _database_connection: Self | None = None
 
@@ -15,9 +138,92 @@ class DatabaseConnection:
                 cls._database_connection = super().__new__(cls) # calls parent object's __new__ method
         return cls._database_connection
 
+    def clear(self) -> None:
+        # Drops every stored account, the store is shared by the whole process
+        for shard_index in range(SHARD_COUNT):
+            with self._shard_locks[shard_index]:
+                self._shards[shard_index].clear()
+                self._shard_indexes[shard_index] = SecondaryIndex()
+
+    @staticmethod
+    def _shard_index(account_id: str) -> int:
+        return hash(account_id) % SHARD_COUNT
+
     def get_fraud_record(self, account_id: str) -> FraudRecord:
-        return self._fraud_record_db.get(account_id)
+        shard_index = self._shard_index(account_id)
+        with self._shard_locks[shard_index]:
+            return self._shards[shard_index].get(account_id)
 
     def store_fraud_record(self, account_id: str, fraud_record: FraudRecord) -> None:
-        self._fraud_record_db[account_id] = fraud_record
+        shard_index = self._shard_index(account_id)
+        with self._shard_locks[shard_index]:
+            self._put(shard_index, account_id, fraud_record)
+
+    def update_fraud_record(
+        self, account_id: str, update: Callable[[FraudRecord | None], FraudRecord]
+    ) -> FraudRecord:
+        # Atomic read-modify-write, no other writer touches the account while update runs
+        shard_index = self._shard_index(account_id)
+        with self._shard_locks[shard_index]:
+            fraud_record = update(self._shards[shard_index].get(account_id))
+            self._put(shard_index, account_id, fraud_record)
+            return fraud_record
+
+    def compare_and_store(self, account_id: str, expected_version: int | None, fraud_record: FraudRecord) -> bool:
+        shard_index = self._shard_index(account_id)
+        with self._shard_locks[shard_index]:
+            if stored_version(self._shards[shard_index].get(account_id)) != expected_version:
+                return False
+            self._put(shard_index, account_id, fraud_record)
+            return True
+
+    def compare_and_store_many(
+        self, fraud_records: Mapping[str, FraudRecord], expected_versions: Mapping[str, int | None]
+    ) -> set[str]:
+        stored = set()
+        for shard_index, shard_account_ids in self._group_by_shard(fraud_records).items():
+            shard = self._shards[shard_index]
+            with self._shard_locks[shard_index]:
+                for account_id in shard_account_ids:
+                    if stored_version(shard.get(account_id)) == expected_versions[account_id]:
+                        self._put(shard_index, account_id, fraud_records[account_id])
+                        stored.add(account_id)
+        return stored
+
+    def get_many(self, account_ids: Iterable[str]) -> dict[str, FraudRecord]:
+        # Unknown account ids are left out of the result
+        fraud_records = {}
+        for shard_index, shard_account_ids in self._group_by_shard(account_ids).items():
+            shard = self._shards[shard_index]
+            with self._shard_locks[shard_index]:
+                for account_id in shard_account_ids:
+                    if (fraud_record := shard.get(account_id)) is not None:
+                        fraud_records[account_id] = fraud_record
+        return fraud_records
+
+    def put_many(self, fraud_records: Mapping[str, FraudRecord]) -> None:
+        for shard_index, shard_account_ids in self._group_by_shard(fraud_records).items():
+            with self._shard_locks[shard_index]:
+                for account_id in shard_account_ids:
+                    self._put(shard_index, account_id, fraud_records[account_id])
+
+    def _find_by(self, index_name: str, value: Hashable) -> dict[str, FraudRecord]:
+        fraud_records = {}
+        for shard_index in range(SHARD_COUNT):
+            shard = self._shards[shard_index]
+            with self._shard_locks[shard_index]:
+                for account_id in self._shard_indexes[shard_index].find(index_name, value):
+                    fraud_records[account_id] = shard[account_id]
+        return fraud_records
+
+    def _put(self, shard_index: int, account_id: str, fraud_record: FraudRecord) -> None:
+        # Must be called while holding the shard lock
+        self._shards[shard_index][account_id] = fraud_record
+        self._shard_indexes[shard_index].update(account_id, fraud_record)
 
+    def _group_by_shard(self, account_ids: Iterable[str]) -> dict[int, list[str]]:
+        # Each shard lock is taken once per bulk call
+        shard_account_ids = defaultdict(list)
+        for account_id in account_ids:
+            shard_account_ids[self._shard_index(account_id)].append(account_id)
+        return shard_account_ids
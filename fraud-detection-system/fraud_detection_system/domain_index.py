@@ -0,0 +1,167 @@
+# A compact, memory-mapped set of email domains used as the local data source of the email
+# domain fraud analyses.
+#
+# The domains are stored as a sorted string table (an offsets array and one blob of domain
+# bytes) behind a Bloom filter. Most unlisted domains are rejected by the filter, the rest are
+# confirmed with a binary search over the table. Loading maps the file read-only, so worker
+# processes loading the same file share its pages and no Python set is built.
+import argparse
+import hashlib
+import math
+import mmap
+import struct
+from array import array
+from collections.abc import Iterable, Iterator
+from typing import Self
+
+
+MAGIC = b"FDDOMST1"
+BYTE_ORDER_MARK = 0x01020304
+# magic, byte order mark, hash count, domain count, Bloom filter bits, blob size.
+# The offsets array uses the native byte order.
+HEADER = struct.Struct("=8sIIQQQ")
+FALSE_POSITIVE_RATE = 0.01
+
+
+class DomainSetError(Exception):
+    pass
+
+
+def normalize_domain(domain: str) -> bytes:
+    return domain.strip().rstrip(".").lower().encode()
+
+
+def _bloom_positions(domain: bytes, hash_count: int, bit_count: int) -> Iterator[int]:
+    # Double hashing, the k positions are derived from two 64-bit halves of one digest
+    digest = hashlib.blake2b(domain, digest_size=16).digest()
+    first = int.from_bytes(digest[:8], "little")
+    second = int.from_bytes(digest[8:], "little") | 1
+    for index in range(hash_count):
+        yield (first + index * second) % bit_count
+
+
+def _pad(buffer: bytearray) -> None:
+    buffer.extend(b"\0" * (-len(buffer) % 8))
+
+
+class DomainSet:
+    _mmap: mmap.mmap | None
+    _views: list[memoryview]
+    _hash_count: int
+    _bit_count: int
+    _bloom: memoryview
+    _offsets: memoryview
+    _buffer: bytes | mmap.mmap
+    _blob_offset: int
+
+    def __init__(self, buffer: bytes | mmap.mmap) -> None:
+        if len(buffer) < HEADER.size:
+            raise DomainSetError("Truncated domain set")
+        magic, byte_order_mark, hash_count, count, bit_count, blob_size = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise DomainSetError("Not a domain set")
+        if byte_order_mark != BYTE_ORDER_MARK:
+            raise DomainSetError("Domain set was built on a platform with another byte order")
+
+        self._mmap = buffer if isinstance(buffer, mmap.mmap) else None
+        self._hash_count = hash_count
+        self._bit_count = bit_count
+        view = memoryview(buffer)
+        offset = HEADER.size
+        bloom_size = math.ceil(bit_count / 8)
+        offsets_size = (count + 1) * 8
+        self._bloom = view[offset:offset + bloom_size]
+        offset += bloom_size + (-bloom_size % 8)
+        raw_offsets = view[offset:offset + offsets_size]
+        self._offsets = raw_offsets.cast("Q")
+        offset += offsets_size
+        # Slicing the buffer itself yields plain bytes, which compare faster than memoryviews
+        self._buffer = buffer
+        self._blob_offset = offset
+        self._views = [view, self._bloom, raw_offsets, self._offsets]
+
+    @classmethod
+    def load(cls, path: str) -> Self:
+        with open(path, "rb") as domain_file:
+            return cls(mmap.mmap(domain_file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @staticmethod
+    def build(domains: Iterable[str], false_positive_rate: float = FALSE_POSITIVE_RATE) -> bytes:
+        sorted_domains = sorted({normalize_domain(domain) for domain in domains if domain.strip()})
+        count = len(sorted_domains)
+        bit_count = max(8, math.ceil(-count * math.log(false_positive_rate) / math.log(2) ** 2))
+        hash_count = max(1, round(bit_count / max(count, 1) * math.log(2)))
+
+        bloom = bytearray(math.ceil(bit_count / 8))
+        offsets = array("Q", [0])
+        for domain in sorted_domains:
+            for position in _bloom_positions(domain, hash_count, bit_count):
+                bloom[position >> 3] |= 1 << (position & 7)
+            offsets.append(offsets[-1] + len(domain))
+
+        buffer = bytearray(HEADER.pack(MAGIC, BYTE_ORDER_MARK, hash_count, count, bit_count, offsets[-1]))
+        buffer.extend(bloom)
+        _pad(buffer)
+        buffer.extend(offsets.tobytes())
+        buffer.extend(b"".join(sorted_domains))
+        return bytes(buffer)
+
+    @classmethod
+    def build_from_file(cls, list_path: str, index_path: str) -> None:
+        # One domain per line, blank lines and lines starting with "#" are skipped
+        with open(list_path) as list_file:
+            domains = [line for line in list_file if not line.lstrip().startswith("#")]
+        with open(index_path, "wb") as index_file:
+            index_file.write(cls.build(domains))
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __contains__(self, domain: str) -> bool:
+        return self._contains(normalize_domain(domain))
+
+    def matches(self, domain: str) -> bool:
+        # A subdomain matches when the domain itself or any of its parent domains is listed
+        labels = normalize_domain(domain).split(b".")
+        return any(self._contains(b".".join(labels[index:])) for index in range(len(labels)))
+
+    def _contains(self, domain: bytes) -> bool:
+        if not domain or len(self) == 0:
+            return False
+        for position in _bloom_positions(domain, self._hash_count, self._bit_count):
+            if not self._bloom[position >> 3] >> (position & 7) & 1:
+                return False
+
+        offsets, buffer, blob_offset = self._offsets, self._buffer, self._blob_offset
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            candidate = buffer[blob_offset + offsets[middle]:blob_offset + offsets[middle + 1]]
+            if candidate == domain:
+                return True
+            if candidate < domain:
+                low = middle + 1
+            else:
+                high = middle
+        return False
+
+    def close(self) -> None:
+        # Views are released before the mapping, mmap refuses to close with exported buffers
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build a domain set from a list of domains.")
+    parser.add_argument("list_path", type=str, help="Text file with one domain per line")
+    parser.add_argument("index_path", type=str, help="Output domain set file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    DomainSet.build_from_file(args.list_path, args.index_path)
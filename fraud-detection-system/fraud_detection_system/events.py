@@ -0,0 +1,304 @@
+# Account change events, published in batches off the review path.
+#
+# AccountContext.update_account publishes an AccountEvent whenever the status or the fraud score
+# of an account changes. publish() only appends the event to a bounded ring buffer, a background
+# publisher thread drains the buffer and hands the events to every sink in batches: once
+# batch_size events are waiting or the oldest of them waited max_delay seconds. While a bus has
+# no sinks publish() returns at once, so the review path pays for one attribute check.
+#
+# When the buffer is full the overflow policy decides: drop_oldest overwrites the oldest waiting
+# event, drop_newest discards the published one, block makes the publisher wait for room up to
+# block_timeout seconds and then discards the event. Dropped events are counted in the stats,
+# next to the queue depth and the publish lag (from publish() to the hand-off to the sinks).
+import json
+import logging
+import socket
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Sequence
+from dataclasses import asdict, dataclass
+from enum import StrEnum
+
+from fraud_detection_system.instrumentation import LatencyHistogram
+from fraud_detection_system.models import AccountStatusEnum
+
+
+logger = logging.getLogger(__name__)
+
+CAPACITY = 65_536
+BATCH_SIZE = 512
+MAX_DELAY = 0.05
+BLOCK_TIMEOUT = 1.0
+
+
+@dataclass(frozen=True, slots=True)
+class AccountEvent:
+    account_id: str
+    status: AccountStatusEnum
+    fraud_score: float
+    previous_status: AccountStatusEnum
+    previous_fraud_score: float
+    timestamp: float
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["status"] = str(self.status)
+        data["previous_status"] = str(self.previous_status)
+        return data
+
+
+class OverflowPolicy(StrEnum):
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    BLOCK = "block"
+
+
+class EventSink(ABC):
+    # Sinks are only called from the publisher thread, one batch at a time
+    @abstractmethod
+    def write(self, events: Sequence[AccountEvent]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class JSONLinesFileSink(EventSink):
+    # Appends one JSON object per event to a local file
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, events: Sequence[AccountEvent]) -> None:
+        self._file.write("".join(json.dumps(event.to_dict()) + "\n" for event in events))
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class SocketSink(EventSink):
+    # Streams newline-delimited JSON to a TCP endpoint, standing in for a message broker. The
+    # connection is opened on the first batch and again after a failed one.
+    def __init__(self, host: str, port: int, timeout: float = 5.0) -> None:
+        self._address = (host, port)
+        self._timeout = timeout
+        self._socket: socket.socket | None = None
+
+    def write(self, events: Sequence[AccountEvent]) -> None:
+        payload = "".join(json.dumps(event.to_dict()) + "\n" for event in events).encode()
+        try:
+            if self._socket is None:
+                self._socket = socket.create_connection(self._address, timeout=self._timeout)
+            self._socket.sendall(payload)
+        except OSError:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class EventBus:
+    _buffer: deque[tuple[float, AccountEvent]]
+    _sinks: tuple[EventSink, ...]
+    _lag: LatencyHistogram
+
+    def __init__(
+        self,
+        capacity: int = CAPACITY,
+        batch_size: int = BATCH_SIZE,
+        max_delay: float = MAX_DELAY,
+        overflow_policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        block_timeout: float = BLOCK_TIMEOUT,
+    ) -> None:
+        if capacity < 1 or batch_size < 1 or max_delay < 0:
+            raise ValueError("capacity and batch_size must be at least 1 and max_delay must not be negative")
+        self._capacity = capacity
+        self._batch_size = batch_size
+        self._max_delay = max_delay
+        self._overflow_policy = OverflowPolicy(overflow_policy)
+        self._block_timeout = block_timeout
+        self._buffer = deque()
+        self._sinks = tuple()
+        self._lag = LatencyHistogram()
+        self._lock = threading.Lock()
+        # Wakes the publisher thread, and the callers of flush() once a batch is delivered
+        self._condition = threading.Condition(self._lock)
+        # Wakes publishers blocked on a full buffer
+        self._not_full = threading.Condition(self._lock)
+        self._publisher: threading.Thread | None = None
+        self._publishing = False
+        self._flush_requested = False
+        self._closed = False
+        self._published = 0
+        self._delivered = 0
+        self._dropped = 0
+        self._batches = 0
+        self._failed_batches = 0
+
+    @property
+    def active(self) -> bool:
+        return bool(self._sinks) and not self._closed
+
+    @property
+    def overflow_policy(self) -> OverflowPolicy:
+        return self._overflow_policy
+
+    @property
+    def lag(self) -> LatencyHistogram:
+        return self._lag
+
+    @property
+    def stats(self) -> dict[str, float]:
+        with self._lock:
+            return {
+                "depth": len(self._buffer),
+                "capacity": self._capacity,
+                "published": self._published,
+                "delivered": self._delivered,
+                "dropped": self._dropped,
+                "batches": self._batches,
+                "failed_batches": self._failed_batches,
+            }
+
+    def add_sink(self, sink: EventSink) -> None:
+        with self._lock:
+            self._sinks = (*self._sinks, sink)
+
+    def remove_sink(self, sink: EventSink) -> None:
+        with self._lock:
+            self._sinks = tuple(registered for registered in self._sinks if registered is not sink)
+
+    def publish(self, event: AccountEvent) -> bool:
+        # Returns whether the event was queued, never waits for the sinks
+        if not self.active:
+            return False
+
+        with self._lock:
+            if len(self._buffer) >= self._capacity and self._overflow_policy is OverflowPolicy.BLOCK:
+                self._not_full.wait_for(
+                    lambda: len(self._buffer) < self._capacity or self._closed, timeout=self._block_timeout
+                )
+            if self._closed:
+                return False
+            if len(self._buffer) >= self._capacity:
+                self._dropped += 1
+                if self._overflow_policy is not OverflowPolicy.DROP_OLDEST:
+                    return False
+                self._buffer.popleft()
+
+            self._buffer.append((time.monotonic(), event))
+            self._published += 1
+            if self._publisher is None:
+                self._publisher = threading.Thread(
+                    target=self._run_publisher, name="event-bus-publisher", daemon=True
+                )
+                self._publisher.start()
+            # The publisher only needs waking to start a time window or for a full batch
+            if len(self._buffer) == 1 or len(self._buffer) >= self._batch_size:
+                self._condition.notify_all()
+        return True
+
+    def flush(self, timeout: float | None = None) -> bool:
+        # Delivers the waiting events without waiting out the time window, returns whether the
+        # buffer drained in time
+        with self._lock:
+            self._flush_requested = True
+            self._condition.notify_all()
+            drained = self._condition.wait_for(lambda: not self._buffer and not self._publishing, timeout=timeout)
+            self._flush_requested = False
+            return drained
+
+    def close(self) -> None:
+        # Delivers the waiting events, then stops the publisher and closes the sinks
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+            self._not_full.notify_all()
+            publisher = self._publisher
+        if publisher is not None:
+            publisher.join()
+        for sink in self._sinks:
+            sink.close()
+
+    def _next_batch(self) -> list[tuple[float, AccountEvent]] | None:
+        with self._lock:
+            while True:
+                if len(self._buffer) >= self._batch_size:
+                    break
+                if self._buffer and (self._closed or self._flush_requested):
+                    break
+                if self._closed:
+                    return None
+                if not self._buffer:
+                    self._condition.wait()
+                    continue
+                remaining = self._buffer[0][0] + self._max_delay - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(timeout=remaining)
+
+            batch = [self._buffer.popleft() for _ in range(min(self._batch_size, len(self._buffer)))]
+            self._publishing = True
+            self._not_full.notify_all()
+            return batch
+
+    def _run_publisher(self) -> None:
+        while (batch := self._next_batch()) is not None:
+            events = [event for _, event in batch]
+            failed = False
+            for sink in self._sinks:
+                try:
+                    sink.write(events)
+                except Exception:
+                    # A failing sink loses this batch, the other sinks and later batches go on
+                    logger.exception(
+                        "Writing %d events to %s failed, the batch is lost", len(events), type(sink).__name__
+                    )
+                    failed = True
+            delivered_at = time.monotonic()
+            for published_at, _ in batch:
+                self._lag.record(delivered_at - published_at)
+
+            with self._lock:
+                self._publishing = False
+                self._batches += 1
+                # A batch counts as delivered once every sink took it
+                if failed:
+                    self._failed_batches += 1
+                else:
+                    self._delivered += len(events)
+                self._condition.notify_all()
+
+
+class DeferredEvents:
+    # Takes the place of a bus while a change may still be rejected: publish() holds the events
+    # back, commit() hands them to the bus once the change is stored
+    _events: list[AccountEvent]
+
+    def __init__(self, event_bus: EventBus) -> None:
+        self._event_bus = event_bus
+        self._events = []
+
+    @property
+    def active(self) -> bool:
+        return self._event_bus.active
+
+    def publish(self, event: AccountEvent) -> bool:
+        self._events.append(event)
+        return True
+
+    def commit(self) -> None:
+        events, self._events = self._events, []
+        for event in events:
+            self._event_bus.publish(event)
+
+
+# The bus account changes are published to, it publishes nothing until a sink is added
+account_events = EventBus()
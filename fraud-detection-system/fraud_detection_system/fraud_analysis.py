@@ -1,16 +1,181 @@
+import asyncio
+import functools
+import math
 import random
-import statistics
 import ipaddress
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Iterable
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from typing import Self
 
+from fraud_detection_system.domain_index import DomainSet
+from fraud_detection_system.instrumentation import instrumentation
+from fraud_detection_system.ip_index import IPPrefixIndex
 from fraud_detection_system.models import FraudRecord
+from fraud_detection_system.phone_index import PhoneNumberIndex, normalize_phone_number
+from fraud_detection_system.velocity import VelocityTracker
+
+
+SHARED_EXECUTOR_MAX_WORKERS = 16
+IP_ADDRESS_CACHE_SIZE = 65_536
 
 
 class FraudAnalysisError(Exception):
     pass
 
 
+@functools.lru_cache(maxsize=IP_ADDRESS_CACHE_SIZE)
+def parse_ip_address(ip_address: str) -> ipaddress.IPv4Address | ipaddress.IPv6Address:
+    # Every record is looked at by several IP and velocity analyses, and addresses repeat
+    # across records, so each address string is parsed once
+    return ipaddress.ip_address(ip_address)
+
+
+_shared_executor: ThreadPoolExecutor | None = None
+_shared_executor_lock = threading.Lock()
+
+
+def shared_analysis_executor() -> ThreadPoolExecutor:
+    # A single bounded pool shared by every analyzer, so concurrent reviews cannot
+    # spawn an unbounded number of lookup threads.
+    global _shared_executor
+    with _shared_executor_lock:
+        if _shared_executor is None:
+            _shared_executor = ThreadPoolExecutor(
+                max_workers=SHARED_EXECUTOR_MAX_WORKERS,
+                thread_name_prefix="fraud-analysis",
+            )
+    return _shared_executor
+
+
+class FraudAnalysisCache:
+    # A bounded, thread-safe TTL/LRU cache of analysis results keyed on FraudAnalysis.lookup_key.
+    # Lookup failures (FraudAnalysisError) are cached too, for negative_ttl seconds.
+    _ttl: float
+    _negative_ttl: float
+    _max_size: int
+    _clock: Callable[[], float]
+    _entries: OrderedDict[Hashable, tuple[float, float | None, FraudAnalysisError | None]]
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        ttl: float,
+        max_size: int = 100_000,
+        negative_ttl: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if ttl <= 0 or max_size < 1:
+            raise ValueError("ttl must be positive and max_size must be at least 1")
+
+        self._ttl = ttl
+        self._negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._max_size = max_size
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "size": len(self._entries),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_assess(self, key: Hashable, assess: Callable[[], float]) -> float:
+        if (entry := self._lookup(key)) is not None:
+            return self._unpack(entry)
+
+        # The lookup runs outside of the lock, concurrent misses on one key may both run it
+        try:
+            score = assess()
+        except FraudAnalysisError as error:
+            self._store(key, None, error)
+            raise
+        self._store(key, score, None)
+        return score
+
+    async def get_or_assess_async(self, key: Hashable, assess: Callable[[], Awaitable[float]]) -> float:
+        if (entry := self._lookup(key)) is not None:
+            return self._unpack(entry)
+
+        try:
+            score = await assess()
+        except FraudAnalysisError as error:
+            self._store(key, None, error)
+            raise
+        self._store(key, score, None)
+        return score
+
+    def _lookup(self, key: Hashable) -> tuple[float, float | None, FraudAnalysisError | None] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry
+
+    def _store(self, key: Hashable, score: float | None, error: FraudAnalysisError | None) -> None:
+        ttl = self._ttl if error is None else self._negative_ttl
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, score, error)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    @staticmethod
+    def _unpack(entry: tuple[float, float | None, FraudAnalysisError | None]) -> float:
+        _, score, error = entry
+        if error is not None:
+            raise FraudAnalysisError(str(error))
+
+        return score
+
+
+class FraudAnalysisCacheRegistry:
+    # Operators enable caching per FraudAnalysis subclass, the subclasses stay unaware of it
+    _caches: dict[type["FraudAnalysis"], FraudAnalysisCache] = {}
+
+    @classmethod
+    def enable(
+        cls,
+        analysis_cls: type["FraudAnalysis"],
+        ttl: float,
+        max_size: int = 100_000,
+        negative_ttl: float | None = None,
+    ) -> FraudAnalysisCache:
+        cache = FraudAnalysisCache(ttl=ttl, max_size=max_size, negative_ttl=negative_ttl)
+        cls._caches[analysis_cls] = cache
+        return cache
+
+    @classmethod
+    def disable(cls, analysis_cls: type["FraudAnalysis"]) -> None:
+        cls._caches.pop(analysis_cls, None)
+
+    @classmethod
+    def get_cache(cls, analysis_cls: type["FraudAnalysis"]) -> FraudAnalysisCache | None:
+        return cls._caches.get(analysis_cls)
+
+
 class FraudAnalysis(ABC):
     _fraud_record: FraudRecord
 
@@ -21,19 +186,44 @@ class FraudAnalysis(ABC):
     def fraud_record(self) -> FraudRecord:
         return self._fraud_record
 
+    @property
+    def lookup_key(self) -> Hashable | None:
+        # Analyses of the same class with equal lookup keys produce the same score,
+        # None means the result cannot be shared with other records.
+        return None
+
     @abstractmethod
     def assess_risk(self) -> float:
         pass
 
+    async def assess_risk_async(self) -> float:
+        # Lookups are blocking by default, so keep them off the event loop
+        return await asyncio.to_thread(self.assess_risk)
+
 
 class IPAddressFraudAnalysis(FraudAnalysis):
+    # Assign a loaded IPPrefixIndex per subclass to score from local reference data
+    ip_index: IPPrefixIndex | None = None
+
     @staticmethod
     def valid_ip_address(ip_address: str) -> ipaddress.IPv4Address | ipaddress.IPv6Address:
         try:
-            return ipaddress.ip_address(ip_address)
+            return parse_ip_address(ip_address)
         except ValueError:
             raise FraudAnalysisError("Invalid IP address format")
 
+    @property
+    def lookup_key(self) -> Hashable | None:
+        try:
+            return self.valid_ip_address(self.fraud_record.device_info.ip_address)
+        except FraudAnalysisError:
+            return None
+
+    def indexed_score(self, ip_address: ipaddress.IPv4Address | ipaddress.IPv6Address) -> float:
+        # Addresses outside of every indexed range carry no known risk
+        score = self.ip_index.score(ip_address)
+        return 0.0 if score is None else score
+
     @abstractmethod
     def assess_risk(self) -> float:
         pass
@@ -42,69 +232,291 @@ class IPAddressFraudAnalysis(FraudAnalysis):
 class IPAddressRecordFraudAnalysis(IPAddressFraudAnalysis):
     def assess_risk(self) -> float:
         ip_address = self.valid_ip_address(self.fraud_record.device_info.ip_address)
+        if self.ip_index is not None:
+            # Reputation score of the most specific known range containing the address
+            return self.indexed_score(ip_address)
+
         # Dummy logic for assessing risk based on IP address record
-        print(f"Checking IP address record: {ip_address}")
         return random.uniform(0, 1) # Dummy score
 
 
 class GeoIPAddressFraudAnalysis(IPAddressFraudAnalysis):
     def assess_risk(self) -> float:
         ip_address = self.valid_ip_address(self.fraud_record.device_info.ip_address)
+        if self.ip_index is not None:
+            # Risk score of the location the most specific known range is assigned to
+            return self.indexed_score(ip_address)
+
         # Dummy logic for assessing risk based on geolocation of IP address
-        print(f"Geolocating IP address: {ip_address}")
         return random.uniform(0, 1) # Dummy score
 
 
 class EmailDomainFraudAnalysis(FraudAnalysis):
+    # Assign a loaded DomainSet per subclass to score from local reference data
+    domain_set: DomainSet | None = None
+    LISTED_RISK_SCORE = 1.0
+
     @staticmethod
     def get_domain(email: str) -> str:
         return email.split('@')[1]
 
+    @property
+    def lookup_key(self) -> Hashable | None:
+        email = self.fraud_record.personal_info.email
+        if not email or "@" not in email:
+            return None
+
+        return self.get_domain(email)
+
+    def listed_score(self, domain: str) -> float:
+        # Subdomains of a listed domain are treated as listed
+        return self.LISTED_RISK_SCORE if self.domain_set.matches(domain) else 0.0
+
     @abstractmethod
     def assess_risk(self) -> float:
         pass
 
 
 class FreeEmailDomainFraudAnalysis(EmailDomainFraudAnalysis):
+    # Free email providers are common, so a listed domain is a weaker signal
+    LISTED_RISK_SCORE = 0.5
+
     def assess_risk(self) -> float:
         domain = self.get_domain(self.fraud_record.personal_info.email)
+        if self.domain_set is not None:
+            return self.listed_score(domain)
+
         # Dummy logic for assessing risk based on free email domain
-        print(f"Checking free email domain: {domain}")
         return random.uniform(0, 1) # Dummy score
 
 
 class DarkWebEmailDomainFraudAnalysis(EmailDomainFraudAnalysis):
     def assess_risk(self) -> float:
         domain = self.get_domain(self.fraud_record.personal_info.email)
+        if self.domain_set is not None:
+            return self.listed_score(domain)
+
         # Dummy logic for assessing risk based on dark web email domain
-        print(f"Checking dark web email domain: {domain}")
         return random.uniform(0, 1) # Dummy score
 
 
 class SpamRecordPhoneNumberFraudAnalysis(FraudAnalysis):
+    # Assign a loaded PhoneNumberIndex to score from local reference data
+    phone_index: PhoneNumberIndex | None = None
+    LISTED_RISK_SCORE = 1.0
+
+    @property
+    def lookup_key(self) -> Hashable | None:
+        # Differently formatted copies of one number share the normalized E.164 key
+        return normalize_phone_number(self.fraud_record.personal_info.phone_number)
+
     def assess_risk(self) -> float:
+        if self.phone_index is not None:
+            listed = self.fraud_record.personal_info.phone_number in self.phone_index
+            return self.LISTED_RISK_SCORE if listed else 0.0
+
         # Dummy logic for assessing risk based on spam phone number record
-        print(f"Checking spam phone number record: {self.fraud_record.personal_info.phone_number}")
         return random.uniform(0, 1) # Dummy score
 
 
+class VelocityFraudAnalysis(FraudAnalysis):
+    # Counts the application in the velocity tracker and scores it by the number of earlier
+    # applications sharing the same value. Every call counts, so there is no lookup key and the
+    # results are never cached or shared within a batch.
+    _velocity_tracker: VelocityTracker
+
+    def __init__(self, fraud_record: FraudRecord, velocity_tracker: VelocityTracker) -> None:
+        super().__init__(fraud_record)
+        self._velocity_tracker = velocity_tracker
+
+    @property
+    def velocity_tracker(self) -> VelocityTracker:
+        return self._velocity_tracker
+
+    @property
+    @abstractmethod
+    def velocity_key(self) -> Hashable:
+        pass
+
+    def assess_risk(self) -> float:
+        counts = self.velocity_tracker.record(self.velocity_key)
+        return max(
+            min(1.0, (count - 1) / window.limit)
+            for window, count in zip(self.velocity_tracker.windows, counts)
+        )
+
+
+class IPAddressVelocityFraudAnalysis(VelocityFraudAnalysis):
+    @property
+    def velocity_key(self) -> Hashable:
+        ip_address = self.fraud_record.device_info.ip_address
+        try:
+            return "ip_address", parse_ip_address(ip_address)
+        except ValueError:
+            return "ip_address", ip_address
+
+
+class SSNVelocityFraudAnalysis(VelocityFraudAnalysis):
+    @property
+    def velocity_key(self) -> Hashable:
+        return "ssn", self.fraud_record.personal_info.ssn
+
+
+class CardNumberVelocityFraudAnalysis(VelocityFraudAnalysis):
+    @property
+    def velocity_key(self) -> Hashable:
+        return "card_number", self.fraud_record.credit_card.card_number
+
+
 class FraudAnalyzer(ABC):
+    _executor: Executor | None
+    _timeouts: dict[type[FraudAnalysis], float]
+
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        timeouts: dict[type[FraudAnalysis], float] | None = None,
+    ) -> None:
+        # Without an executor the analyses run serially in the calling thread
+        self._executor = executor
+        self._timeouts = timeouts or {}
+
+    @property
+    def executor(self) -> Executor | None:
+        return self._executor
+
+    @property
+    def timeouts(self) -> dict[type[FraudAnalysis], float]:
+        return self._timeouts
+
     @abstractmethod
     def risk_assessments(self, fraud_record: FraudRecord) -> list[FraudAnalysis]:
         pass
 
     def assess_risks(self, fraud_record: FraudRecord) -> dict[str, float]:
-        assessment_scores = []
-        for assessment in self.risk_assessments(fraud_record):
-            assessment_scores.append(
-                assessment.assess_risk()
-            )
+        with instrumentation.span("analyzer", self.__class__.__name__):
+            assessments = self.risk_assessments(fraud_record)
+            if self.executor is None or len(assessments) < 2:
+                assessment_scores = [self._assess_risk(assessment) for assessment in assessments]
+            else:
+                assessment_scores = self._assess_concurrently(assessments)
 
         return {self.__class__.__name__: self._summarize_risk_scores(assessment_scores)}
 
+    def assess_risks_batch(self, fraud_records: list[FraudRecord]) -> list[dict[str, float]]:
+        # Analyses sharing a lookup key are run once for the whole batch. The key of every analysis
+        # is worked out once and handed on to the cache, it parses fields such as the IP address.
+        assessments = []
+        lookup_keys = []
+        positions = {}
+        record_positions = []
+        for fraud_record in fraud_records:
+            record_position = []
+            for assessment in self.risk_assessments(fraud_record):
+                lookup_key = assessment.lookup_key
+                batch_key = None if lookup_key is None else (type(assessment), lookup_key)
+                position = positions.get(batch_key)
+                if position is None:
+                    # Analyses without a lookup key are never shared
+                    position = len(assessments)
+                    assessments.append(assessment)
+                    lookup_keys.append(lookup_key)
+                    if batch_key is not None:
+                        positions[batch_key] = position
+                record_position.append(position)
+            record_positions.append(record_position)
+
+        with instrumentation.span("analyzer_batch", self.__class__.__name__):
+            if self.executor is None or len(assessments) < 2:
+                scores = [
+                    self._assess_risk(assessment, lookup_key)
+                    for assessment, lookup_key in zip(assessments, lookup_keys)
+                ]
+            else:
+                scores = self._assess_concurrently(assessments, lookup_keys)
+
+        return [
+            {
+                self.__class__.__name__: self._summarize_risk_scores(
+                    [scores[position] for position in record_position]
+                )
+            }
+            for record_position in record_positions
+        ]
+
+    async def assess_risks_async(self, fraud_record: FraudRecord) -> dict[str, float]:
+        assessments = self.risk_assessments(fraud_record)
+        with instrumentation.span("analyzer", self.__class__.__name__):
+            assessment_scores = await asyncio.gather(
+                *(self._assess_risk_async(assessment) for assessment in assessments)
+            )
+
+        return {self.__class__.__name__: self._summarize_risk_scores(list(assessment_scores))}
+
+    def _assess_risk(self, assessment: FraudAnalysis, lookup_key: Hashable | None = None) -> float:
+        # lookup_key saves working the key out again when the caller already has it
+        with instrumentation.span("analysis", assessment.__class__.__name__):
+            cache = FraudAnalysisCacheRegistry.get_cache(type(assessment))
+            if cache is not None and lookup_key is None:
+                lookup_key = assessment.lookup_key
+            if cache is None or lookup_key is None:
+                return assessment.assess_risk()
+
+            return cache.get_or_assess(lookup_key, assessment.assess_risk)
+
+    async def _assess_risk_async(self, assessment: FraudAnalysis) -> float:
+        timeout = self.timeouts.get(type(assessment))
+        try:
+            return await asyncio.wait_for(self._cached_assess_risk_async(assessment), timeout=timeout)
+        except TimeoutError:
+            raise FraudAnalysisError(
+                f"{assessment.__class__.__name__} timed out after {timeout} seconds"
+            )
+
+    async def _cached_assess_risk_async(self, assessment: FraudAnalysis) -> float:
+        with instrumentation.span("analysis", assessment.__class__.__name__):
+            cache = FraudAnalysisCacheRegistry.get_cache(type(assessment))
+            if cache is None or (lookup_key := assessment.lookup_key) is None:
+                return await assessment.assess_risk_async()
+
+            return await cache.get_or_assess_async(lookup_key, assessment.assess_risk_async)
+
+    def _assess_concurrently(
+        self, assessments: list[FraudAnalysis], lookup_keys: list[Hashable | None] | None = None
+    ) -> list[float]:
+        started_at = time.monotonic()
+        if lookup_keys is None:
+            lookup_keys = [None] * len(assessments)
+        futures = [
+            self.executor.submit(self._assess_risk, assessment, lookup_key)
+            for assessment, lookup_key in zip(assessments, lookup_keys)
+        ]
+        try:
+            # Collect in submission order so the summarized score matches the serial mode
+            return [
+                self._wait_for_score(assessment, future, started_at)
+                for assessment, future in zip(assessments, futures)
+            ]
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _wait_for_score(self, assessment: FraudAnalysis, future: Future, started_at: float) -> float:
+        timeout = self.timeouts.get(type(assessment))
+        if timeout is None:
+            return future.result()
+
+        remaining = max(0.0, started_at + timeout - time.monotonic())
+        try:
+            return future.result(timeout=remaining)
+        except TimeoutError:
+            raise FraudAnalysisError(
+                f"{assessment.__class__.__name__} timed out after {timeout} seconds"
+            )
+
     def _summarize_risk_scores(self, assessment_scores: list[float]) -> float:
         if assessment_scores:
-            return statistics.mean(assessment_scores)
+            return math.fsum(assessment_scores) / len(assessment_scores)
         
         return 0.0
 
@@ -132,7 +544,38 @@ class PhoneNumberFraudAnalyzer(FraudAnalyzer):
         ]
 
 
+class VelocityFraudAnalyzer(FraudAnalyzer):
+    _velocity_tracker: VelocityTracker
+
+    def __init__(
+        self,
+        velocity_tracker: VelocityTracker,
+        executor: Executor | None = None,
+        timeouts: dict[type[FraudAnalysis], float] | None = None,
+    ) -> None:
+        super().__init__(executor=executor, timeouts=timeouts)
+        self._velocity_tracker = velocity_tracker
+
+    @property
+    def velocity_tracker(self) -> VelocityTracker:
+        return self._velocity_tracker
+
+    def risk_assessments(self, fraud_record: FraudRecord) -> list[FraudAnalysis]:
+        assessments = [
+            IPAddressVelocityFraudAnalysis(fraud_record, self.velocity_tracker),
+            SSNVelocityFraudAnalysis(fraud_record, self.velocity_tracker),
+        ]
+        if fraud_record.credit_card is not None:
+            assessments.append(CardNumberVelocityFraudAnalysis(fraud_record, self.velocity_tracker))
+        return assessments
+
+    def _summarize_risk_scores(self, assessment_scores: list[float]) -> float:
+        # A burst on any single value is suspicious on its own, averaging would dilute it
+        return max(assessment_scores, default=0.0)
+
+
 class FraudAnalysisHandler(ABC):
+    RISK_THRESHOLD: float | None = None
     _next_handler: Self | None
 
     def __init__(self, fraud_analyzer: FraudAnalyzer) -> None:
@@ -151,6 +594,19 @@ class FraudAnalysisHandler(ABC):
     def fraud_analyzer(self) -> FraudAnalyzer:
         return self._fraud_analyzer
 
+    def applies_to(self, fraud_record: FraudRecord) -> bool:
+        return True
+
+    def exceeds_risk_threshold(self, handler_analysis: dict[str, float]) -> bool:
+        if self.RISK_THRESHOLD is None or not handler_analysis:
+            return False
+
+        return math.fsum(handler_analysis.values()) / len(handler_analysis) > self.RISK_THRESHOLD
+
+    def assess(self, fraud_record: FraudRecord) -> dict[str, float]:
+        with instrumentation.span("handler", self.__class__.__name__):
+            return self.fraud_analyzer.assess_risks(fraud_record)
+
     def handle(self, fraud_record: FraudRecord, analysis: dict[str, float]) -> dict[str, float]:
         # Pass to the next handler in the chain if exists, otherwise return the final analysis
         if self.next_handler:
@@ -159,25 +615,115 @@ class FraudAnalysisHandler(ABC):
         return analysis
 
     def start_handling(self, fraud_record: FraudRecord) -> dict[str, float]:
-        return self.handle(fraud_record, analysis={})
+        with instrumentation.span("chain", "sync"):
+            return self.handle(fraud_record, analysis={})
+
+    def handle_batch(
+        self,
+        fraud_records: list[FraudRecord],
+        analyses: list[dict[str, float]],
+        active: list[int],
+    ) -> list[dict[str, float]]:
+        # Only the records that have not short-circuited yet (active) reach this handler
+        applicable = [index for index in active if self.applies_to(fraud_records[index])]
+        with instrumentation.span("handler_batch", self.__class__.__name__):
+            handler_analyses = self.fraud_analyzer.assess_risks_batch(
+                [fraud_records[index] for index in applicable]
+            )
+        short_circuited = set()
+        for index, handler_analysis in zip(applicable, handler_analyses):
+            analyses[index].update(handler_analysis)
+            if self.exceeds_risk_threshold(handler_analysis):
+                short_circuited.add(index)
+
+        if self.next_handler:
+            return self.next_handler.handle_batch(
+                fraud_records,
+                analyses=analyses,
+                active=[index for index in active if index not in short_circuited],
+            )
+
+        return analyses
+
+    def start_handling_batch(self, fraud_records: list[FraudRecord]) -> list[dict[str, float]]:
+        with instrumentation.span("chain", "batch"):
+            return self.handle_batch(
+                fraud_records,
+                analyses=[{} for _ in fraud_records],
+                active=list(range(len(fraud_records))),
+            )
+
+    async def handle_async(
+        self,
+        fraud_record: FraudRecord,
+        analysis: dict[str, float],
+        pending: dict["FraudAnalysisHandler", asyncio.Task],
+    ) -> dict[str, float]:
+        # The assessment of this handler was already started by start_handling_async
+        if task := pending.get(self):
+            handler_analysis = await task
+            analysis.update(handler_analysis)
+            if self.exceeds_risk_threshold(handler_analysis):
+                return analysis
+
+        if self.next_handler:
+            return await self.next_handler.handle_async(fraud_record, analysis=analysis, pending=pending)
+
+        return analysis
+
+    async def start_handling_async(self, fraud_record: FraudRecord) -> dict[str, float]:
+        # Start every applicable handler speculatively, then consume the results in chain order.
+        # Whatever is still in flight after a short-circuit gets cancelled.
+        pending = {}
+        handler = self
+        while handler is not None:
+            if handler.applies_to(fraud_record):
+                pending[handler] = asyncio.create_task(
+                    handler.fraud_analyzer.assess_risks_async(fraud_record)
+                )
+            handler = handler.next_handler
+
+        try:
+            with instrumentation.span("chain", "async"):
+                return await self.handle_async(fraud_record, analysis={}, pending=pending)
+        finally:
+            for task in pending.values():
+                task.cancel()
+            await asyncio.gather(*pending.values(), return_exceptions=True)
 
 
 class DefaultAnalysisHandler(FraudAnalysisHandler):
     def handle(self, fraud_record: FraudRecord, analysis: dict[str, float]) -> dict[str, float]:
         # This will always perform risk assessment on device info
-        analysis.update(self.fraud_analyzer.assess_risks(fraud_record))
+        analysis.update(self.assess(fraud_record))
 
         return super().handle(fraud_record, analysis)
 
+class VelocityAnalysisHandler(FraudAnalysisHandler):
+    RISK_THRESHOLD = 0.7
+
+    def handle(self, fraud_record: FraudRecord, analysis: dict[str, float]) -> dict[str, float]:
+        # Short-circuit when the same IP address, SSN or card was seen too often recently
+        velocity_analysis = self.assess(fraud_record)
+        analysis.update(velocity_analysis)
+        if self.exceeds_risk_threshold(velocity_analysis):
+            return analysis
+
+        return super().handle(fraud_record, analysis=analysis)
+
+
 class EmailAnalysisHandler(FraudAnalysisHandler):
     RISK_THRESHOLD = 0.7
 
+    def applies_to(self, fraud_record: FraudRecord) -> bool:
+        return bool(fraud_record.personal_info.email)
+
     def handle(self, fraud_record: FraudRecord, analysis: dict[str, float]) -> dict[str, float]:
         # Demo logic to short-circuit if risk is above threshold
-        if fraud_record.personal_info.email:
-            email_analysis = self.fraud_analyzer.assess_risks(fraud_record)
+        if self.applies_to(fraud_record):
+            email_analysis = self.assess(fraud_record)
             analysis.update(email_analysis)
-            if statistics.mean(email_analysis.values()) > self.RISK_THRESHOLD:
+            if self.exceeds_risk_threshold(email_analysis):
                 return analysis
 
         return super().handle(fraud_record, analysis=analysis)
@@ -186,25 +732,82 @@ class EmailAnalysisHandler(FraudAnalysisHandler):
 class PhoneNumberAnalysisHandler(FraudAnalysisHandler):
     RISK_THRESHOLD = 0.5
 
+    def applies_to(self, fraud_record: FraudRecord) -> bool:
+        return bool(fraud_record.personal_info.phone_number)
+
     def handle(self, fraud_record: FraudRecord, analysis: dict[str, float]) -> dict[str, float]:
         # Demo logic to short-circuit if risk is above threshold
-        if fraud_record.personal_info.phone_number:
-            phone_analysis = self.fraud_analyzer.assess_risks(fraud_record)
+        if self.applies_to(fraud_record):
+            phone_analysis = self.assess(fraud_record)
             analysis.update(phone_analysis)
-            if statistics.mean(phone_analysis.values()) > self.RISK_THRESHOLD:
+            if self.exceeds_risk_threshold(phone_analysis):
                 return analysis
 
         return super().handle(fraud_record, analysis=analysis)
 
 
 class FraudAnalysisService:
+    _executor: Executor | None
+    _timeouts: dict[type[FraudAnalysis], float] | None
+    _velocity_tracker: VelocityTracker
+    _handler_chain: FraudAnalysisHandler
+
+    def __init__(
+        self,
+        executor: Executor | None = None,
+        timeouts: dict[type[FraudAnalysis], float] | None = None,
+        velocity_tracker: VelocityTracker | None = None,
+    ) -> None:
+        # Pass shared_analysis_executor() to run the analyses of each analyzer concurrently.
+        # Every service counts velocity in its own tracker unless one is shared explicitly.
+        self._executor = executor
+        self._timeouts = timeouts
+        self._velocity_tracker = VelocityTracker() if velocity_tracker is None else velocity_tracker
+        # The handlers and analyzers keep no per-record state, so the chain is built
+        # once and shared by every call and thread using this service.
+        self._handler_chain = self._build_handler_chain()
+
+    @property
+    def velocity_tracker(self) -> VelocityTracker:
+        return self._velocity_tracker
+
+    @property
+    def handler_chain(self) -> FraudAnalysisHandler:
+        return self._handler_chain
+
     # The service wraps the complexity of setting up the chain of responsibility
     # and provides a simple interface for analyzing fraud records.
     def analyze_fraud_record(self, fraud_record: FraudRecord) -> dict[str, float]:
-        # Setting up the chain of responsibility
-        ip_address_handler = DefaultAnalysisHandler(IPAddressFraudAnalyzer())
-        email_handler = EmailAnalysisHandler(EmailDomainFraudAnalyzer())
-        phone_handler = PhoneNumberAnalysisHandler(PhoneNumberFraudAnalyzer())
-        ip_address_handler.set_next_handler(email_handler).set_next_handler(phone_handler)
+        return self.handler_chain.start_handling(fraud_record)
+
+    def analyze_fraud_records(self, fraud_records: Iterable[FraudRecord]) -> list[dict[str, float]]:
+        # Results are returned in the same order as the given records
+        return self.handler_chain.start_handling_batch(list(fraud_records))
 
-        return ip_address_handler.start_handling(fraud_record)
\ No newline at end of file
+    async def analyze_fraud_record_async(self, fraud_record: FraudRecord) -> dict[str, float]:
+        return await self.handler_chain.start_handling_async(fraud_record)
+
+    def _build_handler_chain(self) -> FraudAnalysisHandler:
+        # Setting up the chain of responsibility
+        ip_address_handler = DefaultAnalysisHandler(
+            IPAddressFraudAnalyzer(executor=self._executor, timeouts=self._timeouts)
+        )
+        # Velocity comes right after the device check, so a short-circuit by a later handler
+        # never skips counting the application
+        velocity_handler = VelocityAnalysisHandler(self._build_velocity_analyzer())
+        email_handler = EmailAnalysisHandler(
+            EmailDomainFraudAnalyzer(executor=self._executor, timeouts=self._timeouts)
+        )
+        phone_handler = PhoneNumberAnalysisHandler(
+            PhoneNumberFraudAnalyzer(executor=self._executor, timeouts=self._timeouts)
+        )
+        (
+            ip_address_handler.set_next_handler(velocity_handler)
+            .set_next_handler(email_handler)
+            .set_next_handler(phone_handler)
+        )
+
+        return ip_address_handler
+
+    def _build_velocity_analyzer(self) -> FraudAnalyzer:
+        return VelocityFraudAnalyzer(self._velocity_tracker, executor=self._executor, timeouts=self._timeouts)
@@ -1,9 +1,14 @@
+import dataclasses
+import functools
 import re
-import statistics
+import time
 from abc import ABC
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import dataclass, field
 from typing import Self
 
-from fraud_detection_system.database import DatabaseConnection
+from fraud_detection_system.database import AbstractDatabaseConnection, DatabaseConnection, stored_version
+from fraud_detection_system.events import AccountEvent, DeferredEvents, EventBus, account_events
 from fraud_detection_system.models import (
     Account,
     AccountStatusEnum,
@@ -16,31 +21,52 @@ from fraud_detection_system.validators import (
     ValidationError,
 )
 from fraud_detection_system.fraud_analysis import FraudAnalysisService
+from fraud_detection_system.instrumentation import instrumentation
+from fraud_detection_system.risk_model import MeanRiskModel, RiskModel
+
+
+MAX_UPDATE_ATTEMPTS = 8
 
 
 class AccountContextError(Exception):
     pass
 
 
+class ConcurrentUpdateError(AccountContextError):
+    pass
+
+
+@dataclass(frozen=True)
+class ReviewAssessment:
+    # What a review found for a fraud record. It only depends on the record, so it is worked out
+    # once and applied again when a concurrent change makes the service retry the update.
+    validation_errors: list[ValidationError]
+    analysis: dict[str, float]
+    # Scored ahead for a whole batch, None lets the risk model of the account score the analysis
+    fraud_score: float | None = None
+
+
 class AccountContext:
     _fraud_analysis_service: FraudAnalysisService
+    _risk_model: RiskModel
     _account: Account | None
     _account_state: "AccountState"
 
-    def __init__(self, account: Account, fraud_analysis_service: FraudAnalysisService) -> None:
+    def __init__(
+        self,
+        account: Account,
+        fraud_analysis_service: FraudAnalysisService,
+        risk_model: RiskModel | None = None,
+        event_bus: EventBus | DeferredEvents | None = None,
+    ) -> None:
         self._fraud_analysis_service = fraud_analysis_service
+        self._risk_model = MeanRiskModel() if risk_model is None else risk_model
+        self._event_bus = account_events if event_bus is None else event_bus
         self._account = account
         self._initial_state()
 
     def _initial_state(self) -> None:
-        state_map = {
-            AccountStatusEnum.PENDING: PendingAccountState,
-            AccountStatusEnum.REVIEWED: ReviewAccountState,
-            AccountStatusEnum.APPROVED: ApproveAccountState,
-            AccountStatusEnum.DECLINED: DeclineAccountState,
-            AccountStatusEnum.REAPPLIED: ReapplyAccountState,
-        }
-        account_state_cls = state_map.get(self._account.status)
+        account_state_cls = ACCOUNT_STATES.get(self._account.status)
         if not account_state_cls:
             raise AccountContextError(f"Unknown account status: {self._account.status}")
         
@@ -51,6 +77,14 @@ class AccountContext:
     def fraud_analysis_service(self) -> FraudAnalysisService:
         return self._fraud_analysis_service
 
+    @property
+    def risk_model(self) -> RiskModel:
+        return self._risk_model
+
+    @property
+    def event_bus(self) -> EventBus | DeferredEvents:
+        return self._event_bus
+
     @property
     def account_state(self) -> "AccountState":
         return self._account_state
@@ -63,20 +97,47 @@ class AccountContext:
     def account(self) -> Account | None:
         return self._account
 
-    def update_account(self, status: AccountStatusEnum | None = None, analysis: dict[str, float] | None = None, validation_errors: list[ValidationError] | None = None) -> None:
+    def update_account(self, status: AccountStatusEnum | None = None, analysis: dict[str, float] | None = None, validation_errors: list[ValidationError] | None = None, fraud_score: float | None = None) -> None:
+        # A fraud_score scored ahead (for a whole batch) takes the place of scoring the analysis
+        previous_status, previous_fraud_score = self._account.status, self._account.fraud_score
         if status is not None:
             self._account.status = status
-        if analysis is not None:
-            self._account.fraud_score = round(statistics.mean(analysis.values()), 2) if analysis else 0.0
+        if fraud_score is None and analysis is not None:
+            fraud_score = self._risk_model.score(analysis) if analysis else 0.0
+        if fraud_score is not None:
+            self._account.fraud_score = round(fraud_score, 2)
         if validation_errors is not None:
             self._account.data_validation_errors = [str(error) for error in validation_errors]
-        # Publish updates to database or event bus here
+        # Queued for the background publisher, the sinks never run on the review path
+        if self._event_bus.active and (
+            self._account.status != previous_status or self._account.fraud_score != previous_fraud_score
+        ):
+            self._event_bus.publish(
+                AccountEvent(
+                    account_id=self._account.account_id,
+                    status=self._account.status,
+                    fraud_score=self._account.fraud_score,
+                    previous_status=previous_status,
+                    previous_fraud_score=previous_fraud_score,
+                    timestamp=time.time(),
+                )
+            )
     
-    def do_review(self) -> None:
+    def do_review(self, assessment: ReviewAssessment | None = None) -> None:
         if ReviewAccountState not in self.account_state.next_state_on_success():
             raise AccountContextError("Review action is currently not available")
         
-        ReviewAccountState(self).review()
+        ReviewAccountState(self).review(assessment)
+
+    @staticmethod
+    def do_review_many(contexts: Sequence["AccountContext"]) -> None:
+        # Reviews every context at once, the contexts must share one fraud analysis service and
+        # risk model
+        for context in contexts:
+            if ReviewAccountState not in context.account_state.next_state_on_success():
+                raise AccountContextError("Review action is currently not available")
+
+        ReviewAccountState.review_many(contexts)
 
     def do_approve(self) -> None:
         if ApproveAccountState not in self.account_state.next_state_on_success():
@@ -130,45 +191,105 @@ class PendingAccountState(AccountState):
 
 
 class ReviewAccountState(AccountState):
-    def review(self) -> None:
-        self.context.account_state = self
-        validation_errors = self._run_data_validation()
+    def review(self, assessment: ReviewAssessment | None = None) -> None:
+        with instrumentation.span("state", "review"):
+            self.context.account_state = self
+            if assessment is None:
+                assessment = self.assess(self.context.account.fraud_record, self.context.fraud_analysis_service)
+
+            self._apply(assessment)
+
+    @classmethod
+    def review_many(cls, contexts: Sequence[AccountContext]) -> None:
+        # Same outcome as reviewing each context, but the valid records are scored in one batch
+        if not contexts:
+            return
+
+        with instrumentation.span("state", "review_many"):
+            assessments = cls.assess_many(
+                [context.account.fraud_record for context in contexts],
+                contexts[0].fraud_analysis_service,
+                contexts[0].risk_model,
+            )
+            for context, assessment in zip(contexts, assessments):
+                state = cls(context)
+                context.account_state = state
+                state._apply(assessment)
+
+    @classmethod
+    def assess(cls, fraud_record: FraudRecord, fraud_analysis_service: FraudAnalysisService) -> ReviewAssessment:
+        # Validation and the fraud analysis, the part of a review that must not be repeated: the
+        # analyzers record every record they see for the velocity checks
+        validation_errors = cls._run_data_validation(fraud_record)
         analysis = {}
         if not validation_errors:
-            analysis = self.context.fraud_analysis_service.analyze_fraud_record(self.context.account.fraud_record)
-            print(f"Fraud Analysis Results: {analysis}")
-        
-        self.context.update_account(status=AccountStatusEnum.REVIEWED, analysis=analysis, validation_errors=validation_errors)
-        print("Processed to Reviewed State")
+            analysis = fraud_analysis_service.analyze_fraud_record(fraud_record)
+
+        return ReviewAssessment(validation_errors, analysis)
+
+    @classmethod
+    def assess_many(
+        cls,
+        fraud_records: Sequence[FraudRecord],
+        fraud_analysis_service: FraudAnalysisService,
+        risk_model: RiskModel,
+    ) -> list[ReviewAssessment]:
+        # Like assess, with the valid records analyzed and scored by the risk model in one batch
+        validation_errors = [cls._run_data_validation(fraud_record) for fraud_record in fraud_records]
+        valid_rows = [row for row, errors in enumerate(validation_errors) if not errors]
+        analyses = fraud_analysis_service.analyze_fraud_records(fraud_records[row] for row in valid_rows)
+        scored = {
+            row: (analysis, fraud_score)
+            for row, analysis, fraud_score in zip(valid_rows, analyses, risk_model.score_many(analyses))
+        }
+        return [
+            ReviewAssessment(errors, *scored.get(row, ({}, 0.0)))
+            for row, errors in enumerate(validation_errors)
+        ]
 
     @staticmethod
     def next_state_on_success() -> tuple[type[AccountState], ...]:
         return (ApproveAccountState, DeclineAccountState, ReapplyAccountState,)
 
-    def _run_data_validation(self) -> list[ValidationError]:
-        validators = self._build_data_validators()
+    def _apply(self, assessment: ReviewAssessment) -> None:
+        self.context.update_account(
+            status=AccountStatusEnum.REVIEWED,
+            analysis=assessment.analysis,
+            validation_errors=assessment.validation_errors,
+            fraud_score=assessment.fraud_score,
+        )
+
+    @classmethod
+    def _run_data_validation(cls, fraud_record: FraudRecord) -> list[ValidationError]:
         validation_errors = []
-        for validator in validators:
-            errors = validator.validate(self.context.account.fraud_record)
+        for validator in cls._compile_data_validators(fraud_record.payment_method):
+            errors = validator.validate(fraud_record)
             validation_errors.extend(errors)
 
         return validation_errors
 
-    def _build_data_validators(self) -> list[DataValidator]:
+    def _build_data_validators(self) -> tuple[DataValidator, ...]:
+        return self._compile_data_validators(self.context.account.fraud_record.payment_method)
+
+    @staticmethod
+    @functools.cache
+    def _compile_data_validators(payment_method: PaymentMethodEnum) -> tuple[DataValidator, ...]:
+        # Built once per payment method and shared by every review
         validator_builder = DataValidatorBuilder()
         validator_builder.with_personal_info_validator()
-        if self.context.account.fraud_record.payment_method is PaymentMethodEnum.CREDIT_CARD:
+        if payment_method is PaymentMethodEnum.CREDIT_CARD:
             validator_builder.with_credit_card_data_validator()
-        elif self.context.account.fraud_record.payment_method is PaymentMethodEnum.ACH:
+        elif payment_method is PaymentMethodEnum.ACH:
             validator_builder.with_ach_data_validator()
         
-        return validator_builder.build_data_validators()
+        return tuple(validator_builder.build_data_validators())
 
 
 class ApproveAccountState(AccountState):
     def approve(self) -> None:
-        self.context.account_state = self
-        self.context.update_account(status=AccountStatusEnum.APPROVED)
+        with instrumentation.span("state", "approve"):
+            self.context.account_state = self
+            self.context.update_account(status=AccountStatusEnum.APPROVED)
 
     @staticmethod
     def next_state_on_success() -> tuple[type[AccountState], ...]:
@@ -177,8 +298,9 @@ class ApproveAccountState(AccountState):
 
 class DeclineAccountState(AccountState):
     def decline(self) -> None:
-        self.context.account_state = self
-        self.context.update_account(status=AccountStatusEnum.DECLINED)
+        with instrumentation.span("state", "decline"):
+            self.context.account_state = self
+            self.context.update_account(status=AccountStatusEnum.DECLINED)
 
     @staticmethod
     def next_state_on_success() -> tuple[type[AccountState], ...]:
@@ -187,68 +309,320 @@ class DeclineAccountState(AccountState):
 
 class ReapplyAccountState(AccountState):
     def reapply(self) -> None:
-        self.context.account_state = self
-        # Do some pre-review logic here
-        self.context.update_account(status=AccountStatusEnum.REAPPLIED)
-        print("Processed to Reapplied State")
+        with instrumentation.span("state", "reapply"):
+            self.context.account_state = self
+            # Do some pre-review logic here
+            self.context.update_account(status=AccountStatusEnum.REAPPLIED)
 
     @staticmethod
     def next_state_on_success() -> tuple[type[AccountState], ...]:
         return (ReviewAccountState,)
 
 
+ACCOUNT_STATES: dict[AccountStatusEnum, type[AccountState]] = {
+    AccountStatusEnum.PENDING: PendingAccountState,
+    AccountStatusEnum.REVIEWED: ReviewAccountState,
+    AccountStatusEnum.APPROVED: ApproveAccountState,
+    AccountStatusEnum.DECLINED: DeclineAccountState,
+    AccountStatusEnum.REAPPLIED: ReapplyAccountState,
+}
+
+
+def _action_name(account_state_cls: type[AccountState]) -> str:
+    return re.match(r'^[A-Z][a-z]*', account_state_cls.__name__).group().lower()
+
+
+def _compile_transitions() -> dict[AccountStatusEnum, dict[str, AccountStatusEnum]]:
+    # The allowed actions of every status and the status each of them leads to, read once from
+    # the next_state_on_success graph of the states
+    state_statuses = {account_state_cls: status for status, account_state_cls in ACCOUNT_STATES.items()}
+    return {
+        status: {
+            _action_name(next_state_cls): state_statuses[next_state_cls]
+            for next_state_cls in account_state_cls.next_state_on_success()
+        }
+        for status, account_state_cls in ACCOUNT_STATES.items()
+    }
+
+
+ACCOUNT_TRANSITIONS = _compile_transitions()
+NEXT_ACTIONS: dict[AccountStatusEnum, tuple[str, ...]] = {
+    status: tuple(transitions) for status, transitions in ACCOUNT_TRANSITIONS.items()
+}
+
+
+@dataclass
+class BulkTransitionResult:
+    # The transitioned accounts in request order, and why each other account id was skipped
+    accounts: list[Account] = field(default_factory=list)
+    rejected: dict[str, str] = field(default_factory=dict)
+
+
 class FraudDetectionService:
     _validator_builder: DataValidatorBuilder
-    _database_connection: DatabaseConnection
+    _database_connection: AbstractDatabaseConnection
 
     def __init__(
         self,
         fraud_analysis_service: FraudAnalysisService = FraudAnalysisService(),
-        database_connection: DatabaseConnection = DatabaseConnection(),
+        database_connection: AbstractDatabaseConnection = DatabaseConnection(),
+        risk_model: RiskModel | None = None,
+        event_bus: EventBus | None = None,
     ) -> None:
         self._fraud_analysis_service = fraud_analysis_service
         self._database_connection = database_connection
+        self._risk_model = MeanRiskModel() if risk_model is None else risk_model
+        self._event_bus = account_events if event_bus is None else event_bus
     
     def _get_account(self, account_id: str) -> Account:
         return self._database_connection.get_fraud_record(account_id)
+
+    def get_account(self, account_id: str) -> Account | None:
+        return self._get_account(account_id)
     
-    def _store_account(self, account: Account) -> None:
-        self._database_connection.store_fraud_record(account.account_id, account)
-    
+    def _account_context(self, account: Account) -> AccountContext:
+        return AccountContext(account, self._fraud_analysis_service, self._risk_model, self._event_bus)
+
     def get_account_next_actions(self, account: Account) -> tuple[str, ...]:
-        context = AccountContext(account, self._fraud_analysis_service)
-        account_states = context.account_state.next_state_on_success()
-        actions = []
-        for account_state in account_states:
-            if action_name := re.match(r'^[A-Z][a-z]*', account_state.__name__):
-                actions.append(action_name.group().lower())
-        
-        return tuple(actions)
+        next_actions = NEXT_ACTIONS.get(account.status)
+        if next_actions is None:
+            raise AccountContextError(f"Unknown account status: {account.status}")
+
+        return next_actions
 
     def review_fraud_record(self, account: Account) -> Account:
-        context = AccountContext(account, self._fraud_analysis_service)
-        context.do_review()
-        self._store_account(context.account)  # Store the fraud record in the dummy database
-        return context.account
+        # The record is assessed once, a concurrent change of the account only repeats the
+        # state change and the scoring
+        self._check_action(account, "review")
+        assessment = ReviewAccountState.assess(account.fraud_record, self._fraud_analysis_service)
+        return self._update_account(
+            account.account_id, self._review(account.fraud_record, assessment), new_account=account
+        )
+
+    def review_fraud_records(self, accounts: Sequence[Account]) -> list[Account]:
+        # Reviews like review_fraud_record, with the fraud analysis of all accounts run as one batch
+        for account in accounts:
+            self._check_action(account, "review")
+        assessments = ReviewAccountState.assess_many(
+            [account.fraud_record for account in accounts], self._fraud_analysis_service, self._risk_model
+        )
+        new_accounts = {account.account_id: account for account in accounts}
+        reviews = {
+            account.account_id: self._review(account.fraud_record, assessment)
+            for account, assessment in zip(accounts, assessments)
+        }
+        with instrumentation.span("state", "store_reviews"):
+            reviewed, conflicting = self._compare_and_store_many(
+                list(reviews),
+                lambda account_id, stored: self._prepare_update(
+                    stored, reviews[account_id], new_account=new_accounts[account_id]
+                ),
+            )
+        if conflicting:
+            raise ConcurrentUpdateError(
+                f"Accounts {', '.join(conflicting)} kept changing, gave up after {MAX_UPDATE_ATTEMPTS} attempts"
+            )
+        return [reviewed[account.account_id] for account in accounts]
+
+    def review_many(self, accounts: Sequence[Account]) -> list[Account | Exception]:
+        # Reviews like review_fraud_records, but every account succeeds or fails on its own: the
+        # result holds the reviewed account or the error of each account, in order. The records
+        # are assessed once, a failing store is never answered by reviewing a record again.
+        results: list[Account | Exception | None] = [None] * len(accounts)
+        rows = {}
+        for row, account in enumerate(accounts):
+            if account.account_id in rows:
+                results[row] = AccountContextError(f"Account {account.account_id} is already being reviewed")
+                continue
+            try:
+                self._check_action(account, "review")
+            except AccountContextError as error:
+                results[row] = error
+            else:
+                rows[account.account_id] = row
+        assessments = ReviewAccountState.assess_many(
+            [accounts[row].fraud_record for row in rows.values()], self._fraud_analysis_service, self._risk_model
+        )
+        reviews = {
+            account_id: self._review(accounts[row].fraud_record, assessment)
+            for (account_id, row), assessment in zip(rows.items(), assessments)
+        }
+        prepared = {}
+
+        def prepare(account_id: str, stored: Account | None) -> tuple[Account, DeferredEvents]:
+            prepared[account_id] = self._prepare_update(
+                stored, reviews[account_id], new_account=accounts[rows[account_id]]
+            )
+            return prepared[account_id]
+
+        with instrumentation.span("state", "store_reviews"):
+            try:
+                reviewed, conflicting = self._compare_and_store_many(list(reviews), prepare)
+            except Exception:
+                reviewed, conflicting = self._finish_reviews(reviews, prepared, accounts, rows, results), []
+        for account_id in conflicting:
+            results[rows[account_id]] = ConcurrentUpdateError(
+                f"Account {account_id} kept changing, gave up after {MAX_UPDATE_ATTEMPTS} attempts"
+            )
+        for account_id, account in reviewed.items():
+            results[rows[account_id]] = account
+        return results
+
+    def _finish_reviews(
+        self,
+        reviews: dict[str, Callable[[AccountContext], None]],
+        prepared: dict[str, tuple[Account, DeferredEvents]],
+        accounts: Sequence[Account],
+        rows: dict[str, int],
+        results: list[Account | Exception | None],
+    ) -> dict[str, Account]:
+        # The bulk store failed part way: the reviews that landed are kept, the others are stored
+        # one by one with the assessment they already have. A store error only fails its account.
+        current = self._database_connection.get_many(list(reviews))
+        reviewed = {}
+        for account_id, review in reviews.items():
+            update = prepared.get(account_id)
+            if update is not None and current.get(account_id) == update[0]:
+                account, events = update
+                events.commit()
+                reviewed[account_id] = account
+                continue
+            try:
+                reviewed[account_id] = self._update_account(account_id, review, new_account=accounts[rows[account_id]])
+            except Exception as error:
+                results[rows[account_id]] = error
+        return reviewed
 
     def approve_fraud_record(self, account_id: str) -> Account:
-        account = self._get_account(account_id)
-        context = AccountContext(account, self._fraud_analysis_service)
-        context.do_approve()
-        self._store_account(context.account)
-        return context.account
+        return self._update_account(account_id, AccountContext.do_approve)
 
     def decline_fraud_record(self, account_id: str) -> Account:
-        account = self._get_account(account_id)
-        context = AccountContext(account, self._fraud_analysis_service)
-        context.do_decline()
-        self._store_account(context.account)
-        return context.account
-    
+        return self._update_account(account_id, AccountContext.do_decline)
+
+    def approve_many(self, account_ids: Iterable[str]) -> BulkTransitionResult:
+        return self._transition_many(account_ids, "approve", AccountContext.do_approve)
+
+    def decline_many(self, account_ids: Iterable[str]) -> BulkTransitionResult:
+        return self._transition_many(account_ids, "decline", AccountContext.do_decline)
+
     def reapply_fraud_record(self, account_id: str, fraud_record: FraudRecord) -> Account:
-        account = self._get_account(account_id)
-        account.fraud_record = fraud_record
-        context = AccountContext(account, self._fraud_analysis_service)
-        context.do_reapply()
-        self._store_account(context.account)
-        return self.review_fraud_record(context.account)
+        # Reapplying and the review of the new record are stored as one update, the new record
+        # is assessed once however often the update is retried. A rejected reapply never reaches
+        # the analysis, so it is not counted in the velocity checks.
+        stored = self._get_account(account_id)
+        if stored is None:
+            raise AccountContextError(f"Unknown account: {account_id}")
+        self._check_action(stored, "reapply")
+        assessment = ReviewAccountState.assess(fraud_record, self._fraud_analysis_service)
+        review = self._review(fraud_record, assessment)
+
+        def reapply(context: AccountContext) -> None:
+            context.do_reapply()
+            review(context)
+
+        return self._update_account(account_id, reapply)
+
+    @staticmethod
+    def _check_action(account: Account, action: str) -> None:
+        if action not in ACCOUNT_TRANSITIONS.get(account.status, {}):
+            raise AccountContextError(f"{action.capitalize()} action is currently not available")
+
+    @staticmethod
+    def _review(fraud_record: FraudRecord, assessment: ReviewAssessment) -> Callable[[AccountContext], None]:
+        def review(context: AccountContext) -> None:
+            context.account.fraud_record = fraud_record
+            context.do_review(assessment)
+
+        return review
+
+    def _prepare_update(
+        self,
+        stored: Account | None,
+        transition: Callable[[AccountContext], None],
+        new_account: Account | None = None,
+    ) -> tuple[Account, DeferredEvents]:
+        # Runs the transition on a copy carrying the next version, the stored account stays as
+        # it is for concurrent readers. Its events wait until the copy is stored. new_account is
+        # the account to start from while nothing is stored yet.
+        if stored is None:
+            account = dataclasses.replace(new_account)
+        else:
+            account = dataclasses.replace(stored, version=stored.version + 1)
+        events = DeferredEvents(self._event_bus)
+        context = AccountContext(account, self._fraud_analysis_service, self._risk_model, events)
+        transition(context)
+        return context.account, events
+
+    def _update_account(
+        self,
+        account_id: str,
+        transition: Callable[[AccountContext], None],
+        new_account: Account | None = None,
+    ) -> Account:
+        # Optimistic concurrency: the copy is only stored if no other writer stored a new version
+        # of the account in between, otherwise the transition is retried on a fresh read. Workers
+        # on different accounts never wait for each other.
+        for _ in range(MAX_UPDATE_ATTEMPTS):
+            stored = self._get_account(account_id)
+            if stored is None and new_account is None:
+                raise AccountContextError(f"Unknown account: {account_id}")
+            account, events = self._prepare_update(stored, transition, new_account)
+            if self._database_connection.compare_and_store(account_id, stored_version(stored), account):
+                events.commit()
+                return account
+
+        raise ConcurrentUpdateError(
+            f"Account {account_id} kept changing, gave up after {MAX_UPDATE_ATTEMPTS} attempts"
+        )
+
+    def _compare_and_store_many(
+        self,
+        account_ids: list[str],
+        prepare: Callable[[str, Account | None], tuple[Account, DeferredEvents] | None],
+    ) -> tuple[dict[str, Account], list[str]]:
+        # One bulk read and one bulk compare-and-store per attempt, only the accounts that
+        # changed concurrently go into the next attempt. prepare returns None for an account it
+        # skips. Returns the stored accounts and the ids that kept changing.
+        stored_accounts = {}
+        for _ in range(MAX_UPDATE_ATTEMPTS):
+            if not account_ids:
+                break
+            current = self._database_connection.get_many(account_ids)
+            updates = {}
+            for account_id in account_ids:
+                if (update := prepare(account_id, current.get(account_id))) is not None:
+                    updates[account_id] = update
+            stored_ids = self._database_connection.compare_and_store_many(
+                {account_id: account for account_id, (account, _) in updates.items()},
+                {account_id: stored_version(current.get(account_id)) for account_id in updates},
+            )
+            for account_id in stored_ids:
+                account, events = updates[account_id]
+                events.commit()
+                stored_accounts[account_id] = account
+            account_ids = [account_id for account_id in updates if account_id not in stored_ids]
+        return stored_accounts, account_ids
+
+    def _transition_many(
+        self, account_ids: Iterable[str], action: str, transition: Callable[[AccountContext], None]
+    ) -> BulkTransitionResult:
+        # Unknown accounts and accounts whose status does not allow the action are rejected
+        # without failing the others
+        requested_ids = list(dict.fromkeys(account_ids))
+        result = BulkTransitionResult()
+
+        def prepare(account_id: str, stored: Account | None) -> tuple[Account, DeferredEvents] | None:
+            if stored is None:
+                result.rejected[account_id] = f"Unknown account: {account_id}"
+            elif action not in ACCOUNT_TRANSITIONS.get(stored.status, {}):
+                result.rejected[account_id] = f"{action.capitalize()} action is currently not available"
+            else:
+                return self._prepare_update(stored, transition)
+            return None
+
+        with instrumentation.span("state", f"{action}_many"):
+            transitioned, conflicting = self._compare_and_store_many(requested_ids, prepare)
+        for account_id in conflicting:
+            result.rejected[account_id] = f"Account {account_id} kept changing"
+        result.accounts = [transitioned[account_id] for account_id in requested_ids if account_id in transitioned]
+        return result
@@ -0,0 +1,141 @@
+# Timing instrumentation for the fraud review pipeline.
+#
+# The pipeline wraps every analysis, analyzer, handler, validation pass and state transition in
+# instrumentation.span(stage, name). While disabled (the default) span() returns a shared no-op
+# context manager, so the hot path pays for one attribute check. Once enabled, every span feeds
+# an in-process latency histogram and the registered hooks.
+import contextlib
+import math
+import threading
+import time
+from collections.abc import Callable
+from contextlib import AbstractContextManager
+
+
+SAMPLE_SIZE = 10_000
+
+SpanHook = Callable[[str, float], None]
+
+_NULL_SPAN = contextlib.nullcontext()
+
+
+class LatencyHistogram:
+    # Exact count, total and max, percentiles over a ring of the most recent samples
+    _sample_size: int
+    _samples: list[float]
+    _lock: threading.Lock
+
+    def __init__(self, sample_size: int = SAMPLE_SIZE) -> None:
+        self._sample_size = sample_size
+        self._samples = []
+        self._lock = threading.Lock()
+        self._count = 0
+        self._total = 0.0
+        self._max = 0.0
+
+    def record(self, elapsed: float) -> None:
+        with self._lock:
+            if len(self._samples) < self._sample_size:
+                self._samples.append(elapsed)
+            else:
+                self._samples[self._count % self._sample_size] = elapsed
+            self._count += 1
+            self._total += elapsed
+            self._max = max(self._max, elapsed)
+
+    def snapshot(self) -> dict[str, float]:
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total, maximum = self._count, self._total, self._max
+
+        return {
+            "count": count,
+            "mean": total / count if count else 0.0,
+            "p50": self._percentile(samples, 50),
+            "p95": self._percentile(samples, 95),
+            "p99": self._percentile(samples, 99),
+            "max": maximum,
+        }
+
+    @staticmethod
+    def _percentile(samples: list[float], percentile: float) -> float:
+        # Nearest-rank percentile
+        if not samples:
+            return 0.0
+
+        return samples[max(0, math.ceil(percentile / 100 * len(samples)) - 1)]
+
+
+class _Span:
+    __slots__ = ("_instrumentation", "_key", "_started_at")
+
+    def __init__(self, instrumentation: "Instrumentation", key: str) -> None:
+        self._instrumentation = instrumentation
+        self._key = key
+
+    def __enter__(self) -> None:
+        self._started_at = time.perf_counter()
+
+    def __exit__(self, *exc_info) -> None:
+        self._instrumentation.record(self._key, time.perf_counter() - self._started_at)
+
+
+class Instrumentation:
+    _enabled: bool
+    _histograms: dict[str, LatencyHistogram]
+    _hooks: tuple[SpanHook, ...]
+    _lock: threading.Lock
+
+    def __init__(self, enabled: bool = False) -> None:
+        self._enabled = enabled
+        self._histograms = {}
+        self._hooks = tuple()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def enable(self) -> None:
+        self._enabled = True
+
+    def disable(self) -> None:
+        self._enabled = False
+
+    def add_hook(self, hook: SpanHook) -> None:
+        # Hooks receive the span key ("stage.name") and the elapsed seconds of every span
+        with self._lock:
+            self._hooks = (*self._hooks, hook)
+
+    def remove_hook(self, hook: SpanHook) -> None:
+        with self._lock:
+            self._hooks = tuple(registered for registered in self._hooks if registered is not hook)
+
+    def span(self, stage: str, name: str) -> AbstractContextManager:
+        if not self._enabled:
+            return _NULL_SPAN
+
+        return _Span(self, f"{stage}.{name}")
+
+    def record(self, key: str, elapsed: float) -> None:
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        histogram.record(elapsed)
+        for hook in self._hooks:
+            hook(key, elapsed)
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            histograms = dict(self._histograms)
+
+        return {key: histogram.snapshot() for key, histogram in sorted(histograms.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms = {}
+
+
+# The instrumentation used by the fraud pipeline
+instrumentation = Instrumentation()
@@ -0,0 +1,206 @@
+# A longest-prefix-match index over IPv4 and IPv6 CIDR ranges, used as the local data source
+# of the IP address fraud analyses.
+#
+# Overlapping CIDR ranges are flattened into disjoint intervals when the index is built, so a
+# lookup is a single binary search over sorted interval starts. The intervals are saved as flat
+# arrays and memory-mapped on load, no Python object is created per range.
+import argparse
+import bisect
+import csv
+import ipaddress
+import mmap
+import struct
+from array import array
+from typing import Self
+
+
+MAGIC = b"FDIPIDX1"
+BYTE_ORDER_MARK = 0x01020304
+# magic, byte order mark, reserved, IPv4 count, IPv6 count. The arrays use the native byte order.
+HEADER = struct.Struct("=8sIIQQ")
+_UINT64_MASK = (1 << 64) - 1
+
+IPAddress = ipaddress.IPv4Address | ipaddress.IPv6Address
+
+
+class IPPrefixIndexError(Exception):
+    pass
+
+
+class _IPv6Keys:
+    # Presents the split 128-bit interval bounds as a sequence of ints for bisect
+    def __init__(self, high: memoryview, low: memoryview) -> None:
+        self._high = high
+        self._low = low
+
+    def __len__(self) -> int:
+        return len(self._high)
+
+    def __getitem__(self, index: int) -> int:
+        return self._high[index] << 64 | self._low[index]
+
+
+def _flatten(ranges: list[tuple[int, int, int, float]]) -> list[tuple[int, int, float]]:
+    # ranges are (start, end, prefix length, score). CIDR ranges are either nested or disjoint,
+    # so a sweep with a stack of enclosing ranges yields the most specific score for every address.
+    segments = []
+
+    def emit(start: int, end: int, score: float) -> None:
+        if start > end:
+            return
+        if segments and segments[-1][1] == start - 1 and segments[-1][2] == score:
+            segments[-1] = (segments[-1][0], end, score)
+        else:
+            segments.append((start, end, score))
+
+    stack = []
+    cursor = 0
+    for start, end, _, score in sorted(ranges, key=lambda item: (item[0], item[2])):
+        while stack and stack[-1][0] < start:
+            enclosing_end, enclosing_score = stack.pop()
+            emit(cursor, enclosing_end, enclosing_score)
+            cursor = max(cursor, enclosing_end + 1)
+        if stack:
+            emit(cursor, start - 1, stack[-1][1])
+        stack.append((end, score))
+        cursor = start
+
+    while stack:
+        enclosing_end, enclosing_score = stack.pop()
+        emit(cursor, enclosing_end, enclosing_score)
+        cursor = max(cursor, enclosing_end + 1)
+
+    return segments
+
+
+def _pad(buffer: bytearray) -> None:
+    buffer.extend(b"\0" * (-len(buffer) % 8))
+
+
+class IPPrefixIndex:
+    _mmap: mmap.mmap | None
+    _views: list[memoryview]
+    _ipv4_starts: memoryview
+    _ipv4_ends: memoryview
+    _ipv4_scores: memoryview
+    _ipv6_starts: _IPv6Keys
+    _ipv6_ends: _IPv6Keys
+    _ipv6_scores: memoryview
+
+    def __init__(self, buffer: bytes | mmap.mmap) -> None:
+        if len(buffer) < HEADER.size:
+            raise IPPrefixIndexError("Truncated IP prefix index")
+        magic, byte_order_mark, _, ipv4_count, ipv6_count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise IPPrefixIndexError("Not an IP prefix index")
+        if byte_order_mark != BYTE_ORDER_MARK:
+            raise IPPrefixIndexError("IP prefix index was built on a platform with another byte order")
+
+        self._mmap = buffer if isinstance(buffer, mmap.mmap) else None
+        view = memoryview(buffer)
+        self._views = [view]
+        offset = HEADER.size
+
+        def section(count: int, item_format: str) -> memoryview:
+            nonlocal offset
+            size = count * struct.calcsize(item_format)
+            raw = view[offset:offset + size]
+            data = raw.cast(item_format)
+            self._views.extend((raw, data))
+            offset += size + (-size % 8)
+            return data
+
+        self._ipv4_starts = section(ipv4_count, "I")
+        self._ipv4_ends = section(ipv4_count, "I")
+        self._ipv4_scores = section(ipv4_count, "d")
+        self._ipv6_starts = _IPv6Keys(section(ipv6_count, "Q"), section(ipv6_count, "Q"))
+        self._ipv6_ends = _IPv6Keys(section(ipv6_count, "Q"), section(ipv6_count, "Q"))
+        self._ipv6_scores = section(ipv6_count, "d")
+
+    @classmethod
+    def load(cls, path: str) -> Self:
+        with open(path, "rb") as index_file:
+            # The mapping stays valid after the file is closed
+            return cls(mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @staticmethod
+    def build(networks: list[tuple[str, float]]) -> bytes:
+        ipv4_ranges = []
+        ipv6_ranges = []
+        for network, score in networks:
+            try:
+                ip_network = ipaddress.ip_network(network, strict=False)
+            except ValueError:
+                raise IPPrefixIndexError(f"Invalid network: {network}")
+            ranges = ipv4_ranges if ip_network.version == 4 else ipv6_ranges
+            ranges.append((
+                int(ip_network.network_address),
+                int(ip_network.broadcast_address),
+                ip_network.prefixlen,
+                float(score),
+            ))
+
+        ipv4_segments = _flatten(ipv4_ranges)
+        ipv6_segments = _flatten(ipv6_ranges)
+        buffer = bytearray(HEADER.pack(MAGIC, BYTE_ORDER_MARK, 0, len(ipv4_segments), len(ipv6_segments)))
+        for item_format, values in (
+            ("I", [start for start, _, _ in ipv4_segments]),
+            ("I", [end for _, end, _ in ipv4_segments]),
+            ("d", [score for _, _, score in ipv4_segments]),
+            ("Q", [start >> 64 for start, _, _ in ipv6_segments]),
+            ("Q", [start & _UINT64_MASK for start, _, _ in ipv6_segments]),
+            ("Q", [end >> 64 for _, end, _ in ipv6_segments]),
+            ("Q", [end & _UINT64_MASK for _, end, _ in ipv6_segments]),
+            ("d", [score for _, _, score in ipv6_segments]),
+        ):
+            buffer.extend(array(item_format, values).tobytes())
+            _pad(buffer)
+
+        return bytes(buffer)
+
+    @classmethod
+    def build_from_csv(cls, csv_path: str, index_path: str) -> None:
+        # The CSV has a header row with "network" (CIDR) and "score" columns
+        with open(csv_path, newline="") as csv_file:
+            networks = [(row["network"], float(row["score"])) for row in csv.DictReader(csv_file)]
+        with open(index_path, "wb") as index_file:
+            index_file.write(cls.build(networks))
+
+    def __len__(self) -> int:
+        return len(self._ipv4_scores) + len(self._ipv6_scores)
+
+    def score(self, ip_address: IPAddress | str) -> float | None:
+        if isinstance(ip_address, str):
+            ip_address = ipaddress.ip_address(ip_address)
+        if ip_address.version == 4:
+            starts, ends, scores = self._ipv4_starts, self._ipv4_ends, self._ipv4_scores
+        else:
+            starts, ends, scores = self._ipv6_starts, self._ipv6_ends, self._ipv6_scores
+
+        address = int(ip_address)
+        position = bisect.bisect_right(starts, address) - 1
+        if position >= 0 and address <= ends[position]:
+            return scores[position]
+
+        return None
+
+    def close(self) -> None:
+        # Views are released before the mapping, mmap refuses to close with exported buffers
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build an IP prefix index from a CSV of networks and scores.")
+    parser.add_argument("csv_path", type=str, help="CSV file with network and score columns")
+    parser.add_argument("index_path", type=str, help="Output index file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    IPPrefixIndex.build_from_csv(args.csv_path, args.index_path)
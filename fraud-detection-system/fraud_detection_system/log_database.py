@@ -0,0 +1,381 @@
+# A durable DatabaseConnection backed by an append-only record log.
+#
+# Every write appends a framed record to the active log segment and points an in-memory offset
+# index at it, values are read back from disk on demand. Appends go to a write buffer that a
+# background thread flushes and fsyncs in groups (group commit), so writers do not pay for an
+# fsync each. Snapshots write every live record into one file and drop the log segments before
+# it, which doubles as compaction. They run on their own thread and write outside the lock, so
+# group commits go on while a snapshot is written. Recovery loads the latest snapshot and
+# replays only the log segments written after it, scanning the files through mmap. Secondary
+# indexes live in memory and are rebuilt during recovery.
+import mmap
+import os
+import struct
+import threading
+import zlib
+from collections.abc import Buffer, Callable, Hashable, Iterable, Mapping
+
+from fraud_detection_system import codec
+from fraud_detection_system.database import AbstractDatabaseConnection, SecondaryIndex, stored_version
+from fraud_detection_system.models import FraudRecord
+
+
+COMMIT_INTERVAL = 0.005
+GROUP_COMMIT_BYTES = 1 << 20
+SNAPSHOT_BYTES = 64 << 20
+# payload length, crc32 of the payload, account id length
+FRAME_HEADER = struct.Struct("<IIH")
+
+IndexEntry = tuple[str, int, int]  # file path, frame offset, frame length
+
+
+def encode_frame(account_id: str, fraud_record: FraudRecord) -> bytes:
+    key = account_id.encode()
+    payload = bytearray(key)
+    codec.encode_into(payload, fraud_record)
+    return FRAME_HEADER.pack(len(payload), zlib.crc32(payload), len(key)) + payload
+
+
+def decode_frame(frame: bytes) -> tuple[str, FraudRecord]:
+    _, _, key_length = FRAME_HEADER.unpack_from(frame, 0)
+    key_end = FRAME_HEADER.size + key_length
+    return frame[FRAME_HEADER.size:key_end].decode(), codec.decode_from(frame, key_end)[0]
+
+
+def scan_frames(data: Buffer) -> tuple[list[tuple[str, int, int]], int]:
+    # Returns (account id, offset, length) of every intact frame and the end of the last one.
+    # A torn or corrupted frame ends the scan, nothing after it was acknowledged as durable.
+    frames = []
+    offset = 0
+    while offset + FRAME_HEADER.size <= len(data):
+        payload_length, checksum, key_length = FRAME_HEADER.unpack_from(data, offset)
+        payload_start = offset + FRAME_HEADER.size
+        payload = data[payload_start:payload_start + payload_length]
+        if len(payload) < payload_length or zlib.crc32(payload) != checksum:
+            break
+        frames.append((payload[:key_length].decode(), offset, FRAME_HEADER.size + payload_length))
+        offset = payload_start + payload_length
+    return frames, offset
+
+
+class AppendOnlyLogDatabaseConnection(AbstractDatabaseConnection):
+    _directory: str
+    _index: dict[str, IndexEntry]
+    _fds: dict[str, int]
+    _write_buffer: bytearray
+    _flushing: bytes
+
+    def __init__(
+        self,
+        directory: str,
+        commit_interval: float = COMMIT_INTERVAL,
+        group_commit_bytes: int = GROUP_COMMIT_BYTES,
+        snapshot_bytes: int = SNAPSHOT_BYTES,
+        synchronous_commit: bool = False,
+    ) -> None:
+        # With synchronous_commit a write returns once it is fsynced, otherwise it returns once
+        # it is buffered and sync() waits for durability.
+        self._directory = directory
+        self._commit_interval = commit_interval
+        self._group_commit_bytes = group_commit_bytes
+        self._snapshot_bytes = snapshot_bytes
+        self._synchronous_commit = synchronous_commit
+        self._lock = threading.Lock()
+        self._commit_condition = threading.Condition(self._lock)
+        self._snapshot_condition = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._index = {}
+        self._secondary_index = SecondaryIndex()
+        self._fds = {}
+        self._write_buffer = bytearray()
+        self._flushing = b""
+        self._flushing_path = ""
+        self._flushing_start = 0
+        self._appended_sequence = 0
+        self._committed_sequence = 0
+        self._bytes_since_snapshot = 0
+        self._closed = False
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+        self._flusher = threading.Thread(target=self._run_flusher, name="log-database-flusher", daemon=True)
+        self._flusher.start()
+        self._snapshotter = threading.Thread(
+            target=self._run_snapshotter, name="log-database-snapshotter", daemon=True
+        )
+        self._snapshotter.start()
+
+    def _path(self, kind: str, file_id: int) -> str:
+        extension = "dat" if kind == "snapshot" else "log"
+        return os.path.join(self._directory, f"{kind}-{file_id:08d}.{extension}")
+
+    def _file_ids(self, kind: str) -> list[int]:
+        return sorted(
+            int(name.split("-")[1].split(".")[0])
+            for name in os.listdir(self._directory)
+            if name.startswith(f"{kind}-")
+        )
+
+    def _recover(self) -> None:
+        snapshot_ids = self._file_ids("snapshot")
+        base_id = snapshot_ids[-1] if snapshot_ids else 0
+        for snapshot_id in snapshot_ids[:-1]:
+            os.remove(self._path("snapshot", snapshot_id))
+        if os.path.exists(temporary_path := os.path.join(self._directory, "snapshot.tmp")):
+            os.remove(temporary_path)
+
+        segment_ids = []
+        for segment_id in self._file_ids("segment"):
+            # Segments older than the snapshot are already part of it
+            if segment_id < base_id:
+                os.remove(self._path("segment", segment_id))
+            else:
+                segment_ids.append(segment_id)
+
+        paths = [self._path("snapshot", base_id)] if snapshot_ids else []
+        paths.extend(self._path("segment", segment_id) for segment_id in segment_ids)
+        for path in paths:
+            fd = os.open(path, os.O_RDONLY)
+            self._fds[path] = fd
+            size = os.fstat(fd).st_size
+            if size == 0:
+                continue
+            # Mapped instead of read, the page cache holds the file and not the heap
+            with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as data:
+                frames, end = scan_frames(data)
+                for account_id, offset, length in frames:
+                    self._index[account_id] = (path, offset, length)
+                    # Replayed in write order, so every account ends up indexed by its latest record
+                    self._secondary_index.update(account_id, decode_frame(data[offset:offset + length])[1])
+            if end < size:
+                os.truncate(path, end)
+
+        self._open_active_segment(segment_ids[-1] + 1 if segment_ids else base_id)
+
+    def _open_active_segment(self, segment_id: int) -> None:
+        self._active_id = segment_id
+        self._active_path = self._path("segment", segment_id)
+        self._active_fd = os.open(self._active_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        self._fds[self._active_path] = self._active_fd
+        self._buffer_start = os.fstat(self._active_fd).st_size
+
+    def _append(self, account_id: str, fraud_record: FraudRecord) -> int:
+        # Must be called while holding self._lock
+        frame = encode_frame(account_id, fraud_record)
+        self._index[account_id] = (self._active_path, self._buffer_start + len(self._write_buffer), len(frame))
+        self._secondary_index.update(account_id, fraud_record)
+        self._write_buffer.extend(frame)
+        self._bytes_since_snapshot += len(frame)
+        self._appended_sequence += 1
+        if len(self._write_buffer) >= self._group_commit_bytes:
+            self._commit_condition.notify_all()
+        if self._bytes_since_snapshot >= self._snapshot_bytes:
+            self._snapshot_condition.notify_all()
+        return self._appended_sequence
+
+    def _read(self, entry: IndexEntry) -> FraudRecord:
+        # Must be called while holding self._lock
+        path, offset, length = entry
+        if path == self._active_path and offset >= self._buffer_start:
+            start = offset - self._buffer_start
+            frame = bytes(self._write_buffer[start:start + length])
+        elif self._flushing and path == self._flushing_path and offset >= self._flushing_start:
+            start = offset - self._flushing_start
+            frame = self._flushing[start:start + length]
+        else:
+            frame = os.pread(self._fds[path], length, offset)
+        return decode_frame(frame)[1]
+
+    def _wait_for_commit(self, sequence: int) -> None:
+        # Must be called while holding self._lock
+        if self._synchronous_commit:
+            self._commit_condition.notify_all()
+            self._commit_condition.wait_for(lambda: self._committed_sequence >= sequence or self._closed)
+
+    def get_fraud_record(self, account_id: str) -> FraudRecord:
+        with self._lock:
+            entry = self._index.get(account_id)
+            return None if entry is None else self._read(entry)
+
+    def store_fraud_record(self, account_id: str, fraud_record: FraudRecord) -> None:
+        with self._lock:
+            self._wait_for_commit(self._append(account_id, fraud_record))
+
+    def update_fraud_record(
+        self, account_id: str, update: Callable[[FraudRecord | None], FraudRecord]
+    ) -> FraudRecord:
+        with self._lock:
+            entry = self._index.get(account_id)
+            fraud_record = update(None if entry is None else self._read(entry))
+            self._wait_for_commit(self._append(account_id, fraud_record))
+            return fraud_record
+
+    def compare_and_store(self, account_id: str, expected_version: int | None, fraud_record: FraudRecord) -> bool:
+        with self._lock:
+            entry = self._index.get(account_id)
+            if stored_version(None if entry is None else self._read(entry)) != expected_version:
+                return False
+            self._wait_for_commit(self._append(account_id, fraud_record))
+            return True
+
+    def compare_and_store_many(
+        self, fraud_records: Mapping[str, FraudRecord], expected_versions: Mapping[str, int | None]
+    ) -> set[str]:
+        # One group commit for all stored records
+        with self._lock:
+            stored = set()
+            sequence = self._appended_sequence
+            for account_id, fraud_record in fraud_records.items():
+                entry = self._index.get(account_id)
+                if stored_version(None if entry is None else self._read(entry)) == expected_versions[account_id]:
+                    sequence = self._append(account_id, fraud_record)
+                    stored.add(account_id)
+            self._wait_for_commit(sequence)
+            return stored
+
+    def get_many(self, account_ids: Iterable[str]) -> dict[str, FraudRecord]:
+        with self._lock:
+            return {
+                account_id: self._read(entry)
+                for account_id in account_ids
+                if (entry := self._index.get(account_id)) is not None
+            }
+
+    def put_many(self, fraud_records: Mapping[str, FraudRecord]) -> None:
+        with self._lock:
+            sequence = self._appended_sequence
+            for account_id, fraud_record in fraud_records.items():
+                sequence = self._append(account_id, fraud_record)
+            self._wait_for_commit(sequence)
+
+    def _find_by(self, index_name: str, value: Hashable) -> dict[str, FraudRecord]:
+        with self._lock:
+            return {
+                account_id: self._read(self._index[account_id])
+                for account_id in self._secondary_index.find(index_name, value)
+            }
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index)
+
+    def sync(self) -> None:
+        # Returns once every write made before the call is durable
+        self._flush()
+
+    def _flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                if not self._write_buffer:
+                    return
+                data = bytes(self._write_buffer)
+                fd = self._active_fd
+                sequence = self._appended_sequence
+                self._flushing, self._flushing_path, self._flushing_start = data, self._active_path, self._buffer_start
+                self._write_buffer = bytearray()
+                self._buffer_start += len(data)
+
+            self._write_all(fd, data)
+
+            with self._lock:
+                self._flushing = b""
+                self._committed_sequence = sequence
+                self._commit_condition.notify_all()
+
+    @staticmethod
+    def _write_all(fd: int, data: bytes) -> None:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        os.fsync(fd)
+
+    def _run_flusher(self) -> None:
+        while True:
+            with self._lock:
+                self._commit_condition.wait(timeout=self._commit_interval)
+                closed = self._closed
+            self._flush()
+            if closed:
+                return
+
+    def _run_snapshotter(self) -> None:
+        while True:
+            with self._lock:
+                self._snapshot_condition.wait_for(
+                    lambda: self._closed or self._bytes_since_snapshot >= self._snapshot_bytes
+                )
+                if self._closed:
+                    return
+            self.snapshot()
+
+    def snapshot(self) -> None:
+        # Writes every live record into a new snapshot and removes the files it replaces.
+        # Writers keep appending to a fresh segment while the snapshot is written.
+        with self._snapshot_lock:
+            with self._flush_lock:
+                with self._lock:
+                    # The buffered writes still belong to the old segment, they are flushed like
+                    # a group commit and stay readable from memory until they are on disk
+                    tail, tail_fd, sequence = bytes(self._write_buffer), self._active_fd, self._appended_sequence
+                    self._flushing, self._flushing_path = tail, self._active_path
+                    self._flushing_start = self._buffer_start
+                    self._write_buffer = bytearray()
+                    replaced_paths = list(self._fds)
+                    self._open_active_segment(self._active_id + 1)
+                    entries = dict(self._index)
+                    self._bytes_since_snapshot = 0
+
+                self._write_all(tail_fd, tail)
+
+                with self._lock:
+                    self._flushing = b""
+                    self._committed_sequence = max(self._committed_sequence, sequence)
+                    self._commit_condition.notify_all()
+
+            temporary_path = os.path.join(self._directory, "snapshot.tmp")
+            snapshot_entries = {}
+            with open(temporary_path, "wb") as snapshot_file:
+                offset = 0
+                for account_id, (path, frame_offset, length) in entries.items():
+                    snapshot_file.write(os.pread(self._fds[path], length, frame_offset))
+                    snapshot_entries[account_id] = (offset, length)
+                    offset += length
+                snapshot_file.flush()
+                os.fsync(snapshot_file.fileno())
+            snapshot_path = self._path("snapshot", self._active_id)
+            os.replace(temporary_path, snapshot_path)
+            self._fsync_directory()
+
+            snapshot_fd = os.open(snapshot_path, os.O_RDONLY)
+            with self._lock:
+                self._fds[snapshot_path] = snapshot_fd
+                for account_id, (offset, length) in snapshot_entries.items():
+                    # Records written after the rotation already point at the new segment
+                    if self._index.get(account_id) == entries[account_id]:
+                        self._index[account_id] = (snapshot_path, offset, length)
+                replaced_fds = [self._fds.pop(path) for path in replaced_paths]
+            for fd, path in zip(replaced_fds, replaced_paths):
+                os.close(fd)
+                os.remove(path)
+
+    def _fsync_directory(self) -> None:
+        directory_fd = os.open(self._directory, os.O_RDONLY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._commit_condition.notify_all()
+            self._snapshot_condition.notify_all()
+        self._snapshotter.join()
+        self._flusher.join()
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds = {}
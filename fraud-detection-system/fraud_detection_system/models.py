@@ -1,9 +1,11 @@
+# The models are slotted, millions of them are kept in the account stores. Enum fields are
+# coerced to their members, so equal values share one object instead of a string each.
 from dataclasses import dataclass, field
-from uuid import uuid4
+from uuid import UUID, uuid4
 from enum import StrEnum
 
 
-@dataclass
+@dataclass(slots=True)
 class PersonalInfo:
     name: str
     age: int
@@ -12,18 +14,18 @@ class PersonalInfo:
     phone_number: str | None = None
 
 
-@dataclass
+@dataclass(slots=True)
 class DeviceInfo:
     ip_address: str
 
 
-@dataclass
+@dataclass(slots=True)
 class BankAccount:
     routing_number: int
     account_number: int
 
 
-@dataclass
+@dataclass(slots=True)
 class CreditCard:
     card_number: int
     expiry_date: str
@@ -36,7 +38,7 @@ class PaymentMethodEnum(StrEnum):
     ACH = "ACH"
 
 
-@dataclass
+@dataclass(slots=True)
 class FraudRecord:
     amount: float
     personal_info: PersonalInfo
@@ -45,6 +47,9 @@ class FraudRecord:
     bank_account: BankAccount | None = None
     credit_card: CreditCard | None = None
 
+    def __post_init__(self) -> None:
+        self.payment_method = PaymentMethodEnum(self.payment_method)
+
 
 class AccountStatusEnum(StrEnum):
     PENDING = "pending"
@@ -55,10 +60,64 @@ class AccountStatusEnum(StrEnum):
     REAPPLIED = "reapplied"
 
 
-@dataclass
+def pack_account_id(account_id: str) -> bytes | str:
+    # Canonical UUIDs are kept as their 16 bytes, any other id as the string itself
+    try:
+        packed = UUID(account_id).bytes
+    except ValueError:
+        return account_id
+
+    return packed if unpack_account_id(packed) == account_id else account_id
+
+
+def unpack_account_id(packed: bytes | str) -> str:
+    if isinstance(packed, str):
+        return packed
+
+    digits = packed.hex()
+    return f"{digits[:8]}-{digits[8:12]}-{digits[12:16]}-{digits[16:20]}-{digits[20:]}"
+
+
+@dataclass(init=False)
 class Account:
+    # Slotted by hand: account_id is a dataclass field, so dataclasses.replace and asdict see the
+    # string id, but its value lives packed in the _account_id slot behind the property below
+    __slots__ = ("fraud_record", "status", "fraud_score", "data_validation_errors", "version", "_account_id")
     fraud_record: FraudRecord
-    status: AccountStatusEnum = AccountStatusEnum.PENDING
-    fraud_score: float = 0.00
-    data_validation_errors: list[str] = field(default_factory=list)
-    account_id: str = field(default_factory=lambda: str(uuid4()))
+    status: AccountStatusEnum
+    fraud_score: float
+    data_validation_errors: list[str]
+    # Bumped by every service update, stores compare it to detect concurrent writers
+    version: int
+    account_id: str
+
+    def __init__(
+        self,
+        fraud_record: FraudRecord,
+        status: AccountStatusEnum = AccountStatusEnum.PENDING,
+        fraud_score: float = 0.00,
+        data_validation_errors: list[str] | None = None,
+        account_id: str | None = None,
+        version: int = 0,
+    ) -> None:
+        self.fraud_record = fraud_record
+        self.status = AccountStatusEnum(status)
+        self.fraud_score = fraud_score
+        self.data_validation_errors = [] if data_validation_errors is None else data_validation_errors
+        self.version = version
+        self._account_id = uuid4().bytes if account_id is None else pack_account_id(account_id)
+
+    @property
+    def account_id(self) -> str:
+        return unpack_account_id(self._account_id)
+
+    @account_id.setter
+    def account_id(self, account_id: str) -> None:
+        self._account_id = pack_account_id(account_id)
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__qualname__}(fraud_record={self.fraud_record!r}, status={self.status!r}, "
+            f"fraud_score={self.fraud_score!r}, data_validation_errors={self.data_validation_errors!r}, "
+            f"version={self.version!r}, account_id={self.account_id!r})"
+        )
@@ -0,0 +1,186 @@
+# A compact, memory-mapped index of known spam phone numbers used as the local data source of
+# the spam phone number fraud analysis.
+#
+# Numbers are normalized to E.164 and stored as one sorted array of int64 values (8 bytes per
+# number, so 100M numbers take 800 MB on disk and nothing on the Python heap). Lookups are a
+# binary search over the memory-mapped array. The index is built from a CSV with an external
+# merge sort, so building it needs memory for one chunk of numbers only.
+import argparse
+import bisect
+import csv
+import heapq
+import mmap
+import os
+import re
+import struct
+import tempfile
+from array import array
+from collections.abc import Iterable, Iterator
+from typing import Self
+
+
+MAGIC = b"FDPHIDX1"
+BYTE_ORDER_MARK = 0x01020304
+# magic, byte order mark, reserved, number count. The numbers use the native byte order.
+HEADER = struct.Struct("=8sIIQ")
+DEFAULT_COUNTRY_CODE = "1"
+BUILD_CHUNK_SIZE = 5_000_000
+WRITE_BATCH_SIZE = 65_536
+# Only ASCII digits are kept, str.isdigit() also accepts characters like "²" that int() rejects
+NON_DIGITS = re.compile(r"[^0-9]+")
+
+
+class PhoneNumberIndexError(Exception):
+    pass
+
+
+def normalize_phone_number(phone_number: str | None, default_country_code: str = DEFAULT_COUNTRY_CODE) -> int | None:
+    # E.164 numbers have at most 15 digits, so every valid number fits into an int64
+    if not phone_number:
+        return None
+    digits = NON_DIGITS.sub("", phone_number)
+    if not digits:
+        return None
+    if not phone_number.lstrip().startswith("+") and len(digits) == 10:
+        digits = default_country_code + digits
+    if len(digits) > 15:
+        return None
+
+    return int(digits)
+
+
+def _write_numbers(index_file, numbers: Iterator[int]) -> int:
+    # Writes the sorted numbers without duplicates and returns how many were written
+    count = 0
+    previous = None
+    batch = array("q")
+    for number in numbers:
+        if number == previous:
+            continue
+        previous = number
+        batch.append(number)
+        if len(batch) >= WRITE_BATCH_SIZE:
+            index_file.write(batch.tobytes())
+            count += len(batch)
+            batch = array("q")
+    index_file.write(batch.tobytes())
+    return count + len(batch)
+
+
+def _iter_run(run_path: str) -> Iterator[int]:
+    if not os.path.getsize(run_path):
+        return
+    with open(run_path, "rb") as run_file, mmap.mmap(run_file.fileno(), 0, access=mmap.ACCESS_READ) as run:
+        with memoryview(run) as view, view.cast("q") as numbers:
+            yield from numbers
+
+
+class PhoneNumberIndex:
+    _mmap: mmap.mmap | None
+    _views: list[memoryview]
+    _numbers: memoryview
+
+    def __init__(self, buffer: bytes | mmap.mmap) -> None:
+        if len(buffer) < HEADER.size:
+            raise PhoneNumberIndexError("Truncated phone number index")
+        magic, byte_order_mark, _, count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise PhoneNumberIndexError("Not a phone number index")
+        if byte_order_mark != BYTE_ORDER_MARK:
+            raise PhoneNumberIndexError("Phone number index was built on a platform with another byte order")
+
+        self._mmap = buffer if isinstance(buffer, mmap.mmap) else None
+        view = memoryview(buffer)
+        raw_numbers = view[HEADER.size:HEADER.size + count * 8]
+        self._numbers = raw_numbers.cast("q")
+        self._views = [view, raw_numbers, self._numbers]
+
+    @classmethod
+    def load(cls, path: str) -> Self:
+        with open(path, "rb") as index_file:
+            return cls(mmap.mmap(index_file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @staticmethod
+    def build(phone_numbers: Iterable[str]) -> bytes:
+        numbers = array("q", sorted({
+            number for phone_number in phone_numbers
+            if (number := normalize_phone_number(phone_number)) is not None
+        }))
+        return HEADER.pack(MAGIC, BYTE_ORDER_MARK, 0, len(numbers)) + numbers.tobytes()
+
+    @staticmethod
+    def build_from_csv(csv_path: str, index_path: str, chunk_size: int = BUILD_CHUNK_SIZE) -> None:
+        # The CSV has a header row with a "phone_number" column. Each chunk is sorted into a
+        # temporary run file, then the runs are merged into the index.
+        with tempfile.TemporaryDirectory() as run_directory:
+            run_paths = []
+            with open(csv_path, newline="") as csv_file:
+                chunk = []
+                for row in csv.DictReader(csv_file):
+                    if (number := normalize_phone_number(row["phone_number"])) is not None:
+                        chunk.append(number)
+                    if len(chunk) >= chunk_size:
+                        run_paths.append(PhoneNumberIndex._write_run(run_directory, chunk))
+                        chunk = []
+                if chunk:
+                    run_paths.append(PhoneNumberIndex._write_run(run_directory, chunk))
+
+            with open(index_path, "wb") as index_file:
+                index_file.write(HEADER.pack(MAGIC, BYTE_ORDER_MARK, 0, 0))
+                count = _write_numbers(index_file, heapq.merge(*map(_iter_run, run_paths)))
+                index_file.seek(0)
+                index_file.write(HEADER.pack(MAGIC, BYTE_ORDER_MARK, 0, count))
+
+    @staticmethod
+    def _write_run(run_directory: str, chunk: list[int]) -> str:
+        chunk.sort()
+        run_path = os.path.join(run_directory, f"run-{len(os.listdir(run_directory))}")
+        with open(run_path, "wb") as run_file:
+            _write_numbers(run_file, iter(chunk))
+        return run_path
+
+    def __len__(self) -> int:
+        return len(self._numbers)
+
+    def __contains__(self, phone_number: str) -> bool:
+        number = normalize_phone_number(phone_number)
+        return number is not None and self._contains(number)
+
+    def contains_many(self, phone_numbers: list[str]) -> list[bool]:
+        # Looks the numbers up in sorted order, so every search starts where the previous one
+        # ended and the batch walks the array once
+        numbers = [normalize_phone_number(phone_number) for phone_number in phone_numbers]
+        results = [False] * len(numbers)
+        low = 0
+        for position in sorted(
+            (position for position, number in enumerate(numbers) if number is not None),
+            key=numbers.__getitem__,
+        ):
+            low = bisect.bisect_left(self._numbers, numbers[position], low)
+            results[position] = low < len(self._numbers) and self._numbers[low] == numbers[position]
+        return results
+
+    def _contains(self, number: int) -> bool:
+        position = bisect.bisect_left(self._numbers, number)
+        return position < len(self._numbers) and self._numbers[position] == number
+
+    def close(self) -> None:
+        # Views are released before the mapping, mmap refuses to close with exported buffers
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build a spam phone number index from a CSV.")
+    parser.add_argument("csv_path", type=str, help="CSV file with a phone_number column")
+    parser.add_argument("index_path", type=str, help="Output index file")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    PhoneNumberIndex.build_from_csv(args.csv_path, args.index_path)
@@ -0,0 +1,270 @@
+# Fraud analysis on a pool of worker processes, for analyses that are CPU-bound.
+#
+# Records are sent to the workers in chunks. The parent encodes a chunk with the binary codec
+# into a shared memory block, so the task itself only carries the block name and the record
+# count, and the worker writes its scores back into the same block. The chunks are collected
+# in submission order, so results come back in input order, and only a bounded number of
+# chunks is in flight at a time.
+#
+# Every worker loads the reference data (IP, domain and phone indexes) once when it starts.
+# The indexes are memory mapped, so the workers share their pages. Velocity is counted by the
+# parent, which owns the tracker, and the workers replay those scores inside the chain so that a
+# velocity short-circuit still skips the later handlers.
+import asyncio
+import math
+import multiprocessing
+import os
+from array import array
+from collections import deque
+from collections.abc import Iterable
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.context import BaseContext
+from multiprocessing.shared_memory import SharedMemory
+from typing import Self
+
+from fraud_detection_system.codec import decode_from, encode_into
+from fraud_detection_system.domain_index import DomainSet
+from fraud_detection_system.fraud_analysis import (
+    EmailDomainFraudAnalysis,
+    FraudAnalysis,
+    FraudAnalysisService,
+    FraudAnalyzer,
+    IPAddressFraudAnalysis,
+    SpamRecordPhoneNumberFraudAnalysis,
+    VelocityFraudAnalyzer,
+)
+from fraud_detection_system.instrumentation import instrumentation
+from fraud_detection_system.ip_index import IPPrefixIndex
+from fraud_detection_system.models import FraudRecord
+from fraud_detection_system.phone_index import PhoneNumberIndex
+from fraud_detection_system.velocity import VelocityTracker
+
+
+CHUNK_SIZE = 256
+# Chunks in flight per worker process
+CHUNKS_PER_PROCESS = 2
+SCORE_SIZE = 8
+
+# Path of the index to load per analysis class, e.g. {IPAddressRecordFraudAnalysis: "ip.idx"}
+ReferenceData = dict[type[FraudAnalysis], str]
+
+
+class ProcessPoolError(Exception):
+    pass
+
+
+def load_reference_data(reference_data: ReferenceData) -> None:
+    # Assigns the loaded indexes the same way as an operator would in a single process
+    for analysis_cls, path in reference_data.items():
+        if issubclass(analysis_cls, IPAddressFraudAnalysis):
+            analysis_cls.ip_index = IPPrefixIndex.load(path)
+        elif issubclass(analysis_cls, EmailDomainFraudAnalysis):
+            analysis_cls.domain_set = DomainSet.load(path)
+        elif issubclass(analysis_cls, SpamRecordPhoneNumberFraudAnalysis):
+            analysis_cls.phone_index = PhoneNumberIndex.load(path)
+        else:
+            raise ProcessPoolError(f"{analysis_cls.__name__} takes no reference data")
+
+
+class _ReplayedVelocityFraudAnalyzer(FraudAnalyzer):
+    # Returns the velocity scores the parent computed for the records of the current chunk
+    scores: dict[int, float]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.scores = {}
+
+    def risk_assessments(self, fraud_record: FraudRecord) -> list[FraudAnalysis]:
+        return []
+
+    def assess_risks(self, fraud_record: FraudRecord) -> dict[str, float]:
+        return {VelocityFraudAnalyzer.__name__: self.scores[id(fraud_record)]}
+
+    def assess_risks_batch(self, fraud_records: list[FraudRecord]) -> list[dict[str, float]]:
+        return [self.assess_risks(fraud_record) for fraud_record in fraud_records]
+
+
+class _WorkerFraudAnalysisService(FraudAnalysisService):
+    _velocity_analyzer: _ReplayedVelocityFraudAnalyzer
+
+    def _build_velocity_analyzer(self) -> FraudAnalyzer:
+        self._velocity_analyzer = _ReplayedVelocityFraudAnalyzer()
+        return self._velocity_analyzer
+
+    def analyze_chunk(self, fraud_records: list[FraudRecord], velocity_scores: list[float]) -> list[dict[str, float]]:
+        self._velocity_analyzer.scores = {
+            id(fraud_record): score for fraud_record, score in zip(fraud_records, velocity_scores)
+        }
+        try:
+            return self.analyze_fraud_records(fraud_records)
+        finally:
+            self._velocity_analyzer.scores = {}
+
+
+_worker_service: _WorkerFraudAnalysisService | None = None
+
+
+def _initialize_worker(reference_data: ReferenceData) -> None:
+    global _worker_service
+    load_reference_data(reference_data)
+    _worker_service = _WorkerFraudAnalysisService()
+
+
+def _score_chunk(name: str, count: int, analyzer_names: tuple[str, ...]) -> None:
+    # Block layout: count velocity scores, count rows of len(analyzer_names) result scores
+    # (NaN where an analyzer did not run), then the encoded records
+    shared_memory = SharedMemory(name=name)
+    try:
+        view = shared_memory.buf
+        scores = view[:_scores_size(count, analyzer_names)].cast("d")
+        try:
+            offset = len(scores) * SCORE_SIZE
+            fraud_records = []
+            for _ in range(count):
+                fraud_record, offset = decode_from(view, offset)
+                fraud_records.append(fraud_record)
+
+            analyses = _worker_service.analyze_chunk(fraud_records, scores.tolist()[:count])
+            position = count
+            for analysis in analyses:
+                for analyzer_name in analyzer_names:
+                    scores[position] = analysis.get(analyzer_name, math.nan)
+                    position += 1
+        finally:
+            scores.release()
+    finally:
+        shared_memory.close()
+
+
+def _scores_size(count: int, analyzer_names: tuple[str, ...]) -> int:
+    return count * (1 + len(analyzer_names)) * SCORE_SIZE
+
+
+class ProcessPoolFraudAnalysisService(FraudAnalysisService):
+    _velocity_analyzer: FraudAnalyzer
+    _executor_pool: ProcessPoolExecutor
+
+    def __init__(
+        self,
+        processes: int | None = None,
+        chunk_size: int = CHUNK_SIZE,
+        reference_data: ReferenceData | None = None,
+        velocity_tracker: VelocityTracker | None = None,
+        mp_context: BaseContext | None = None,
+    ) -> None:
+        super().__init__(velocity_tracker=velocity_tracker)
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        self._processes = processes or os.cpu_count() or 1
+        self._chunk_size = chunk_size
+        # Spawned workers start from a clean interpreter, forking a threaded parent can deadlock
+        self._executor_pool = ProcessPoolExecutor(
+            max_workers=self._processes,
+            mp_context=mp_context or multiprocessing.get_context("spawn"),
+            initializer=_initialize_worker,
+            initargs=(dict(reference_data or {}),),
+        )
+        self._analyzer_names = self._chain_analyzer_names()
+
+    @property
+    def processes(self) -> int:
+        return self._processes
+
+    def close(self) -> None:
+        self._executor_pool.shutdown(wait=True)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def analyze_fraud_record(self, fraud_record: FraudRecord) -> dict[str, float]:
+        return self.analyze_fraud_records([fraud_record])[0]
+
+    def analyze_fraud_records(self, fraud_records: Iterable[FraudRecord]) -> list[dict[str, float]]:
+        # Results are returned in the same order as the given records
+        fraud_records = list(fraud_records)
+        analyses = []
+        in_flight: deque[tuple[SharedMemory, int, Future]] = deque()
+        try:
+            with instrumentation.span("chain", "process_pool"):
+                for start in range(0, len(fraud_records), self._chunk_size):
+                    in_flight.append(self._submit_chunk(fraud_records[start:start + self._chunk_size]))
+                    if len(in_flight) >= self._processes * CHUNKS_PER_PROCESS:
+                        analyses.extend(self._collect_chunk(*in_flight.popleft()))
+                while in_flight:
+                    analyses.extend(self._collect_chunk(*in_flight.popleft()))
+        finally:
+            for shared_memory, _, future in in_flight:
+                future.cancel()
+                self._release(shared_memory)
+        return analyses
+
+    async def analyze_fraud_record_async(self, fraud_record: FraudRecord) -> dict[str, float]:
+        return await asyncio.to_thread(self.analyze_fraud_record, fraud_record)
+
+    def _build_velocity_analyzer(self) -> FraudAnalyzer:
+        self._velocity_analyzer = super()._build_velocity_analyzer()
+        return self._velocity_analyzer
+
+    def _chain_analyzer_names(self) -> tuple[str, ...]:
+        # In chain order, which is the order the analyses of a single process list their scores
+        names = []
+        handler = self.handler_chain
+        while handler is not None:
+            names.append(handler.fraud_analyzer.__class__.__name__)
+            handler = handler.next_handler
+        return tuple(names)
+
+    def _submit_chunk(self, fraud_records: list[FraudRecord]) -> tuple[SharedMemory, int, Future]:
+        # The device handler never short-circuits, so every record reaches the velocity handler
+        # and is counted here, in input order
+        velocity_scores = [
+            analysis[VelocityFraudAnalyzer.__name__]
+            for analysis in self._velocity_analyzer.assess_risks_batch(fraud_records)
+        ]
+        encoded = bytearray()
+        for fraud_record in fraud_records:
+            encode_into(encoded, fraud_record)
+
+        count = len(fraud_records)
+        scores_size = _scores_size(count, self._analyzer_names)
+        shared_memory = SharedMemory(create=True, size=scores_size + len(encoded))
+        try:
+            view = shared_memory.buf
+            view[scores_size:scores_size + len(encoded)] = encoded
+            scores = view[:count * SCORE_SIZE].cast("d")
+            scores[:] = array("d", velocity_scores)
+            scores.release()
+            future = self._executor_pool.submit(_score_chunk, shared_memory.name, count, self._analyzer_names)
+        except BaseException:
+            self._release(shared_memory)
+            raise
+        return shared_memory, count, future
+
+    def _collect_chunk(self, shared_memory: SharedMemory, count: int, future: Future) -> list[dict[str, float]]:
+        try:
+            future.result()
+            view = shared_memory.buf
+            scores = view[:_scores_size(count, self._analyzer_names)].cast("d")
+            rows = scores.tolist()[count:]
+            scores.release()
+        finally:
+            self._release(shared_memory)
+
+        width = len(self._analyzer_names)
+        return [
+            {
+                analyzer_name: score
+                for analyzer_name, score in zip(self._analyzer_names, rows[row * width:(row + 1) * width])
+                if not math.isnan(score)
+            }
+            for row in range(count)
+        ]
+
+    @staticmethod
+    def _release(shared_memory: SharedMemory) -> None:
+        shared_memory.close()
+        shared_memory.unlink()
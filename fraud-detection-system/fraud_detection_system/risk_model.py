@@ -0,0 +1,210 @@
+# Models turning the per-analyzer scores of a record into its fraud score.
+#
+# MeanRiskModel keeps the unweighted mean over whatever scores a record has, except for the
+# velocity score: it is 0.0 for most records and would pull every other score down, so it only
+# raises the mean to its own value when it is higher. The weighted and
+# logistic models read a fixed-width feature vector per record, one slot per analyzer with NaN
+# for an analyzer that did not run (short-circuited or not applicable), and score whole batches
+# at once. With NumPy installed the batch is scored as one vectorized operation over a
+# zero-copy view of the feature matrix, without it the same math runs in pure Python.
+#
+# Weights load from a JSON file:
+#
+#   {"model": "logistic", "bias": -3.0, "weights": {"IPAddressFraudAnalyzer": 2.0, ...}}
+import json
+import math
+from abc import ABC, abstractmethod
+from array import array
+from collections.abc import Iterable, Mapping, Sequence
+from typing import Self
+
+try:
+    import numpy
+except ImportError:  # NumPy is optional, the models fall back to pure Python
+    numpy = None
+
+
+Analysis = Mapping[str, float]
+MISSING = math.nan
+# Scores that take part through max instead of the mean, a burst is suspicious on its own
+MAX_FEATURES = ("VelocityFraudAnalyzer",)
+
+
+class RiskModelError(Exception):
+    pass
+
+
+class FeatureMatrix:
+    # Row-major float64 matrix of one feature vector per record
+    _values: array
+    _features: tuple[str, ...]
+
+    def __init__(self, values: array, features: tuple[str, ...]) -> None:
+        self._values = values
+        self._features = features
+
+    @classmethod
+    def from_analyses(cls, analyses: Sequence[Analysis], features: tuple[str, ...]) -> Self:
+        values = array("d")
+        for analysis in analyses:
+            values.extend([analysis.get(feature, MISSING) for feature in features])
+        return cls(values, features)
+
+    @property
+    def values(self) -> array:
+        return self._values
+
+    @property
+    def features(self) -> tuple[str, ...]:
+        return self._features
+
+    @property
+    def width(self) -> int:
+        return len(self._features)
+
+    def __len__(self) -> int:
+        return len(self._values) // self.width if self.width else 0
+
+    def rows(self) -> list[list[float]]:
+        values, width = self._values.tolist(), self.width
+        return [values[start:start + width] for start in range(0, len(values), width)]
+
+
+class RiskModel(ABC):
+    def score(self, analysis: Analysis) -> float:
+        return self.score_many([analysis])[0]
+
+    @abstractmethod
+    def score_many(self, analyses: Sequence[Analysis]) -> list[float]:
+        # One score in [0, 1] per analysis, in order
+        pass
+
+
+class MeanRiskModel(RiskModel):
+    def __init__(self, max_features: Iterable[str] = MAX_FEATURES) -> None:
+        self._max_features = frozenset(max_features)
+
+    def score_many(self, analyses: Sequence[Analysis]) -> list[float]:
+        return [self._score(analysis) for analysis in analyses]
+
+    def _score(self, analysis: Analysis) -> float:
+        averaged = [score for feature, score in analysis.items() if feature not in self._max_features]
+        mean = math.fsum(averaged) / len(averaged) if averaged else 0.0
+        return max([mean, *(analysis[feature] for feature in self._max_features if feature in analysis)])
+
+
+class FeatureRiskModel(RiskModel):
+    _weights: array
+    _bias: float
+
+    def __init__(self, weights: Mapping[str, float], bias: float = 0.0) -> None:
+        if not weights:
+            raise RiskModelError("A risk model needs at least one weight")
+        self._features = tuple(weights)
+        self._weights = array("d", weights.values())
+        self._bias = bias
+
+    @property
+    def features(self) -> tuple[str, ...]:
+        return self._features
+
+    @property
+    def weights(self) -> dict[str, float]:
+        return dict(zip(self._features, self._weights))
+
+    @property
+    def bias(self) -> float:
+        return self._bias
+
+    def score_many(self, analyses: Sequence[Analysis]) -> list[float]:
+        return self.score_matrix(FeatureMatrix.from_analyses(analyses, self._features))
+
+    def score_matrix(self, matrix: FeatureMatrix) -> list[float]:
+        if matrix.features != self._features:
+            raise RiskModelError("Feature matrix does not match the model features")
+        if not len(matrix):
+            return []
+        if numpy is not None:
+            values = numpy.frombuffer(matrix.values, dtype=numpy.float64).reshape(len(matrix), matrix.width)
+            return self._score_numpy(values).tolist()
+        return [self._score_row(row) for row in matrix.rows()]
+
+    @abstractmethod
+    def _score_numpy(self, values):
+        pass
+
+    @abstractmethod
+    def _score_row(self, row: list[float]) -> float:
+        pass
+
+
+class WeightedRiskModel(FeatureRiskModel):
+    # Weighted mean over the analyzers that ran, velocity is averaged like any other analyzer
+    def __init__(self, weights: Mapping[str, float], bias: float = 0.0) -> None:
+        super().__init__(weights, bias)
+        if any(weight < 0 for weight in self._weights):
+            raise RiskModelError("Weights of a weighted mean must not be negative")
+
+    def _score_numpy(self, values):
+        present = ~numpy.isnan(values)
+        weights = numpy.frombuffer(self._weights, dtype=numpy.float64)
+        numerators = numpy.where(present, values, 0.0) @ weights
+        denominators = present @ weights
+        scores = numpy.divide(
+            numerators, denominators, out=numpy.zeros_like(numerators), where=denominators > 0
+        )
+        return numpy.clip(scores + self._bias, 0.0, 1.0)
+
+    def _score_row(self, row: list[float]) -> float:
+        numerator = denominator = 0.0
+        for value, weight in zip(row, self._weights):
+            if value == value:
+                numerator += value * weight
+                denominator += weight
+        score = numerator / denominator if denominator > 0 else 0.0
+        return min(1.0, max(0.0, score + self._bias))
+
+
+class LogisticRiskModel(FeatureRiskModel):
+    # sigmoid(bias + weights . scores), analyzers that did not run contribute nothing
+    def _score_numpy(self, values):
+        weights = numpy.frombuffer(self._weights, dtype=numpy.float64)
+        logits = numpy.nan_to_num(values, nan=0.0) @ weights + self._bias
+        # The tanh form of the sigmoid cannot overflow
+        return 0.5 * (1.0 + numpy.tanh(0.5 * logits))
+
+    def _score_row(self, row: list[float]) -> float:
+        logit = self._bias
+        for value, weight in zip(row, self._weights):
+            if value == value:
+                logit += value * weight
+        if logit < 0:
+            # Keeps exp from overflowing for very negative logits
+            exp_logit = math.exp(logit)
+            return exp_logit / (1.0 + exp_logit)
+        return 1.0 / (1.0 + math.exp(-logit))
+
+
+RISK_MODELS: dict[str, type[FeatureRiskModel]] = {
+    "weighted": WeightedRiskModel,
+    "logistic": LogisticRiskModel,
+}
+
+
+def load_risk_model(path: str) -> RiskModel:
+    with open(path) as model_file:
+        try:
+            config = json.load(model_file)
+        except json.JSONDecodeError as error:
+            raise RiskModelError(f"Invalid risk model file: {error}") from error
+
+    if config.get("model") == "mean":
+        return MeanRiskModel()
+    model_cls = RISK_MODELS.get(config.get("model"))
+    if model_cls is None:
+        raise RiskModelError(f"Unknown risk model: {config.get('model')!r}")
+    try:
+        weights = {str(feature): float(weight) for feature, weight in config["weights"].items()}
+        return model_cls(weights, bias=float(config.get("bias", 0.0)))
+    except (KeyError, TypeError, ValueError, AttributeError) as error:
+        raise RiskModelError(f"Invalid risk model weights: {error!r}") from error
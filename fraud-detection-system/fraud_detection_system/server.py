@@ -0,0 +1,338 @@
+# Asyncio line-protocol server around FraudDetectionService.
+#
+#   python -m fraud_detection_system.server --port 8765 --max-batch-size 64 --max-wait-ms 5
+#
+# Every request and response is one JSON object per line. Requests carry an "action" (review,
+# approve, decline, reapply, next_actions, approve_many or decline_many), an optional "id"
+# echoed in the response, and the "record", "account_id" or "account_ids" the action needs:
+#
+#   {"id": 1, "action": "review", "record": {...}}
+#   {"id": 1, "ok": true, "account": {"account_id": "...", "status": "reviewed", ...}}
+#   {"id": 2, "action": "approve_many", "account_ids": ["...", "..."]}
+#   {"id": 2, "ok": true, "accounts": [...], "rejected": {"...": "Unknown account: ..."}}
+#
+# A connection may pipeline requests, responses come back as they complete and are matched by
+# id. Concurrent review requests of all connections are collected into micro-batches, a batch
+# is scored once it holds max_batch_size requests or its oldest request waited max_wait
+# seconds. When max_queue reviews are pending the connections stop reading new requests until
+# the batcher catches up, so backpressure reaches the clients through TCP flow control.
+import argparse
+import asyncio
+import json
+from collections.abc import Callable, Sequence
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Generic, TypeVar
+
+from fraud_detection_system.batch import BatchInputError, fraud_record_from_dict
+from fraud_detection_system.fraud_analysis import FraudAnalysisService
+from fraud_detection_system.fraud_detection_service import AccountContextError, FraudDetectionService
+from fraud_detection_system.instrumentation import instrumentation
+from fraud_detection_system.models import Account, FraudRecord
+from fraud_detection_system.risk_model import load_risk_model
+
+
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_BATCH_SIZE = 64
+MAX_WAIT = 0.005
+MAX_QUEUE = 1024
+# Requests a single connection may have in flight before the server stops reading from it
+MAX_PIPELINED = 64
+WORKERS = 4
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class RequestError(Exception):
+    pass
+
+
+class MicroBatcher(Generic[T, R]):
+    # Collects submitted items into batches for process_batch, which runs on the executor and
+    # returns one result per item, in order. A result that is an exception fails only the submit
+    # of its item. Only one batch runs at a time, so while a batch is scored the next one fills
+    # up and batches grow with the load. When process_batch raises, every item of the batch
+    # fails with the error, items are never processed twice.
+    def __init__(
+        self,
+        process_batch: Callable[[list[T]], Sequence[R | Exception]],
+        executor: Executor | None = None,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait: float = MAX_WAIT,
+        max_queue: int = MAX_QUEUE,
+    ) -> None:
+        self._process_batch = process_batch
+        self._executor = executor
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._queue: asyncio.Queue[tuple[T, asyncio.Future[R]]] = asyncio.Queue(max_queue)
+        self._task: asyncio.Task | None = None
+        self._batches = 0
+        self._items = 0
+
+    @property
+    def stats(self) -> dict[str, float]:
+        return {
+            "batches": self._batches,
+            "items": self._items,
+            "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, item: T) -> R:
+        # Waits for a free queue slot when max_queue items are pending
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._max_wait
+            while len(batch) < self._max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except TimeoutError:
+                    break
+
+            self._batches += 1
+            self._items += len(batch)
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self._process_batch, items)
+            except Exception as error:
+                results = [error] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+def account_payload(account: Account) -> dict:
+    return {
+        "account_id": account.account_id,
+        "status": str(account.status),
+        "fraud_score": account.fraud_score,
+        "validation_errors": account.data_validation_errors,
+    }
+
+
+class FraudReviewServer:
+    _fraud_detection_service: FraudDetectionService
+    _batcher: MicroBatcher[Account, Account]
+
+    def __init__(
+        self,
+        fraud_detection_service: FraudDetectionService,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        max_wait: float = MAX_WAIT,
+        max_queue: int = MAX_QUEUE,
+        workers: int = WORKERS,
+    ) -> None:
+        self._fraud_detection_service = fraud_detection_service
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait
+        self._max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fraud-review-server")
+        self._server: asyncio.Server | None = None
+        self._batcher = None
+
+    @property
+    def batcher(self) -> MicroBatcher[Account, Account]:
+        return self._batcher
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str = HOST, port: int = PORT) -> None:
+        self._batcher = MicroBatcher(
+            self._review_batch,
+            executor=self._executor,
+            max_batch_size=self._max_batch_size,
+            max_wait=self._max_wait,
+            max_queue=self._max_queue,
+        )
+        self._batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    async def close(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+        await self._batcher.stop()
+        self._executor.shutdown(wait=True)
+
+    async def handle_request(self, request: dict) -> dict:
+        try:
+            return {"ok": True, **await self._dispatch(request)}
+        except (RequestError, BatchInputError, AccountContextError, NotImplementedError) as error:
+            return {"ok": False, "error": str(error)}
+        except Exception as error:
+            # Anything else is a server fault, it still only fails this request
+            return {"ok": False, "error": f"Internal error: {error!r}"}
+
+    async def _dispatch(self, request: dict) -> dict:
+        action = request.get("action")
+        if action == "review":
+            account = await self._batcher.submit(Account(fraud_record=self._fraud_record(request)))
+            return {"account": account_payload(account)}
+        if action in ("approve_many", "decline_many"):
+            account_ids = request.get("account_ids")
+            if not isinstance(account_ids, list) or not all(isinstance(item, str) for item in account_ids):
+                raise RequestError("account_ids is required")
+            service = self._fraud_detection_service
+            transition_many = service.approve_many if action == "approve_many" else service.decline_many
+            result = await self._run(transition_many, account_ids)
+            return {"accounts": [account_payload(account) for account in result.accounts], "rejected": result.rejected}
+
+        account_id = request.get("account_id")
+        if not isinstance(account_id, str):
+            raise RequestError("account_id is required")
+
+        service = self._fraud_detection_service
+        if action == "approve":
+            account = await self._run(self._with_account, service.approve_fraud_record, account_id)
+        elif action == "decline":
+            account = await self._run(self._with_account, service.decline_fraud_record, account_id)
+        elif action == "reapply":
+            fraud_record = self._fraud_record(request)
+            account = await self._run(self._with_account, service.reapply_fraud_record, account_id, fraud_record)
+        elif action == "next_actions":
+            next_actions = await self._run(self._with_account, self._next_actions, account_id)
+            return {"next_actions": list(next_actions)}
+        else:
+            raise RequestError(f"Unknown action: {action!r}")
+        return {"account": account_payload(account)}
+
+    async def _run(self, function: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    def _with_account(self, function: Callable, account_id: str, *args):
+        if self._fraud_detection_service.get_account(account_id) is None:
+            raise RequestError(f"Unknown account: {account_id}")
+        return function(account_id, *args)
+
+    def _next_actions(self, account_id: str) -> tuple[str, ...]:
+        account = self._fraud_detection_service.get_account(account_id)
+        return self._fraud_detection_service.get_account_next_actions(account)
+
+    @staticmethod
+    def _fraud_record(request: dict) -> FraudRecord:
+        record = request.get("record")
+        if not isinstance(record, dict):
+            raise RequestError("record is required")
+        return fraud_record_from_dict(record)
+
+    def _review_batch(self, accounts: list[Account]) -> list[Account | Exception]:
+        with instrumentation.span("server", "review_batch"):
+            return self._fraud_detection_service.review_many(accounts)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        pipelined = asyncio.Semaphore(MAX_PIPELINED)
+        write_lock = asyncio.Lock()
+        tasks = set()
+
+        async def respond(line: bytes) -> None:
+            try:
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as error:
+                    response = {"ok": False, "error": f"Invalid JSON: {error}"}
+                else:
+                    if isinstance(request, dict):
+                        response = await self.handle_request(request)
+                        if "id" in request:
+                            response = {"id": request["id"], **response}
+                    else:
+                        response = {"ok": False, "error": "Request must be a JSON object"}
+                async with write_lock:
+                    writer.write(json.dumps(response).encode() + b"\n")
+                    await writer.drain()
+            except ConnectionError:
+                pass
+            finally:
+                pipelined.release()
+
+        try:
+            while True:
+                await pipelined.acquire()
+                line = await reader.readline()
+                if not line:
+                    pipelined.release()
+                    break
+                if not line.strip():
+                    pipelined.release()
+                    continue
+                task = asyncio.create_task(respond(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve fraud reviews over a local socket.")
+    parser.add_argument("--host", type=str, default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE, help="Most reviews scored together")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT * 1000, help="Longest a review waits for its batch")
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE, help="Pending reviews before backpressure")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Threads running the service calls")
+    parser.add_argument("--risk-model", type=str, help="JSON weights file of the risk model, defaults to the mean")
+    return parser.parse_args()
+
+
+async def serve(args: argparse.Namespace) -> None:
+    server = FraudReviewServer(
+        FraudDetectionService(
+            fraud_analysis_service=FraudAnalysisService(),
+            risk_model=load_risk_model(args.risk_model) if args.risk_model else None,
+        ),
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait_ms / 1000,
+        max_queue=args.max_queue,
+        workers=args.workers,
+    )
+    await server.start(args.host, args.port)
+    print(f"Serving fraud reviews on {args.host}:{server.port}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,319 @@
+# A DatabaseConnection backed by a local SQLite database in WAL mode.
+#
+# Every thread gets its own connection from a per-thread pool. Writes are not executed by the
+# calling thread: they go to a write-behind queue that merges repeated writes of one account, and
+# a background thread commits the queue in transactions of flush_batch_size records. Writers wait
+# while max_pending records are queued, so the queue cannot outgrow the commits. Reads check the
+# queue first, so callers always read their own writes. The SQL statements are module constants, so the
+# per-connection statement cache of sqlite3 prepares each of them once. The secondary indexes
+# are plain SQL indexes over columns copied out of every stored record.
+#
+# Records are encoded by the thread storing them, before they are queued, so a record the codec
+# rejects fails its own write. A failed commit is logged and its records go back to the queue
+# for the next attempt, sync() and close() raise the error while it persists, and so do writers
+# waiting for room in a full queue.
+import logging
+import sqlite3
+import threading
+from collections.abc import Callable, Hashable, Iterable, Mapping
+
+from fraud_detection_system import codec
+from fraud_detection_system.database import AbstractDatabaseConnection, index_keys, stored_version
+from fraud_detection_system.models import Account, FraudRecord
+
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 0.01
+FLUSH_BATCH_SIZE = 10_000
+MAX_PENDING = 5 * FLUSH_BATCH_SIZE
+SELECT_BATCH_SIZE = 500
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS accounts (
+    account_id TEXT PRIMARY KEY,
+    status TEXT,
+    fraud_score REAL,
+    ssn TEXT,
+    ip_address TEXT,
+    card_number INTEGER,
+    payload BLOB NOT NULL
+) WITHOUT ROWID
+"""
+CREATE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS accounts_status ON accounts (status)",
+    "CREATE INDEX IF NOT EXISTS accounts_fraud_score ON accounts (fraud_score)",
+    "CREATE INDEX IF NOT EXISTS accounts_ssn ON accounts (ssn)",
+    "CREATE INDEX IF NOT EXISTS accounts_ip_address ON accounts (ip_address)",
+    "CREATE INDEX IF NOT EXISTS accounts_card_number ON accounts (card_number)",
+)
+SELECT_ACCOUNT = "SELECT payload FROM accounts WHERE account_id = ?"
+SELECT_ACCOUNTS_BY = {
+    index_name: f"SELECT account_id, payload FROM accounts WHERE {index_name} = ?"
+    for index_name in ("status", "ssn", "ip_address", "card_number")
+}
+UPSERT_ACCOUNT = """
+INSERT INTO accounts (account_id, status, fraud_score, ssn, ip_address, card_number, payload)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (account_id) DO UPDATE SET
+    status = excluded.status, fraud_score = excluded.fraud_score, ssn = excluded.ssn,
+    ip_address = excluded.ip_address, card_number = excluded.card_number, payload = excluded.payload
+"""
+
+
+# A queued record and the row it is committed as
+QueuedWrite = tuple[FraudRecord, tuple]
+
+
+class SQLiteDatabaseConnection(AbstractDatabaseConnection):
+    _path: str
+    _pending: dict[str, QueuedWrite]
+    _flushing: dict[str, QueuedWrite]
+    _connections: list[sqlite3.Connection]
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = FLUSH_INTERVAL,
+        flush_batch_size: int = FLUSH_BATCH_SIZE,
+        max_pending: int = MAX_PENDING,
+    ) -> None:
+        self._path = path
+        self._flush_interval = flush_interval
+        self._flush_batch_size = flush_batch_size
+        self._max_pending = max_pending
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._flush_condition = threading.Condition(self._lock)
+        self._room_condition = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._flushing = {}
+        self._flush_error: Exception | None = None
+        self._closed = False
+
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute(CREATE_TABLE)
+        for create_index in CREATE_INDEXES:
+            connection.execute(create_index)
+        connection.commit()
+
+        self._writer = threading.Thread(target=self._run_writer, name="sqlite-database-writer", daemon=True)
+        self._writer.start()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, check_same_thread=False)
+            # WAL makes NORMAL durable against application crashes, only power loss can drop
+            # the last commits
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+
+    @staticmethod
+    def _row(account_id: str, fraud_record: FraudRecord) -> tuple:
+        # The indexed columns are copied out of the record, only accounts have a status and score
+        keys = dict(index_keys(fraud_record))
+        status = keys.get("status")
+        fraud_score = fraud_record.fraud_score if isinstance(fraud_record, Account) else None
+        return (
+            account_id,
+            None if status is None else str(status),
+            fraud_score,
+            keys["ssn"],
+            keys["ip_address"],
+            keys.get("card_number"),
+            codec.encode(fraud_record),
+        )
+
+    def _get_queued(self, account_id: str) -> FraudRecord | None:
+        # Must be called while holding self._lock
+        queued = self._pending.get(account_id) or self._flushing.get(account_id)
+        return None if queued is None else queued[0]
+
+    def _select(self, account_id: str) -> FraudRecord | None:
+        row = self._connection().execute(SELECT_ACCOUNT, (account_id,)).fetchone()
+        return None if row is None else codec.decode(row[0])
+
+    def _wait_for_room(self) -> None:
+        # Must be called while holding self._lock, before the reads a write depends on, since waiting
+        # releases the lock
+        while len(self._pending) >= self._max_pending and not self._closed:
+            if self._flush_error is not None:
+                raise self._flush_error
+            self._flush_condition.notify_all()
+            self._room_condition.wait()
+
+    def _enqueue(self, account_id: str, fraud_record: FraudRecord, row: tuple) -> None:
+        # Must be called while holding self._lock
+        self._pending[account_id] = (fraud_record, row)
+        if len(self._pending) >= self._flush_batch_size:
+            self._flush_condition.notify_all()
+
+    def get_fraud_record(self, account_id: str) -> FraudRecord:
+        with self._lock:
+            if (fraud_record := self._get_queued(account_id)) is not None:
+                return fraud_record
+        return self._select(account_id)
+
+    def store_fraud_record(self, account_id: str, fraud_record: FraudRecord) -> None:
+        row = self._row(account_id, fraud_record)
+        with self._lock:
+            self._wait_for_room()
+            self._enqueue(account_id, fraud_record, row)
+
+    def update_fraud_record(
+        self, account_id: str, update: Callable[[FraudRecord | None], FraudRecord]
+    ) -> FraudRecord:
+        # The queue lock is held across the read, so no other write to the account interleaves
+        with self._lock:
+            self._wait_for_room()
+            fraud_record = self._get_queued(account_id)
+            if fraud_record is None:
+                fraud_record = self._select(account_id)
+            fraud_record = update(fraud_record)
+            self._enqueue(account_id, fraud_record, self._row(account_id, fraud_record))
+            return fraud_record
+
+    def compare_and_store(self, account_id: str, expected_version: int | None, fraud_record: FraudRecord) -> bool:
+        # The queue lock is held across the read, like in update_fraud_record
+        row = self._row(account_id, fraud_record)
+        with self._lock:
+            self._wait_for_room()
+            stored = self._get_queued(account_id)
+            if stored is None:
+                stored = self._select(account_id)
+            if stored_version(stored) != expected_version:
+                return False
+            self._enqueue(account_id, fraud_record, row)
+            return True
+
+    def compare_and_store_many(
+        self, fraud_records: Mapping[str, FraudRecord], expected_versions: Mapping[str, int | None]
+    ) -> set[str]:
+        # The queue lock is held across the reads, so no other write to the accounts interleaves
+        rows = {account_id: self._row(account_id, fraud_record) for account_id, fraud_record in fraud_records.items()}
+        with self._lock:
+            self._wait_for_room()
+            stored_records, missing = self._get_queued_many(fraud_records)
+            stored_records.update(self._select_many(missing))
+            stored = {
+                account_id
+                for account_id in fraud_records
+                if stored_version(stored_records.get(account_id)) == expected_versions[account_id]
+            }
+            for account_id in stored:
+                self._enqueue(account_id, fraud_records[account_id], rows[account_id])
+            return stored
+
+    def get_many(self, account_ids: Iterable[str]) -> dict[str, FraudRecord]:
+        with self._lock:
+            fraud_records, missing = self._get_queued_many(account_ids)
+        fraud_records.update(self._select_many(missing))
+        return fraud_records
+
+    def _get_queued_many(self, account_ids: Iterable[str]) -> tuple[dict[str, FraudRecord], list[str]]:
+        # Must be called while holding self._lock, returns the queued records and the other ids
+        fraud_records = {}
+        missing = []
+        for account_id in account_ids:
+            if (fraud_record := self._get_queued(account_id)) is not None:
+                fraud_records[account_id] = fraud_record
+            else:
+                missing.append(account_id)
+        return fraud_records, missing
+
+    def _select_many(self, account_ids: list[str]) -> dict[str, FraudRecord]:
+        fraud_records = {}
+        connection = self._connection()
+        for start in range(0, len(account_ids), SELECT_BATCH_SIZE):
+            batch = account_ids[start:start + SELECT_BATCH_SIZE]
+            placeholders = ", ".join("?" * len(batch))
+            for account_id, payload in connection.execute(
+                f"SELECT account_id, payload FROM accounts WHERE account_id IN ({placeholders})", batch
+            ):
+                fraud_records[account_id] = codec.decode(payload)
+        return fraud_records
+
+    def put_many(self, fraud_records: Mapping[str, FraudRecord]) -> None:
+        rows = {account_id: self._row(account_id, fraud_record) for account_id, fraud_record in fraud_records.items()}
+        with self._lock:
+            self._wait_for_room()
+            for account_id, fraud_record in fraud_records.items():
+                self._enqueue(account_id, fraud_record, rows[account_id])
+
+    def _find_by(self, index_name: str, value: Hashable) -> dict[str, FraudRecord]:
+        # Queued writes are committed first, so the query sees them
+        self._flush()
+        rows = self._connection().execute(SELECT_ACCOUNTS_BY[index_name], (value,))
+        return {account_id: codec.decode(payload) for account_id, payload in rows}
+
+    def sync(self) -> None:
+        # Returns once every write queued before the call is committed, raises if the commit fails
+        self._flush()
+
+    def _flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return
+                self._flushing, self._pending = self._pending, {}
+                self._room_condition.notify_all()
+
+            # Every chunk is its own transaction and leaves the queue once it is committed
+            account_ids = list(self._flushing)
+            try:
+                connection = self._connection()
+                for start in range(0, len(account_ids), self._flush_batch_size):
+                    chunk = account_ids[start:start + self._flush_batch_size]
+                    with connection:
+                        connection.executemany(UPSERT_ACCOUNT, [self._flushing[account_id][1] for account_id in chunk])
+                    with self._lock:
+                        for account_id in chunk:
+                            del self._flushing[account_id]
+            except Exception as error:
+                # The records not committed are queued again, newer writes of the same accounts win
+                with self._lock:
+                    self._pending = {**self._flushing, **self._pending}
+                    self._flushing = {}
+                    self._flush_error = error
+                    self._room_condition.notify_all()
+                raise
+
+            with self._lock:
+                self._flushing = {}
+                self._flush_error = None
+
+    def _run_writer(self) -> None:
+        while True:
+            with self._lock:
+                self._flush_condition.wait(timeout=self._flush_interval)
+                closed = self._closed
+            try:
+                self._flush()
+            except Exception:
+                logger.exception("Committing queued accounts to %s failed, retrying", self._path)
+            if closed:
+                return
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._flush_condition.notify_all()
+            self._room_condition.notify_all()
+        self._writer.join()
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        # The last commit failed, the records still queued are lost
+        if self._flush_error is not None:
+            raise self._flush_error
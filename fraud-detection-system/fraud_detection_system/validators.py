@@ -1,9 +1,14 @@
 import re
 from abc import ABC, abstractmethod
 
+from fraud_detection_system.instrumentation import instrumentation
 from fraud_detection_system.models import FraudRecord
 
 
+EMAIL_PATTERN = re.compile(r"[^@]+@[^@]+\.[^@]+")
+PHONE_NUMBER_PATTERN = re.compile(r"^\+?1?\d{9,15}$") # Example Good Format: +12345678900
+SSN_PATTERN = re.compile(r"^\d{3}-\d{2}-\d{4}$") # Example Good Format: 123-45-6789
+
 class ValidationError(Exception):
     pass
 
@@ -42,7 +47,7 @@ class PersonalInfoDataValidation(DataValidation):
         errors = []
         if not email:
             errors.append(ValidationError("Email is missing"))
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
+        if not EMAIL_PATTERN.match(email):
             errors.append(ValidationError("Invalid email format"))
         return errors
 
@@ -50,7 +55,7 @@ class PersonalInfoDataValidation(DataValidation):
         errors = []
         if not phone_number:
             errors.append(ValidationError("Phone number is missing"))
-        if not re.match(r"^\+?1?\d{9,15}$", phone_number): # Example Good Format: +12345678900
+        if not PHONE_NUMBER_PATTERN.match(phone_number):
             errors.append(ValidationError("Invalid phone number format"))
         return errors
 
@@ -58,7 +63,7 @@ class PersonalInfoDataValidation(DataValidation):
         errors = []
         if not ssn:
             errors.append(ValidationError("SSN is missing"))
-        if not re.match(r"^\d{3}-\d{2}-\d{4}$", ssn): # Example Good Format: 123-45-6789
+        if not SSN_PATTERN.match(ssn):
             errors.append(ValidationError("Invalid SSN format"))
         return errors
 
@@ -120,13 +125,19 @@ class CreditCardDataValidation(DataValidation):
 
 
 class DataValidator(ABC):
+    _validation: DataValidation
+
+    def __init__(self) -> None:
+        # The validations are stateless, so one instance serves every record
+        self._validation = self.create_validator()
+
     @abstractmethod
     def create_validator(self) -> DataValidation:
         pass
 
     def validate(self, fraud_record: FraudRecord) -> list[ValidationError]:
-        validator = self.create_validator()
-        return validator.validate(fraud_record)
+        with instrumentation.span("validation", self.__class__.__name__):
+            return self._validation.validate(fraud_record)
 
 
 class PersonalInfoDataValidator(DataValidator):
@@ -0,0 +1,125 @@
+# Sliding-window counters for velocity checks (how often one IP address, SSN or card was seen
+# recently).
+#
+# Every tracked key holds one ring of time buckets per window. Counting an event advances the
+# rings to the current bucket, clearing the buckets that fell out of the window, and bumps the
+# current bucket and the running total, so both updates and queries are O(1) amortized. The
+# window slides in whole buckets. Memory is bounded by max_keys, the least recently seen key is
+# evicted once the bound is reached.
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+
+
+MAX_KEYS = 100_000
+
+
+@dataclass(frozen=True)
+class VelocityWindow:
+    name: str
+    seconds: float
+    # Number of earlier events within the window that maps to the maximum risk score
+    limit: int
+    buckets: int = 12
+
+    @property
+    def bucket_seconds(self) -> float:
+        return self.seconds / self.buckets
+
+
+DEFAULT_WINDOWS = (
+    VelocityWindow("1m", 60, limit=3),
+    VelocityWindow("1h", 60 * 60, limit=10),
+    VelocityWindow("24h", 24 * 60 * 60, limit=20, buckets=24),
+)
+
+
+class _Ring:
+    __slots__ = ("counts", "epoch", "total")
+
+    def __init__(self, buckets: int, epoch: int) -> None:
+        self.counts = array("I", bytes(4 * buckets))
+        self.epoch = epoch
+        self.total = 0
+
+    def advance(self, epoch: int) -> None:
+        # Clears every bucket between the last seen epoch and the current one
+        elapsed = epoch - self.epoch
+        if elapsed <= 0:
+            return
+        buckets = len(self.counts)
+        if elapsed >= buckets:
+            self.counts = array("I", bytes(4 * buckets))
+            self.total = 0
+        else:
+            for cleared_epoch in range(self.epoch + 1, epoch + 1):
+                index = cleared_epoch % buckets
+                self.total -= self.counts[index]
+                self.counts[index] = 0
+        self.epoch = epoch
+
+
+class VelocityTracker:
+    _windows: tuple[VelocityWindow, ...]
+    _rings: OrderedDict[Hashable, tuple[_Ring, ...]]
+
+    def __init__(
+        self,
+        windows: tuple[VelocityWindow, ...] = DEFAULT_WINDOWS,
+        max_keys: int = MAX_KEYS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._windows = windows
+        self._max_keys = max_keys
+        self._clock = clock
+        self._rings = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    @property
+    def windows(self) -> tuple[VelocityWindow, ...]:
+        return self._windows
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"keys": len(self._rings), "evictions": self._evictions}
+
+    def record(self, key: Hashable) -> tuple[int, ...]:
+        # Counts one event for the key, returns the event counts per window including it
+        epochs = self._epochs()
+        with self._lock:
+            rings = self._rings.get(key)
+            if rings is None:
+                rings = tuple(_Ring(window.buckets, epoch) for window, epoch in zip(self._windows, epochs))
+                self._rings[key] = rings
+                if len(self._rings) > self._max_keys:
+                    self._rings.popitem(last=False)
+                    self._evictions += 1
+            else:
+                self._rings.move_to_end(key)
+
+            for ring, epoch in zip(rings, epochs):
+                ring.advance(epoch)
+                ring.counts[epoch % len(ring.counts)] += 1
+                ring.total += 1
+            return tuple(ring.total for ring in rings)
+
+    def counts(self, key: Hashable) -> tuple[int, ...]:
+        # Returns the event counts per window without counting an event
+        epochs = self._epochs()
+        with self._lock:
+            rings = self._rings.get(key)
+            if rings is None:
+                return (0,) * len(self._windows)
+
+            for ring, epoch in zip(rings, epochs):
+                ring.advance(epoch)
+            return tuple(ring.total for ring in rings)
+
+    def _epochs(self) -> tuple[int, ...]:
+        now = self._clock()
+        return tuple(int(now // window.bucket_seconds) for window in self._windows)
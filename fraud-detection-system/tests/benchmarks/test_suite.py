@@ -0,0 +1,74 @@
+import time
+
+from benchmarks.suite import CaseResult, find_regressions, run_case, store
+from fraud_detection_system.database import DatabaseConnection
+from tests.fraud_detection_system.builder import FraudRecordBuilder
+
+
+def case_result(case: str, records_per_second: float, peak_memory: int | None = None) -> CaseResult:
+    return CaseResult(
+        case=case,
+        records=1_000,
+        records_per_second=records_per_second,
+        p50=0.001,
+        p95=0.002,
+        p99=0.003,
+        max=0.004,
+        peak_memory=peak_memory,
+    )
+
+
+BASELINE = {
+    "results": {
+        "validate": {"records_per_second": 10_000, "peak_memory": 1_000_000},
+        "store": {"records_per_second": 50_000, "peak_memory": None},
+    }
+}
+
+
+class TestFindRegressions:
+    def test_find_regressions__within_tolerance__reports_nothing(self):
+        results = [case_result("validate", 9_100, 1_090_000), case_result("store", 46_000, 5_000_000)]
+        assert find_regressions(results, BASELINE, tolerance=0.1) == []
+
+    def test_find_regressions__slower_and_bigger__reports_throughput_and_memory(self):
+        results = [case_result("validate", 8_900, 1_200_000), case_result("store", 40_000)]
+        regressions = find_regressions(results, BASELINE, tolerance=0.1)
+        assert regressions == [
+            "validate: 8,900 records/s, baseline 10,000",
+            "validate: 1,200,000 bytes peak, baseline 1,000,000",
+            "store: 40,000 records/s, baseline 50,000",
+        ]
+
+    def test_find_regressions__case_missing_from_baseline__is_skipped(self):
+        assert find_regressions([case_result("review", 1)], BASELINE, tolerance=0.1) == []
+
+
+class TestRunCase:
+    def test_run_case__store_case__starts_from_an_empty_store(self):
+        DatabaseConnection().store_fraud_record("acct_left_over", FraudRecordBuilder().build())
+        fraud_records = [FraudRecordBuilder().with_amount(amount).build() for amount in range(10)]
+
+        result = run_case("store", store, fraud_records, seed=0, measure_memory=True)
+
+        assert result.records == 10
+        assert result.peak_memory is not None
+        assert DatabaseConnection().get_fraud_record("acct_left_over") is None
+        assert sum(len(shard) for shard in DatabaseConnection._shards) == len(fraud_records)
+
+    def test_run_case__noisy_passes__reports_the_fastest_pass(self):
+        durations = iter([0.05, 0.01, 0.05])
+        passes = []
+
+        def sleep(fraud_records, latency):
+            duration = next(durations)
+            passes.append(duration)
+            time.sleep(duration)
+            latency.record(duration)
+
+        result = run_case("sleep", sleep, [FraudRecordBuilder().build()], seed=0, measure_memory=False, repeats=3)
+
+        assert passes == [0.05, 0.01, 0.05]
+        assert result.repeats == 3
+        assert result.records_per_second > 1 / 0.04
+        assert result.max < 0.02
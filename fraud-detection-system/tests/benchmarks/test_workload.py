@@ -0,0 +1,36 @@
+import pytest
+
+from benchmarks.suite import data_validators
+from benchmarks.workload import WorkloadConfig, generate_fraud_records
+from fraud_detection_system.columnar_validators import BatchDataValidator
+
+
+def rejected_rows(fraud_records) -> list[bool]:
+    # Whether the batch and the per-record validators of a review reject each record, they must agree
+    validation_result = BatchDataValidator().validate(fraud_records)
+    rejected = []
+    for row, fraud_record in enumerate(fraud_records):
+        errors = [
+            error
+            for validator in data_validators(fraud_record.payment_method)
+            for error in validator.validate(fraud_record)
+        ]
+        assert bool(errors) is not validation_result.is_valid(row)
+        rejected.append(bool(errors))
+    return rejected
+
+
+class TestWorkloadGenerator:
+    def test_generate_fraud_records__same_seed__yields_the_same_records(self):
+        config = WorkloadConfig(records=500, seed=7)
+        assert list(generate_fraud_records(config)) == list(generate_fraud_records(config))
+        assert list(generate_fraud_records(config)) != list(generate_fraud_records(WorkloadConfig(records=500, seed=8)))
+
+    @pytest.mark.parametrize("invalid_share", [0.0, 1.0])
+    def test_generate_fraud_records__invalid_share__validators_reject_exactly_that_share(self, invalid_share):
+        fraud_records = list(generate_fraud_records(WorkloadConfig(records=500, invalid_share=invalid_share)))
+        assert all(rejected == bool(invalid_share) for rejected in rejected_rows(fraud_records))
+
+    def test_generate_fraud_records__partial_invalid_share__rejects_about_that_share(self):
+        fraud_records = list(generate_fraud_records(WorkloadConfig(records=4_000, invalid_share=0.1)))
+        assert sum(rejected_rows(fraud_records)) / len(fraud_records) == pytest.approx(0.1, abs=0.02)
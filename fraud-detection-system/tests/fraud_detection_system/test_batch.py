@@ -0,0 +1,193 @@
+import csv
+import json
+
+import pytest
+
+from fraud_detection_system.batch import (
+    CSV_COLUMNS,
+    BatchInputError,
+    fraud_record_from_csv_row,
+    fraud_record_from_dict,
+    fraud_record_to_dict,
+    main,
+)
+from fraud_detection_system.fraud_detection_service import FraudDetectionService
+from fraud_detection_system.models import CreditCard, PaymentMethodEnum, PersonalInfo
+from tests.fraud_detection_system.builder import FraudRecordBuilder
+
+
+PERSONAL_INFO = PersonalInfo(
+    name="John Doe", age=30, ssn="123-45-6789", email="jdoe@example.com", phone_number="+12345678900"
+)
+
+
+def json_record(fraud_record) -> dict:
+    return {
+        "amount": fraud_record.amount,
+        "personal_info": {
+            "name": fraud_record.personal_info.name,
+            "age": fraud_record.personal_info.age,
+            "ssn": fraud_record.personal_info.ssn,
+            "email": fraud_record.personal_info.email,
+            "phone_number": fraud_record.personal_info.phone_number,
+        },
+        "device_info": {"ip_address": fraud_record.device_info.ip_address},
+        "payment_method": str(fraud_record.payment_method),
+        "bank_account": {
+            "routing_number": fraud_record.bank_account.routing_number,
+            "account_number": fraud_record.bank_account.account_number,
+        },
+    }
+
+
+@pytest.fixture(autouse=True)
+def low_fraud_scores(mocker):
+    mocker.patch("fraud_detection_system.fraud_analysis.random.uniform", return_value=0.1)
+
+
+class TestFraudRecordParsing:
+    def test_fraud_record_from_dict__nested_record__returns_fraud_record(self):
+        fraud_record = FraudRecordBuilder().with_personal_info(PERSONAL_INFO).build()
+        assert fraud_record_from_dict(json_record(fraud_record)) == fraud_record
+
+    def test_fraud_record_to_dict__round_trips_through_json(self):
+        fraud_record = FraudRecordBuilder().with_personal_info(PERSONAL_INFO).build()
+        data = json.loads(json.dumps(fraud_record_to_dict(fraud_record)))
+        assert data == {**json_record(fraud_record), "credit_card": None}
+        assert fraud_record_from_dict(data) == fraud_record
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            [1, 2],
+            {"personal_info": "John Doe"},
+            json_record(FraudRecordBuilder().with_personal_info(PersonalInfo(name="John", age="x", ssn="1")).build()),
+            json_record(FraudRecordBuilder().with_personal_info(PersonalInfo(name="John", age=30.5, ssn="1")).build()),
+            json_record(FraudRecordBuilder().with_personal_info(PersonalInfo(name=7, age=30, ssn="1")).build()),
+        ],
+    )
+    def test_fraud_record_from_dict__mistyped_record__raises_batch_input_error(self, data):
+        with pytest.raises(BatchInputError):
+            fraud_record_from_dict(data)
+
+    def test_fraud_record_from_dict__numeric_strings__coerces_them_like_csv(self):
+        fraud_record = FraudRecordBuilder().with_personal_info(PERSONAL_INFO).build()
+        data = json_record(fraud_record)
+        data["amount"] = str(data["amount"])
+        data["personal_info"]["age"] = "30"
+        assert fraud_record_from_dict(data) == fraud_record
+
+    def test_fraud_record_from_csv_row__credit_card_row__returns_fraud_record(self):
+        row = dict.fromkeys(CSV_COLUMNS, "") | {
+            "amount": "25.5",
+            "name": "John Doe",
+            "age": "30",
+            "ssn": "123-45-6789",
+            "email": "jdoe@example.com",
+            "phone_number": "+12345678900",
+            "ip_address": "10.0.0.1",
+            "payment_method": "cc",
+            "card_number": "4111111111111111",
+            "expiry_date": "12/30",
+            "cvv": "123",
+            "zip_code": "12345",
+        }
+        fraud_record = fraud_record_from_csv_row(row)
+        assert fraud_record.amount == 25.5
+        assert fraud_record.payment_method is PaymentMethodEnum.CREDIT_CARD
+        assert fraud_record.bank_account is None
+        assert fraud_record.credit_card == CreditCard(
+            card_number=4111111111111111, expiry_date="12/30", cvv=123, zip_code="12345"
+        )
+
+    def test_fraud_record_from_csv_row__invalid_age__raises_batch_input_error(self):
+        with pytest.raises(BatchInputError):
+            fraud_record_from_csv_row(dict.fromkeys(CSV_COLUMNS, "") | {"payment_method": "ACH", "age": "thirty"})
+
+
+class TestMain:
+    def test_main__jsonl_input__streams_results_in_input_order(self, tmp_path, capsys):
+        input_path, output_path = tmp_path / "records.jsonl", tmp_path / "results.jsonl"
+        valid = FraudRecordBuilder().with_personal_info(PERSONAL_INFO).build()
+        invalid = FraudRecordBuilder().build()
+        lines = [json.dumps(json_record(valid)), "{not json", json.dumps(json_record(invalid))] * 50
+        input_path.write_text("\n".join(lines) + "\n")
+
+        main(
+            [
+                str(input_path),
+                str(output_path),
+                "--workers",
+                "3",
+                "--database",
+                str(tmp_path / "accounts.db"),
+                "--events",
+                str(tmp_path / "events.jsonl"),
+            ]
+        )
+
+        results = [json.loads(line) for line in output_path.read_text().splitlines()]
+        assert [result["row"] for result in results] == list(range(1, 151))
+        assert results[0]["status"] == "reviewed"
+        assert results[0]["validation_errors"] == []
+        assert "Invalid JSON" in results[1]["error"]
+        assert results[2]["validation_errors"] == ["Invalid phone number format"]
+        assert len({result["account_id"] for result in results if "account_id" in result}) == 100
+        output = capsys.readouterr().out
+        assert "Reviewed 100 records, rejected 50 invalid rows" in output
+        assert "records/s" in output
+        assert "p99" in output
+        events = [json.loads(line) for line in (tmp_path / "events.jsonl").read_text().splitlines()]
+        assert {event["account_id"] for event in events} == {
+            result["account_id"] for result in results if "account_id" in result
+        }
+        assert "Events: 100 delivered" in output
+
+    def test_main__rows_failing_parsing_or_review__fail_only_their_own_row(self, tmp_path, mocker):
+        input_path, output_path = tmp_path / "records.jsonl", tmp_path / "results.jsonl"
+        valid = json.dumps(json_record(FraudRecordBuilder().with_personal_info(PERSONAL_INFO).build()))
+        input_path.write_text("\n".join([valid, "[1, 2]", valid, valid]) + "\n")
+        review_fraud_record = FraudDetectionService.review_fraud_record
+        calls = iter(range(3))
+
+        def fail_second_review(self, account):
+            if next(calls) == 1:
+                raise RuntimeError("analysis failed")
+            return review_fraud_record(self, account)
+
+        mocker.patch.object(FraudDetectionService, "review_fraud_record", fail_second_review)
+        main([str(input_path), str(output_path), "--workers", "1"])
+
+        results = [json.loads(line) for line in output_path.read_text().splitlines()]
+        assert [result.get("status") for result in results] == ["reviewed", None, None, "reviewed"]
+        assert "JSON object" in results[1]["error"]
+        assert "analysis failed" in results[2]["error"]
+
+    def test_main__csv_input_and_output__writes_one_row_per_record(self, tmp_path):
+        input_path, output_path = tmp_path / "records.csv", tmp_path / "results.csv"
+        with open(input_path, "w", newline="") as input_file:
+            writer = csv.DictWriter(input_file, fieldnames=CSV_COLUMNS)
+            writer.writeheader()
+            writer.writerow(
+                dict.fromkeys(CSV_COLUMNS, "")
+                | {
+                    "amount": "100",
+                    "name": "John Doe",
+                    "age": "17",
+                    "ssn": "123-45-6789",
+                    "email": "jdoe@example.com",
+                    "phone_number": "+12345678900",
+                    "ip_address": "10.0.0.1",
+                    "payment_method": "ACH",
+                    "routing_number": "111000025",
+                    "account_number": "123456789",
+                }
+            )
+
+        main([str(input_path), str(output_path)])
+
+        with open(output_path, newline="") as output_file:
+            rows = list(csv.DictReader(output_file))
+        assert len(rows) == 1
+        assert rows[0]["status"] == "reviewed"
+        assert rows[0]["validation_errors"] == "Age must be at least 18"
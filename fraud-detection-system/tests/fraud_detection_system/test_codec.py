@@ -0,0 +1,89 @@
+import pytest
+
+from fraud_detection_system import codec
+from fraud_detection_system.codec import CodecError
+from fraud_detection_system.models import (
+    Account,
+    AccountStatusEnum,
+    CreditCard,
+    PaymentMethodEnum,
+    PersonalInfo,
+)
+from tests.fraud_detection_system.builder import FraudRecordBuilder
+
+
+def build_credit_card_record():
+    return (
+        FraudRecordBuilder()
+        .with_personal_info(PersonalInfo(name="Zoë Ångström " * 20, age=-1, ssn="987-65-4321"))
+        .with_payment_method(PaymentMethodEnum.CREDIT_CARD)
+        .with_bank_account(None)
+        .with_credit_card(CreditCard(card_number=2**70 + 1, expiry_date="12/30", cvv=123, zip_code="12345"))
+        .build()
+    )
+
+
+class TestCodec:
+    @pytest.mark.parametrize(
+        "record",
+        [
+            FraudRecordBuilder().build(),
+            build_credit_card_record(),
+            Account(fraud_record=FraudRecordBuilder().build()),
+            Account(
+                fraud_record=build_credit_card_record(),
+                status=AccountStatusEnum.DECLINED,
+                fraud_score=0.87,
+                data_validation_errors=["Phone number is invalid", "SSN is invalid"],
+                account_id="acct_legacy",
+            ),
+        ],
+    )
+    def test_encode_and_decode__records__round_trips(self, record):
+        decoded = codec.decode(codec.encode(record))
+        assert decoded == record
+        assert type(decoded) is type(record)
+
+    def test_decode__account__restores_account_id_and_enum_members(self):
+        account = Account(fraud_record=FraudRecordBuilder().build(), status=AccountStatusEnum.APPROVED)
+        decoded = codec.decode(codec.encode(account))
+        assert decoded.account_id == account.account_id
+        assert decoded.status is AccountStatusEnum.APPROVED
+        assert decoded.fraud_record.payment_method is PaymentMethodEnum.ACH
+
+    def test_decode_from__concatenated_records_in_memoryview__decodes_each_record(self):
+        records = [FraudRecordBuilder().with_amount(amount).build() for amount in range(3)]
+        buffer = bytearray()
+        for record in records:
+            codec.encode_into(buffer, record)
+        view = memoryview(bytes(buffer))
+        decoded, offset = [], 0
+        while offset < len(view):
+            record, offset = codec.decode_from(view, offset)
+            decoded.append(record)
+        assert decoded == records
+
+    def test_decode__truncated_record__raises_codec_error(self):
+        encoded = codec.encode(Account(fraud_record=FraudRecordBuilder().build()))
+        with pytest.raises(CodecError):
+            codec.decode(encoded[:-5])
+
+    def test_decode__unknown_version__raises_codec_error(self):
+        encoded = codec.encode(FraudRecordBuilder().build())
+        with pytest.raises(CodecError):
+            codec.decode(bytes([codec.CODEC_VERSION + 1]) + encoded[1:])
+
+    def test_decode__version_1_account__defaults_version_to_zero(self):
+        account = Account(fraud_record=FraudRecordBuilder().build(), version=3)
+        # Version 1 accounts end before the version field, 3 encodes as a width byte and a value byte
+        encoded = bytes([1]) + codec.encode(account)[1:-2]
+        decoded = codec.decode(encoded)
+        assert decoded.version == 0
+        assert decoded.account_id == account.account_id
+
+    def test_encode_into__mistyped_field__raises_codec_error_and_keeps_buffer(self):
+        fraud_record = FraudRecordBuilder().with_personal_info(PersonalInfo(name="John", age="30", ssn="1")).build()
+        buffer = bytearray(b"head")
+        with pytest.raises(CodecError):
+            codec.encode_into(buffer, fraud_record)
+        assert buffer == b"head"
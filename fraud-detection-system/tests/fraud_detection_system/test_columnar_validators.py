@@ -0,0 +1,85 @@
+import itertools
+
+from fraud_detection_system.columnar_validators import (
+    BatchDataValidator,
+    PersonalInfoColumnarValidation,
+    PersonalInfoColumns,
+)
+from fraud_detection_system.fraud_detection_service import ReviewAccountState
+from fraud_detection_system.models import BankAccount, CreditCard, PaymentMethodEnum, PersonalInfo
+from tests.fraud_detection_system.builder import FraudRecordBuilder
+
+
+def build_fraud_records():
+    # Every combination of valid and invalid values, for both payment methods
+    personal_infos = [
+        PersonalInfo(name=name, age=age, ssn=ssn, email=email, phone_number=phone_number)
+        for name, age, ssn, email, phone_number in itertools.product(
+            ["John Doe", ""],
+            [30, 17, 0, -5],
+            ["123-45-6789", "123456789", ""],
+            ["jdoe@example.com", "jdoe", ""],
+            ["+12345678900", "555-1234", ""],
+        )
+    ]
+    bank_accounts = [
+        BankAccount(routing_number=111000025, account_number=123456789),
+        BankAccount(routing_number=0, account_number=0),
+    ]
+    credit_cards = [
+        CreditCard(card_number=4111111111111111, expiry_date="12/30", cvv=123, zip_code="12345"),
+        CreditCard(card_number=0, expiry_date="", cvv=0, zip_code=""),
+        CreditCard(card_number=4111111111111111, expiry_date="12/30", cvv=1234, zip_code="12345"),
+    ]
+    fraud_records = []
+    for index, personal_info in enumerate(personal_infos):
+        builder = FraudRecordBuilder().with_personal_info(personal_info)
+        if index % 2:
+            builder = builder.with_bank_account(bank_accounts[index % len(bank_accounts)])
+        else:
+            builder = (
+                builder.with_payment_method(PaymentMethodEnum.CREDIT_CARD)
+                .with_bank_account(None)
+                .with_credit_card(credit_cards[index % len(credit_cards)])
+            )
+        fraud_records.append(builder.build())
+    return fraud_records
+
+
+class TestBatchDataValidator:
+    def test_validate__mixed_records__matches_per_record_validators(self):
+        fraud_records = build_fraud_records()
+        result = BatchDataValidator().validate(fraud_records)
+        for row, fraud_record in enumerate(fraud_records):
+            expected = [
+                str(error)
+                for validator in ReviewAccountState._compile_data_validators(fraud_record.payment_method)
+                for error in validator.validate(fraud_record)
+            ]
+            assert [str(error) for error in result.errors(row)] == expected
+            assert result.is_valid(row) == (not expected)
+
+    def test_invalid_rows__one_invalid_record__returns_its_row(self):
+        valid_personal_info = PersonalInfo(
+            name="John Doe", age=30, ssn="123-45-6789", email="jdoe@example.com", phone_number="+12345678900"
+        )
+        fraud_records = [FraudRecordBuilder().with_personal_info(valid_personal_info).build() for _ in range(3)]
+        fraud_records[1].personal_info = PersonalInfo(
+            name="", age=30, ssn="123-45-6789", email="jdoe@example.com", phone_number="+12345678900"
+        )
+        result = BatchDataValidator().validate(fraud_records)
+        assert result.invalid_rows() == [1]
+        assert result.error_messages(1) == ["Name is missing"]
+
+
+class TestPersonalInfoColumnarValidation:
+    def test_validate_columns__column_arrays__sets_error_bits(self):
+        columns = PersonalInfoColumns(
+            names=["John Doe", ""],
+            ages=[30, 17],
+            ssns=["123-45-6789", "123-45-6789"],
+            phone_numbers=["+12345678900", "+12345678900"],
+            emails=["jdoe@example.com", "jdoe@example.com"],
+        )
+        result = PersonalInfoColumnarValidation().validate_columns(columns)
+        assert list(result.masks) == [0, 0b101]
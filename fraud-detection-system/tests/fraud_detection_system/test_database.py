@@ -1,7 +1,33 @@
+import dataclasses
+import threading
+
 from fraud_detection_system.database import DatabaseConnection
+from fraud_detection_system.fraud_detection_service import FraudDetectionService
+from fraud_detection_system.models import (
+    Account,
+    AccountStatusEnum,
+    CreditCard,
+    DeviceInfo,
+    PaymentMethodEnum,
+    PersonalInfo,
+)
 from tests.fraud_detection_system.builder import FraudRecordBuilder
 
 
+def build_fraud_record(ssn: str, ip_address: str = "10.0.0.1", card_number: int | None = None):
+    builder = (
+        FraudRecordBuilder()
+        .with_personal_info(
+            PersonalInfo(name="Jane Roe", age=40, ssn=ssn, email="jroe@example.com", phone_number="555-1234")
+        )
+        .with_device_info(DeviceInfo(ip_address=ip_address))
+    )
+    if card_number is not None:
+        credit_card = CreditCard(card_number=card_number, expiry_date="12/30", cvv=123, zip_code="12345")
+        builder = builder.with_payment_method(PaymentMethodEnum.CREDIT_CARD).with_credit_card(credit_card)
+    return builder.build()
+
+
 class TestDatabaseConnection:
     def test_singleton__initialize_multiple_instances__produces_same_instance(self):
         db1 = DatabaseConnection()
@@ -14,3 +40,86 @@ class TestDatabaseConnection:
         db.store_fraud_record(account_id="acct_123", fraud_record=fraud_record)
         retrieved_record = db.get_fraud_record(account_id="acct_123")
         assert retrieved_record == fraud_record
+
+    def test_put_many_and_get_many__multiple_records__returns_stored_records(self):
+        fraud_records = {f"acct_bulk_{index}": FraudRecordBuilder().with_amount(index).build() for index in range(100)}
+        db = DatabaseConnection()
+        db.put_many(fraud_records)
+        retrieved_records = db.get_many([*fraud_records, "acct_missing"])
+        assert retrieved_records == fraud_records
+
+    def test_compare_and_store__expected_versions__stores_only_on_match(self):
+        db = DatabaseConnection()
+        account = Account(fraud_record=FraudRecordBuilder().build())
+        assert db.compare_and_store(account.account_id, None, account)
+        assert not db.compare_and_store(account.account_id, None, account)
+
+        updated = dataclasses.replace(account, version=1, status=AccountStatusEnum.REVIEWED)
+        assert not db.compare_and_store(account.account_id, 1, updated)
+        assert db.get_fraud_record(account.account_id) is account
+        assert db.compare_and_store(account.account_id, 0, updated)
+        assert db.get_fraud_record(account.account_id) is updated
+
+    def test_compare_and_store_many__stale_version__stores_the_other_accounts(self):
+        db = DatabaseConnection()
+        accounts = {
+            account.account_id: account for account in (Account(FraudRecordBuilder().build()) for _ in range(3))
+        }
+        db.put_many(accounts)
+        account_ids = list(accounts)
+        updated = {account_id: dataclasses.replace(accounts[account_id], version=1) for account_id in account_ids}
+        expected_versions = {account_ids[0]: 0, account_ids[1]: 0, account_ids[2]: 1}
+
+        assert db.compare_and_store_many(updated, expected_versions) == set(account_ids[:2])
+        assert db.get_many(account_ids) == {**updated, account_ids[2]: accounts[account_ids[2]]}
+
+    def test_update_fraud_record__concurrent_updates__applies_every_update(self):
+        db = DatabaseConnection()
+        db.store_fraud_record(account_id="acct_counter", fraud_record=FraudRecordBuilder().with_amount(0).build())
+
+        def increment_amount(fraud_record):
+            fraud_record.amount += 1
+            return fraud_record
+
+        def worker():
+            for _ in range(1000):
+                db.update_fraud_record("acct_counter", increment_amount)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert db.get_fraud_record("acct_counter").amount == 8000
+
+    def test_find_by__indexed_fields__returns_matching_records(self):
+        db = DatabaseConnection()
+        fraud_records = {
+            "acct_index_1": build_fraud_record("900-00-0001", ip_address="198.51.100.1", card_number=4000000000000001),
+            "acct_index_2": build_fraud_record("900-00-0001", ip_address="198.51.100.2"),
+            "acct_index_3": build_fraud_record("900-00-0003", ip_address="198.51.100.1"),
+        }
+        db.put_many(fraud_records)
+        assert db.find_by_ssn("900-00-0001").keys() == {"acct_index_1", "acct_index_2"}
+        assert db.find_by_ip("198.51.100.1").keys() == {"acct_index_1", "acct_index_3"}
+        assert db.find_by_card_number(4000000000000001) == {"acct_index_1": fraud_records["acct_index_1"]}
+        assert db.find_by_ssn("900-00-0404") == {}
+
+    def test_find_by__reapplied_account__reindexes_replaced_fraud_record(self, mocker):
+        mocker.patch("fraud_detection_system.fraud_analysis.random.uniform", return_value=0.9)
+        fraud_detection_service = FraudDetectionService(database_connection=DatabaseConnection())
+        account = fraud_detection_service.review_fraud_record(
+            Account(fraud_record=build_fraud_record("900-00-0101", ip_address="198.51.100.101"))
+        )
+        fraud_detection_service.decline_fraud_record(account.account_id)
+        assert account.account_id in DatabaseConnection().find_by_status(AccountStatusEnum.DECLINED)
+
+        reapplied = fraud_detection_service.reapply_fraud_record(
+            account.account_id, build_fraud_record("900-00-0102", ip_address="198.51.100.102")
+        )
+        db = DatabaseConnection()
+        assert db.find_by_ssn("900-00-0101") == {}
+        assert db.find_by_ip("198.51.100.101") == {}
+        assert db.find_by_ssn("900-00-0102") == {account.account_id: reapplied}
+        assert account.account_id not in db.find_by_status(AccountStatusEnum.DECLINED)
+        assert account.account_id in db.find_by_status(AccountStatusEnum.REVIEWED)
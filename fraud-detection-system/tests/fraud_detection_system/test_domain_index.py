@@ -0,0 +1,40 @@
+import pytest
+
+from fraud_detection_system.domain_index import DomainSet, DomainSetError
+
+
+DOMAINS = ["mailinator.com", "Guerrillamail.com.", "tempmail.example"]
+
+
+@pytest.fixture
+def domain_set(tmp_path):
+    list_path = tmp_path / "domains.txt"
+    list_path.write_text("# disposable domains\n" + "\n".join(DOMAINS) + "\n\n")
+    index_path = tmp_path / "domains.set"
+    DomainSet.build_from_file(str(list_path), str(index_path))
+    domains = DomainSet.load(str(index_path))
+    yield domains
+    domains.close()
+
+
+class TestDomainSet:
+    def test_len__built_from_file__skips_comments_and_blank_lines(self, domain_set):
+        assert len(domain_set) == 3
+
+    @pytest.mark.parametrize("domain", ["mailinator.com", "GUERRILLAMAIL.COM", "tempmail.example"])
+    def test_contains__listed_domain__returns_true(self, domain_set, domain):
+        assert domain in domain_set
+
+    @pytest.mark.parametrize("domain", ["example.com", "mail.mailinator.com", "com"])
+    def test_contains__unlisted_domain__returns_false(self, domain_set, domain):
+        assert domain not in domain_set
+
+    def test_matches__subdomain_of_listed_domain__returns_true(self, domain_set):
+        assert domain_set.matches("eu.mx.mailinator.com")
+
+    def test_matches__domain_sharing_a_suffix_string__returns_false(self, domain_set):
+        assert not domain_set.matches("notmailinator.com")
+
+    def test_init__not_a_domain_set__raise_domain_set_error(self):
+        with pytest.raises(DomainSetError):
+            DomainSet(b"this is not a domain set file at all")
@@ -0,0 +1,172 @@
+import json
+import threading
+import time
+
+import pytest
+
+from fraud_detection_system.database import DatabaseConnection
+from fraud_detection_system.events import (
+    AccountEvent,
+    EventBus,
+    EventSink,
+    JSONLinesFileSink,
+    OverflowPolicy,
+)
+from fraud_detection_system.fraud_analysis import FraudAnalysisService
+from fraud_detection_system.fraud_detection_service import FraudDetectionService
+from fraud_detection_system.models import Account, AccountStatusEnum, PersonalInfo
+from tests.fraud_detection_system.builder import FraudRecordBuilder
+
+
+class ListSink(EventSink):
+    def __init__(self, release: threading.Event | None = None) -> None:
+        self.batches = []
+        self.events = []
+        self.writing = threading.Event()
+        self._release = release
+
+    def write(self, events):
+        self.writing.set()
+        if self._release is not None:
+            self._release.wait(timeout=5)
+        self.batches.append([event.account_id for event in events])
+        self.events.extend(events)
+
+
+class FailingSink(EventSink):
+    def write(self, events):
+        raise OSError("sink unavailable")
+
+
+def build_event(account_id: str) -> AccountEvent:
+    return AccountEvent(
+        account_id=account_id,
+        status=AccountStatusEnum.REVIEWED,
+        fraud_score=0.5,
+        previous_status=AccountStatusEnum.PENDING,
+        previous_fraud_score=0.0,
+        timestamp=time.time(),
+    )
+
+
+def publish_while_sink_is_busy(bus: EventBus) -> tuple[ListSink, list[bool]]:
+    # The first event occupies the publisher thread, the next three hit the full buffer
+    release = threading.Event()
+    sink = ListSink(release)
+    bus.add_sink(sink)
+    bus.publish(build_event("0"))
+    assert sink.writing.wait(timeout=5)
+    queued = [bus.publish(build_event(str(index))) for index in range(1, 4)]
+    release.set()
+    assert bus.flush(timeout=5)
+    return sink, queued
+
+
+class TestEventBus:
+    def test_publish__without_sinks__drops_nothing_and_queues_nothing(self):
+        bus = EventBus()
+        assert not bus.publish(build_event("0"))
+        assert bus.stats["published"] == 0
+
+    def test_publish__batch_size_reached__delivers_full_batches(self):
+        bus = EventBus(batch_size=3, max_delay=10)
+        sink = ListSink()
+        bus.add_sink(sink)
+        for index in range(6):
+            assert bus.publish(build_event(str(index)))
+        assert bus.flush(timeout=5)
+        bus.close()
+
+        assert sink.batches == [["0", "1", "2"], ["3", "4", "5"]]
+        assert bus.stats == {
+            "depth": 0,
+            "capacity": 65_536,
+            "published": 6,
+            "delivered": 6,
+            "dropped": 0,
+            "batches": 2,
+            "failed_batches": 0,
+        }
+        assert bus.lag.snapshot()["count"] == 6
+
+    def test_publish__time_window_elapsed__delivers_partial_batch(self):
+        bus = EventBus(batch_size=100, max_delay=0.01)
+        sink = ListSink()
+        bus.add_sink(sink)
+        bus.publish(build_event("0"))
+        bus.publish(build_event("1"))
+        deadline = time.monotonic() + 5
+        while not sink.batches and time.monotonic() < deadline:
+            time.sleep(0.005)
+        bus.close()
+
+        assert sink.batches == [["0", "1"]]
+
+    @pytest.mark.parametrize(
+        ("overflow_policy", "expected_batches", "expected_queued"),
+        [
+            (OverflowPolicy.DROP_OLDEST, [["0"], ["2"], ["3"]], [True, True, True]),
+            (OverflowPolicy.DROP_NEWEST, [["0"], ["1"], ["2"]], [True, True, False]),
+            (OverflowPolicy.BLOCK, [["0"], ["1"], ["2"]], [True, True, False]),
+        ],
+    )
+    def test_publish__full_buffer__applies_overflow_policy(self, overflow_policy, expected_batches, expected_queued):
+        bus = EventBus(capacity=2, batch_size=1, max_delay=10, overflow_policy=overflow_policy, block_timeout=0.05)
+        sink, queued = publish_while_sink_is_busy(bus)
+        bus.close()
+
+        assert sink.batches == expected_batches
+        assert queued == expected_queued
+        assert bus.stats["dropped"] == 1
+
+    def test_publish__failing_sink__other_sinks_still_receive_the_batch(self, caplog):
+        bus = EventBus(batch_size=1, max_delay=10)
+        sink = ListSink()
+        bus.add_sink(FailingSink())
+        bus.add_sink(sink)
+        bus.publish(build_event("0"))
+        assert bus.flush(timeout=5)
+        bus.close()
+
+        assert sink.batches == [["0"]]
+        assert [record.exc_info[0] for record in caplog.records] == [OSError]
+        assert bus.stats["failed_batches"] == 1
+        assert bus.stats["delivered"] == 0
+        assert not bus.publish(build_event("1"))
+
+    def test_close__file_sink__writes_waiting_events_as_json_lines(self, tmp_path):
+        bus = EventBus(max_delay=10)
+        bus.add_sink(JSONLinesFileSink(str(tmp_path / "events.jsonl")))
+        bus.publish(build_event("0"))
+        bus.close()
+
+        lines = (tmp_path / "events.jsonl").read_text().splitlines()
+        assert [json.loads(line)["account_id"] for line in lines] == ["0"]
+        assert json.loads(lines[0])["status"] == "reviewed"
+
+
+class TestAccountEvents:
+    def test_update_account__review_then_approve__publishes_each_change(self, mocker):
+        mocker.patch("fraud_detection_system.fraud_analysis.random.uniform", return_value=0.2)
+        # The time window outlasts the test, close() delivers the events
+        bus = EventBus(max_delay=10)
+        sink = ListSink()
+        bus.add_sink(sink)
+        fraud_detection_service = FraudDetectionService(FraudAnalysisService(), DatabaseConnection(), event_bus=bus)
+        fraud_record = FraudRecordBuilder().with_personal_info(
+            PersonalInfo(
+                name="John Doe", age=30, ssn="123-45-6789", email="jdoe@example.com", phone_number="+12345678900"
+            )
+        ).build()
+
+        account = fraud_detection_service.review_fraud_record(Account(fraud_record=fraud_record))
+        fraud_detection_service.approve_fraud_record(account.account_id)
+        bus.close()
+
+        events = sink.events
+        assert [(event.previous_status, event.status) for event in events] == [
+            (AccountStatusEnum.PENDING, AccountStatusEnum.REVIEWED),
+            (AccountStatusEnum.REVIEWED, AccountStatusEnum.APPROVED),
+        ]
+        assert [event.fraud_score for event in events] == [account.fraud_score] * 2
+        assert {event.account_id for event in events} == {account.account_id}
@@ -1,4 +1,18 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
 from fraud_detection_system.fraud_analysis import (
+    FraudAnalysis,
+    FraudAnalysisError,
+    FraudAnalysisCache,
+    FraudAnalysisCacheRegistry,
+    FraudAnalysisService,
+    DefaultAnalysisHandler,
+    EmailAnalysisHandler,
+    PhoneNumberAnalysisHandler,
     IPAddressRecordFraudAnalysis,
     GeoIPAddressFraudAnalysis,
     FreeEmailDomainFraudAnalysis,
@@ -8,7 +22,17 @@ from fraud_detection_system.fraud_analysis import (
     IPAddressFraudAnalyzer,
     EmailDomainFraudAnalyzer,
     PhoneNumberFraudAnalyzer,
+    VelocityAnalysisHandler,
+    VelocityFraudAnalyzer,
+    IPAddressVelocityFraudAnalysis,
+    SSNVelocityFraudAnalysis,
+    CardNumberVelocityFraudAnalysis,
 )
+from fraud_detection_system.domain_index import DomainSet
+from fraud_detection_system.ip_index import IPPrefixIndex
+from fraud_detection_system.models import CreditCard, DeviceInfo, PaymentMethodEnum, PersonalInfo
+from fraud_detection_system.phone_index import PhoneNumberIndex
+from fraud_detection_system.velocity import VelocityTracker, VelocityWindow
 from tests.fraud_detection_system.builder import FraudRecordBuilder
 
 
@@ -24,6 +48,29 @@ class TestIPAddressRecordFraudAnalysis:
         assert risk_score == 0.75
 
 
+    def test_assess_risk__with_ip_index__returns_indexed_score(self, mocker):
+        mocker.patch.object(
+            IPAddressRecordFraudAnalysis,
+            "ip_index",
+            new=IPPrefixIndex(IPPrefixIndex.build([("10.0.0.0/8", 0.6)])),
+        )
+        fraud_analysis = IPAddressRecordFraudAnalysis(
+            fraud_record=FraudRecordBuilder().build()
+        )
+        assert fraud_analysis.assess_risk() == 0.6
+
+    def test_assess_risk__ip_address_not_in_ip_index__returns_zero_score(self, mocker):
+        mocker.patch.object(
+            IPAddressRecordFraudAnalysis,
+            "ip_index",
+            new=IPPrefixIndex(IPPrefixIndex.build([("192.168.0.0/16", 0.6)])),
+        )
+        fraud_analysis = IPAddressRecordFraudAnalysis(
+            fraud_record=FraudRecordBuilder().build()
+        )
+        assert fraud_analysis.assess_risk() == 0.0
+
+
 class TestGeoIPAddressFraudAnalysis:
     def test_assess_risk__with_valid_ipv4__returns_risk_score(self, mocker):
         mocker.patch(
@@ -48,6 +95,18 @@ class TestFreeEmailDomainFraudAnalysis:
         assert risk_score == 0.75
 
 
+    def test_assess_risk__email_domain_in_domain_set__returns_listed_risk_score(self, mocker):
+        mocker.patch.object(
+            FreeEmailDomainFraudAnalysis,
+            "domain_set",
+            new=DomainSet(DomainSet.build(["example.com"])),
+        )
+        fraud_analysis = FreeEmailDomainFraudAnalysis(
+            fraud_record=FraudRecordBuilder().build()
+        )
+        assert fraud_analysis.assess_risk() == 0.5
+
+
 class TestDarkWebEmailDomainFraudAnalysis:
     def test_assess_risk__with_email_address__returns_risk_score(self, mocker):
         mocker.patch(
@@ -60,6 +119,23 @@ class TestDarkWebEmailDomainFraudAnalysis:
         assert risk_score == 0.75
 
 
+    @pytest.mark.parametrize(
+        "email, expected_score",
+        [("jdoe@onion.example", 1.0), ("jdoe@mail.onion.example", 1.0), ("jdoe@example.com", 0.0)],
+    )
+    def test_assess_risk__with_domain_set__returns_listed_risk_score(self, mocker, email, expected_score):
+        mocker.patch.object(
+            DarkWebEmailDomainFraudAnalysis,
+            "domain_set",
+            new=DomainSet(DomainSet.build(["onion.example"])),
+        )
+        personal_info = PersonalInfo(name="John Doe", age=30, ssn="123-45-6789", email=email)
+        fraud_analysis = DarkWebEmailDomainFraudAnalysis(
+            fraud_record=FraudRecordBuilder().with_personal_info(personal_info).build()
+        )
+        assert fraud_analysis.assess_risk() == expected_score
+
+
 class TestSpamRecordPhoneNumberFraudAnalysis:
     def test_assess_risk__with_email_address__returns_risk_score(self, mocker):
         mocker.patch(
@@ -72,6 +148,27 @@ class TestSpamRecordPhoneNumberFraudAnalysis:
         assert risk_score == 0.75
 
 
+    @pytest.mark.parametrize(
+        "phone_number, expected_score",
+        [("+1 (555) 123-4567", 1.0), ("555.123.4567", 1.0), ("+15551234568", 0.0)],
+    )
+    def test_assess_risk__with_phone_index__returns_listed_risk_score(
+        self, mocker, phone_number, expected_score
+    ):
+        mocker.patch.object(
+            SpamRecordPhoneNumberFraudAnalysis,
+            "phone_index",
+            new=PhoneNumberIndex(PhoneNumberIndex.build(["+15551234567"])),
+        )
+        personal_info = PersonalInfo(
+            name="John Doe", age=30, ssn="123-45-6789", phone_number=phone_number
+        )
+        fraud_analysis = SpamRecordPhoneNumberFraudAnalysis(
+            fraud_record=FraudRecordBuilder().with_personal_info(personal_info).build()
+        )
+        assert fraud_analysis.assess_risk() == expected_score
+
+
 class TestFraudAnalyzer:
     def test_assess_risks__mock_risk_assessments__returns_risk_scores(self, mocker):
         mock_analysis_instances = [
@@ -119,6 +216,245 @@ class TestFraudAnalyzer:
         assert risk_scores == {"MockFraudAnalyzer": 0.5}
 
 
+class FixedScoreFraudAnalysis(FraudAnalysis):
+    SCORE = 0.2
+    DELAY = 0.0
+
+    def assess_risk(self) -> float:
+        time.sleep(self.DELAY)
+        return self.SCORE
+
+
+class SlowFixedScoreFraudAnalysis(FixedScoreFraudAnalysis):
+    SCORE = 0.8
+    DELAY = 0.2
+
+
+class FixedScoreFraudAnalyzer(FraudAnalyzer):
+    def risk_assessments(self, fraud_record):
+        return [
+            FixedScoreFraudAnalysis(fraud_record),
+            SlowFixedScoreFraudAnalysis(fraud_record),
+        ]
+
+
+class TestConcurrentFraudAnalyzer:
+    def test_assess_risks__with_executor__returns_same_score_as_serial(self):
+        fraud_record = FraudRecordBuilder().build()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            concurrent_scores = FixedScoreFraudAnalyzer(executor=executor).assess_risks(fraud_record)
+        serial_scores = FixedScoreFraudAnalyzer().assess_risks(fraud_record)
+        assert concurrent_scores == serial_scores == {"FixedScoreFraudAnalyzer": 0.5}
+
+    def test_assess_risks__analysis_exceeds_timeout__raise_fraud_analysis_error(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            fraud_analyzer = FixedScoreFraudAnalyzer(
+                executor=executor,
+                timeouts={SlowFixedScoreFraudAnalysis: 0.01},
+            )
+            with pytest.raises(FraudAnalysisError):
+                fraud_analyzer.assess_risks(FraudRecordBuilder().build())
+
+
+class TestFraudAnalysisService:
+    def test_analyze_fraud_record__with_executor__returns_all_analyzer_scores(self, mocker):
+        mocker.patch(
+            "fraud_detection_system.fraud_analysis.random.uniform", return_value=0.1
+        )
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            analysis = FraudAnalysisService(executor=executor).analyze_fraud_record(
+                FraudRecordBuilder().build()
+            )
+        assert analysis == {
+            "IPAddressFraudAnalyzer": 0.1,
+            "VelocityFraudAnalyzer": 0.0,
+            "EmailDomainFraudAnalyzer": 0.1,
+            "PhoneNumberFraudAnalyzer": 0.1,
+        }
+
+    def test_handler_chain__multiple_calls__reuses_built_chain(self, mocker):
+        build_handler_chain = mocker.spy(FraudAnalysisService, "_build_handler_chain")
+        fraud_analysis_service = FraudAnalysisService()
+        fraud_analysis_service.analyze_fraud_record(FraudRecordBuilder().build())
+        fraud_analysis_service.analyze_fraud_record(FraudRecordBuilder().build())
+        assert build_handler_chain.call_count == 1
+        assert isinstance(fraud_analysis_service.handler_chain, DefaultAnalysisHandler)
+
+    def test_analyze_fraud_records__records_share_lookup_keys__assesses_each_key_once(self, mocker):
+        mock_uniform = mocker.patch(
+            "fraud_detection_system.fraud_analysis.random.uniform", return_value=0.1
+        )
+        fraud_records = iter([FraudRecordBuilder().build() for _ in range(3)])
+        analyses = FraudAnalysisService().analyze_fraud_records(fraud_records)
+        # Velocity counts every record, the second and third see one and two earlier applications
+        assert analyses == [
+            {
+                "IPAddressFraudAnalyzer": 0.1,
+                "VelocityFraudAnalyzer": velocity_score,
+                "EmailDomainFraudAnalyzer": 0.1,
+                "PhoneNumberFraudAnalyzer": 0.1,
+            }
+            for velocity_score in (0.0, pytest.approx(1 / 3), pytest.approx(2 / 3))
+        ]
+        # 2 IP analyses, 2 email domain analyses and 1 phone number analysis
+        assert mock_uniform.call_count == 5
+
+    def test_analyze_fraud_record_async__mock_risk_scores__returns_all_analyzer_scores(self, mocker):
+        mocker.patch(
+            "fraud_detection_system.fraud_analysis.random.uniform", return_value=0.1
+        )
+        analysis = asyncio.run(
+            FraudAnalysisService().analyze_fraud_record_async(FraudRecordBuilder().build())
+        )
+        assert analysis == {
+            "IPAddressFraudAnalyzer": 0.1,
+            "VelocityFraudAnalyzer": 0.0,
+            "EmailDomainFraudAnalyzer": 0.1,
+            "PhoneNumberFraudAnalyzer": 0.1,
+        }
+
+
+class HighScoreFraudAnalyzer(FraudAnalyzer):
+    def risk_assessments(self, fraud_record):
+        return [FixedScoreFraudAnalysis(fraud_record)]
+
+    def _summarize_risk_scores(self, assessment_scores):
+        return 0.9
+
+
+class SlowFraudAnalyzer(FraudAnalyzer):
+    def risk_assessments(self, fraud_record):
+        return [SlowFixedScoreFraudAnalysis(fraud_record)]
+
+
+class TestFraudAnalysisHandlerAsync:
+    def test_start_handling_async__no_short_circuit__returns_same_analysis_as_sync(self):
+        handler = DefaultAnalysisHandler(FixedScoreFraudAnalyzer())
+        handler.set_next_handler(EmailAnalysisHandler(SlowFraudAnalyzer()))
+        fraud_record = FraudRecordBuilder().build()
+        analysis = asyncio.run(handler.start_handling_async(fraud_record))
+        assert analysis == handler.start_handling(fraud_record)
+        assert analysis == {"FixedScoreFraudAnalyzer": 0.5, "SlowFraudAnalyzer": 0.8}
+
+    def test_start_handling_async__handler_exceeds_risk_threshold__cancels_downstream_handlers(self):
+        handler = EmailAnalysisHandler(HighScoreFraudAnalyzer())
+        handler.set_next_handler(PhoneNumberAnalysisHandler(SlowFraudAnalyzer()))
+
+        async def timed_handling():
+            started_at = time.monotonic()
+            analysis = await handler.start_handling_async(FraudRecordBuilder().build())
+            return analysis, time.monotonic() - started_at
+
+        analysis, elapsed = asyncio.run(timed_handling())
+        assert analysis == {"HighScoreFraudAnalyzer": 0.9}
+        assert elapsed < SlowFixedScoreFraudAnalysis.DELAY
+
+    def test_start_handling_async__record_without_phone_number__skips_phone_handler(self):
+        handler = PhoneNumberAnalysisHandler(SlowFraudAnalyzer())
+        fraud_record = FraudRecordBuilder().build()
+        fraud_record.personal_info.phone_number = None
+        analysis = asyncio.run(handler.start_handling_async(fraud_record))
+        assert analysis == {}
+
+
+class TestFraudAnalysisHandlerBatch:
+    def test_start_handling_batch__handler_exceeds_risk_threshold__skips_downstream_handlers(self):
+        handler = EmailAnalysisHandler(HighScoreFraudAnalyzer())
+        handler.set_next_handler(PhoneNumberAnalysisHandler(FixedScoreFraudAnalyzer()))
+        without_email = FraudRecordBuilder().build()
+        without_email.personal_info.email = None
+        analyses = handler.start_handling_batch([FraudRecordBuilder().build(), without_email])
+        assert analyses == [
+            {"HighScoreFraudAnalyzer": 0.9},
+            {"FixedScoreFraudAnalyzer": 0.5},
+        ]
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestFraudAnalysisCache:
+    def test_get_or_assess__repeated_key__assesses_once_and_counts_hit(self, mocker):
+        cache = FraudAnalysisCache(ttl=60)
+        assess = mocker.Mock(return_value=0.3)
+        assert cache.get_or_assess("10.0.0.1", assess) == 0.3
+        assert cache.get_or_assess("10.0.0.1", assess) == 0.3
+        assert assess.call_count == 1
+        assert cache.stats == {"hits": 1, "misses": 1, "evictions": 0, "size": 1}
+
+    def test_get_or_assess__entry_expired__assesses_again(self, mocker):
+        clock = FakeClock()
+        cache = FraudAnalysisCache(ttl=60, clock=clock)
+        assess = mocker.Mock(return_value=0.3)
+        cache.get_or_assess("10.0.0.1", assess)
+        clock.now = 61
+        cache.get_or_assess("10.0.0.1", assess)
+        assert assess.call_count == 2
+
+    def test_get_or_assess__max_size_exceeded__evicts_least_recently_used(self, mocker):
+        cache = FraudAnalysisCache(ttl=60, max_size=2)
+        assess = mocker.Mock(return_value=0.3)
+        cache.get_or_assess("a", assess)
+        cache.get_or_assess("b", assess)
+        cache.get_or_assess("a", assess)
+        cache.get_or_assess("c", assess)
+        cache.get_or_assess("a", assess)
+        cache.get_or_assess("b", assess)
+        assert assess.call_count == 4
+        assert cache.stats["evictions"] == 2
+
+    def test_get_or_assess__assessment_fails__caches_error(self, mocker):
+        clock = FakeClock()
+        cache = FraudAnalysisCache(ttl=60, negative_ttl=5, clock=clock)
+        assess = mocker.Mock(side_effect=FraudAnalysisError("lookup failed"))
+        for _ in range(2):
+            with pytest.raises(FraudAnalysisError):
+                cache.get_or_assess("10.0.0.1", assess)
+        assert assess.call_count == 1
+        clock.now = 6
+        with pytest.raises(FraudAnalysisError):
+            cache.get_or_assess("10.0.0.1", assess)
+        assert assess.call_count == 2
+
+
+class TestFraudAnalysisCacheRegistry:
+    def test_enable__ip_address_record_analysis__caches_by_normalized_ip_address(self, mocker):
+        mock_uniform = mocker.patch(
+            "fraud_detection_system.fraud_analysis.random.uniform", return_value=0.4
+        )
+        cache = FraudAnalysisCacheRegistry.enable(IPAddressRecordFraudAnalysis, ttl=60)
+        try:
+            fraud_analyzer = IPAddressFraudAnalyzer()
+            for ip_address in ("2001:db8::1", "2001:0db8:0:0::1"):
+                fraud_record = FraudRecordBuilder().with_device_info(DeviceInfo(ip_address=ip_address)).build()
+                assert fraud_analyzer.assess_risks(fraud_record) == {"IPAddressFraudAnalyzer": 0.4}
+        finally:
+            FraudAnalysisCacheRegistry.disable(IPAddressRecordFraudAnalysis)
+        # GeoIPAddressFraudAnalysis is not cached, so it runs for both records
+        assert mock_uniform.call_count == 3
+        assert cache.stats["hits"] == 1
+
+    def test_enable__batch_of_records__works_out_each_lookup_key_once(self, mocker):
+        mocker.patch("fraud_detection_system.fraud_analysis.random.uniform", return_value=0.4)
+        lookup_key = mocker.patch.object(
+            IPAddressRecordFraudAnalysis, "lookup_key", new_callable=mocker.PropertyMock, return_value="10.0.0.1"
+        )
+        cache = FraudAnalysisCacheRegistry.enable(IPAddressRecordFraudAnalysis, ttl=60)
+        try:
+            analyses = IPAddressFraudAnalyzer().assess_risks_batch([FraudRecordBuilder().build() for _ in range(3)])
+        finally:
+            FraudAnalysisCacheRegistry.disable(IPAddressRecordFraudAnalysis)
+        assert analyses == [{"IPAddressFraudAnalyzer": 0.4}] * 3
+        # Once per record to merge the analyses, the cache reuses the key of the merged analysis
+        assert lookup_key.call_count == 3
+        assert cache.stats == {"hits": 0, "misses": 1, "evictions": 0, "size": 1}
+
+
 class TestIPAddressFraudAnalyzer:
     def test_risk_assessments__with_fraud_record__returns_fraud_analysis(self):
         fraud_analyzer = IPAddressFraudAnalyzer()
@@ -148,4 +484,41 @@ class TestPhoneNumberFraudAnalyzer:
             fraud_record=FraudRecordBuilder().build()
         )
         assert len(fraud_analysis) == 1
-        assert isinstance(fraud_analysis[0], SpamRecordPhoneNumberFraudAnalysis)
\ No newline at end of file
+        assert isinstance(fraud_analysis[0], SpamRecordPhoneNumberFraudAnalysis)
+
+class TestVelocityFraudAnalyzer:
+    def test_risk_assessments__credit_card_record__includes_card_number_analysis(self):
+        fraud_analyzer = VelocityFraudAnalyzer(VelocityTracker())
+        credit_card = CreditCard(card_number=4111111111111111, expiry_date="12/30", cvv=123, zip_code="12345")
+        fraud_record = (
+            FraudRecordBuilder()
+            .with_payment_method(PaymentMethodEnum.CREDIT_CARD)
+            .with_credit_card(credit_card)
+            .build()
+        )
+        fraud_analysis = fraud_analyzer.risk_assessments(fraud_record)
+        assert [type(analysis) for analysis in fraud_analysis] == [
+            IPAddressVelocityFraudAnalysis,
+            SSNVelocityFraudAnalysis,
+            CardNumberVelocityFraudAnalysis,
+        ]
+        assert len(fraud_analyzer.risk_assessments(FraudRecordBuilder().build())) == 2
+
+    def test_assess_risks__repeated_ssn__scores_highest_velocity(self):
+        fraud_analyzer = VelocityFraudAnalyzer(VelocityTracker((VelocityWindow("1m", 60, limit=2),)))
+        scores = []
+        for index in range(4):
+            fraud_record = FraudRecordBuilder().with_device_info(DeviceInfo(ip_address=f"10.0.0.{index}")).build()
+            scores.append(fraud_analyzer.assess_risks(fraud_record))
+        assert scores == [{"VelocityFraudAnalyzer": score} for score in (0.0, 0.5, 1.0, 1.0)]
+
+    def test_handle__velocity_above_threshold__short_circuits_chain(self, mocker):
+        velocity_tracker = VelocityTracker((VelocityWindow("1m", 60, limit=1),))
+        handler = VelocityAnalysisHandler(VelocityFraudAnalyzer(velocity_tracker))
+        next_analyzer = mocker.Mock(spec=FraudAnalyzer)
+        next_analyzer.assess_risks.return_value = {"NextFraudAnalyzer": 0.1}
+        handler.set_next_handler(EmailAnalysisHandler(next_analyzer))
+        fraud_record = FraudRecordBuilder().build()
+        assert handler.start_handling(fraud_record) == {"VelocityFraudAnalyzer": 0.0, "NextFraudAnalyzer": 0.1}
+        assert handler.start_handling(fraud_record) == {"VelocityFraudAnalyzer": 1.0}
+        assert next_analyzer.assess_risks.call_count == 1
@@ -1,16 +1,31 @@
+import dataclasses
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
-from fraud_detection_system.models import Account, AccountStatusEnum
+from fraud_detection_system.database import DatabaseConnection
+from fraud_detection_system.events import EventBus
+from fraud_detection_system.models import Account, AccountStatusEnum, PaymentMethodEnum, PersonalInfo
 from fraud_detection_system.fraud_analysis import FraudAnalysisService
 from fraud_detection_system.fraud_detection_service import (
     PendingAccountState,
     AccountContext,
     ReviewAccountState,
     AccountContextError,
+    FraudDetectionService,
+    ConcurrentUpdateError,
+    MAX_UPDATE_ATTEMPTS,
+    NEXT_ACTIONS,
 )
 from tests.fraud_detection_system.builder import FraudRecordBuilder
 
 
+def build_valid_record():
+    return FraudRecordBuilder().with_personal_info(
+        PersonalInfo(name="John Doe", age=30, ssn="123-45-6789", email="jdoe@example.com", phone_number="+12345678900")
+    ).build()
+
+
 class TestAccountContext:
     def test_fraud_analysis_service__mock_fraud_analysis_service__returns_mocked_service(self, mocker):
         mock_fraud_analysis_service = mocker.Mock(spec=FraudAnalysisService)
@@ -70,6 +85,21 @@ class TestAccountContext:
         assert fraud_detection_service.account.fraud_score == 75.0
         assert fraud_detection_service.account.data_validation_errors == ["error1", "error2"]
     
+    def test_update_account__quiet_velocity_analysis__keeps_the_score_of_the_other_analyzers(self, mocker):
+        mock_fraud_analysis_service = mocker.Mock(spec=FraudAnalysisService)
+        account = Account(fraud_record=FraudRecordBuilder().build())
+        fraud_detection_service = AccountContext(
+            account=account,
+            fraud_analysis_service=mock_fraud_analysis_service
+        )
+        analysis = dict.fromkeys(
+            ("IPAddressFraudAnalyzer", "EmailDomainFraudAnalyzer", "PhoneNumberFraudAnalyzer"), 0.8
+        )
+        fraud_detection_service.update_account(analysis={**analysis, "VelocityFraudAnalyzer": 0.0})
+        assert fraud_detection_service.account.fraud_score == 0.8
+        fraud_detection_service.update_account(analysis={**analysis, "VelocityFraudAnalyzer": 0.9})
+        assert fraud_detection_service.account.fraud_score == 0.9
+    
     def test_do_review__mock_review_account_state__review_account_state_do_review_called(self, mocker):
         mock_fraud_analysis_service = mocker.Mock(spec=FraudAnalysisService)
         account = Account(fraud_record=FraudRecordBuilder().build())
@@ -96,4 +126,279 @@ class TestAccountContext:
         mock_account_state.next_state_on_success.return_value = tuple()
         fraud_detection_service.account_state = mock_account_state
         with pytest.raises(AccountContextError):
-            fraud_detection_service.do_review()
\ No newline at end of file
+            fraud_detection_service.do_review()
+
+
+class TestReviewAccountState:
+    def test_build_data_validators__same_payment_method__returns_shared_validators(self, mocker):
+        mock_fraud_analysis_service = mocker.Mock(spec=FraudAnalysisService)
+        contexts = [
+            AccountContext(
+                account=Account(fraud_record=FraudRecordBuilder().build()),
+                fraud_analysis_service=mock_fraud_analysis_service,
+            )
+            for _ in range(2)
+        ]
+        validators = [ReviewAccountState(context)._build_data_validators() for context in contexts]
+        assert validators[0] is validators[1]
+        assert len(validators[0]) == 2
+
+    def test_build_data_validators__credit_card_payment_method__returns_credit_card_validator(self, mocker):
+        mock_fraud_analysis_service = mocker.Mock(spec=FraudAnalysisService)
+        fraud_record = FraudRecordBuilder().with_payment_method(PaymentMethodEnum.CREDIT_CARD).build()
+        context = AccountContext(
+            account=Account(fraud_record=fraud_record),
+            fraud_analysis_service=mock_fraud_analysis_service,
+        )
+        validators = ReviewAccountState(context)._build_data_validators()
+        assert [type(validator).__name__ for validator in validators] == [
+            "PersonalInfoDataValidator",
+            "CreditCardDataValidator",
+        ]
+
+
+class TestFraudDetectionService:
+    def test_review_fraud_records__valid_and_invalid_records__scores_only_valid_records_in_one_batch(self, mocker):
+        mock_fraud_analysis_service = mocker.Mock(spec=FraudAnalysisService)
+        mock_fraud_analysis_service.analyze_fraud_records.side_effect = lambda records: [
+            {"IPAddressFraudAnalyzer": 0.4} for _ in records
+        ]
+        valid_record = FraudRecordBuilder().with_personal_info(
+            PersonalInfo(
+                name="John Doe", age=30, ssn="123-45-6789", email="jdoe@example.com", phone_number="+12345678900"
+            )
+        ).build()
+        accounts = [
+            Account(fraud_record=valid_record),
+            Account(fraud_record=FraudRecordBuilder().build()),
+            Account(fraud_record=valid_record),
+        ]
+        database_connection = DatabaseConnection()
+        reviewed = FraudDetectionService(mock_fraud_analysis_service, database_connection).review_fraud_records(
+            accounts
+        )
+        mock_fraud_analysis_service.analyze_fraud_records.assert_called_once()
+        assert [account.status for account in reviewed] == [AccountStatusEnum.REVIEWED] * 3
+        assert [account.fraud_score for account in reviewed] == [0.4, 0.0, 0.4]
+        assert reviewed[1].data_validation_errors == ["Invalid phone number format"]
+        assert all(database_connection.get_fraud_record(account.account_id) is account for account in reviewed)
+
+    def test_review_fraud_records__approved_account__raises_account_context_error(self, mocker):
+        mock_fraud_analysis_service = mocker.Mock(spec=FraudAnalysisService)
+        accounts = [
+            Account(fraud_record=FraudRecordBuilder().build()),
+            Account(fraud_record=FraudRecordBuilder().build(), status=AccountStatusEnum.APPROVED),
+        ]
+        with pytest.raises(AccountContextError):
+            FraudDetectionService(mock_fraud_analysis_service, DatabaseConnection()).review_fraud_records(accounts)
+        mock_fraud_analysis_service.analyze_fraud_records.assert_not_called()
+
+    def test_review_many__bulk_store_fails_part_way__assesses_once_and_stores_every_account(self, mocker):
+        mocker.patch("fraud_detection_system.fraud_analysis.random.uniform", return_value=0.1)
+        fraud_analysis_service = FraudAnalysisService()
+        database_connection = DatabaseConnection()
+        accounts = [Account(fraud_record=build_valid_record()) for _ in range(8)]
+        approved = Account(fraud_record=build_valid_record(), status=AccountStatusEnum.APPROVED)
+        compare_and_store_many = database_connection.compare_and_store_many
+
+        def fail_part_way(fraud_records, expected_versions):
+            # Half of the accounts land before the store fails
+            compare_and_store_many(dict(list(fraud_records.items())[:4]), expected_versions)
+            raise RuntimeError("disk full")
+
+        mocker.patch.object(database_connection, "compare_and_store_many", side_effect=fail_part_way)
+        results = FraudDetectionService(fraud_analysis_service, database_connection).review_many([*accounts, approved])
+
+        assert [result.status for result in results[:8]] == [AccountStatusEnum.REVIEWED] * 8
+        assert [result.version for result in results[:8]] == [0] * 8
+        assert str(results[8]) == "Review action is currently not available"
+        assert fraud_analysis_service.velocity_tracker.counts(("ssn", "123-45-6789")) == (8, 8, 8)
+        for account, result in zip(accounts, results):
+            assert database_connection.get_fraud_record(account.account_id) == result
+
+    def test_review_many__store_of_one_account_fails__fails_only_that_account(self, mocker):
+        mock_fraud_analysis_service = mocker.Mock(spec=FraudAnalysisService)
+        mock_fraud_analysis_service.analyze_fraud_records.side_effect = lambda records: [
+            {"IPAddressFraudAnalyzer": 0.4} for _ in records
+        ]
+        database_connection = DatabaseConnection()
+        accounts = [Account(fraud_record=build_valid_record()) for _ in range(3)]
+        compare_and_store = database_connection.compare_and_store
+
+        def fail_first_account(account_id, expected_version, fraud_record):
+            if account_id == accounts[0].account_id:
+                raise RuntimeError("disk full")
+            return compare_and_store(account_id, expected_version, fraud_record)
+
+        mocker.patch.object(database_connection, "compare_and_store_many", side_effect=RuntimeError("disk full"))
+        mocker.patch.object(database_connection, "compare_and_store", side_effect=fail_first_account)
+        results = FraudDetectionService(mock_fraud_analysis_service, database_connection).review_many(accounts)
+
+        mock_fraud_analysis_service.analyze_fraud_records.assert_called_once()
+        assert isinstance(results[0], RuntimeError)
+        assert [result.fraud_score for result in results[1:]] == [0.4, 0.4]
+        assert database_connection.get_fraud_record(accounts[0].account_id) is None
+
+    def test_get_account_next_actions__every_status__matches_the_state_graph(self, mocker):
+        mock_fraud_analysis_service = mocker.Mock(spec=FraudAnalysisService)
+        fraud_detection_service = FraudDetectionService(mock_fraud_analysis_service, DatabaseConnection())
+        for status in AccountStatusEnum:
+            account = Account(fraud_record=FraudRecordBuilder().build(), status=status)
+            next_states = AccountContext(account, mock_fraud_analysis_service).account_state.next_state_on_success()
+            assert fraud_detection_service.get_account_next_actions(account) == tuple(
+                state.__name__.removesuffix("AccountState").lower() for state in next_states
+            )
+        assert NEXT_ACTIONS[AccountStatusEnum.DECLINED] == ("reapply",)
+
+    def test_approve_many__mixed_statuses__approves_reviewed_and_rejects_the_rest(self, mocker):
+        database_connection = mocker.Mock(spec=DatabaseConnection)
+        reviewed = [
+            Account(fraud_record=FraudRecordBuilder().build(), status=AccountStatusEnum.REVIEWED) for _ in range(3)
+        ]
+        pending = Account(fraud_record=FraudRecordBuilder().build())
+        database_connection.get_many.return_value = {
+            account.account_id: account for account in [*reviewed, pending]
+        }
+        database_connection.compare_and_store_many.side_effect = lambda accounts, versions: set(accounts)
+        account_ids = [account.account_id for account in [*reviewed, pending]]
+        account_ids += ["acct_missing", reviewed[0].account_id]
+
+        result = FraudDetectionService(mocker.Mock(spec=FraudAnalysisService), database_connection).approve_many(
+            account_ids
+        )
+
+        assert [account.account_id for account in result.accounts] == account_ids[:3]
+        assert all(account.status is AccountStatusEnum.APPROVED for account in result.accounts)
+        assert all(account.version == 1 for account in result.accounts)
+        assert all(account.status is AccountStatusEnum.REVIEWED for account in reviewed)
+        assert result.rejected == {
+            pending.account_id: "Approve action is currently not available",
+            "acct_missing": "Unknown account: acct_missing",
+        }
+        database_connection.get_many.assert_called_once_with(account_ids[:5])
+        database_connection.compare_and_store_many.assert_called_once_with(
+            {account.account_id: account for account in result.accounts},
+            {account.account_id: 0 for account in reviewed},
+        )
+
+    def test_approve_many__concurrent_change__retries_only_the_conflicting_account(self, mocker):
+        database_connection = DatabaseConnection()
+        accounts = [
+            Account(fraud_record=FraudRecordBuilder().build(), status=AccountStatusEnum.REVIEWED) for _ in range(2)
+        ]
+        database_connection.put_many({account.account_id: account for account in accounts})
+        compare_and_store_many = database_connection.compare_and_store_many
+
+        def conflict_once(fraud_records, expected_versions):
+            # Another worker stores a new version of the first account before the first attempt lands
+            if len(fraud_records) == 2:
+                database_connection.store_fraud_record(
+                    accounts[0].account_id, dataclasses.replace(accounts[0], version=1)
+                )
+            return compare_and_store_many(fraud_records, expected_versions)
+
+        mocker.patch.object(database_connection, "compare_and_store_many", side_effect=conflict_once)
+        result = FraudDetectionService(mocker.Mock(spec=FraudAnalysisService), database_connection).approve_many(
+            [account.account_id for account in accounts]
+        )
+
+        assert [account.account_id for account in result.accounts] == [account.account_id for account in accounts]
+        assert [account.version for account in result.accounts] == [2, 1]
+        assert database_connection.compare_and_store_many.call_count == 2
+
+    def test_approve_fraud_record__concurrent_workers__every_account_is_approved_once(self, mocker):
+        database_connection = DatabaseConnection()
+        accounts = [
+            Account(fraud_record=FraudRecordBuilder().build(), status=AccountStatusEnum.REVIEWED) for _ in range(200)
+        ]
+        database_connection.put_many({account.account_id: account for account in accounts})
+        fraud_detection_service = FraudDetectionService(mocker.Mock(spec=FraudAnalysisService), database_connection)
+
+        def approve(account_id: str) -> str:
+            try:
+                return fraud_detection_service.approve_fraud_record(account_id).status
+            except AccountContextError:
+                return "rejected"
+
+        # Two workers race for every account, exactly one of them approves it
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            outcomes = list(executor.map(approve, [account.account_id for account in accounts] * 2))
+
+        assert outcomes.count(AccountStatusEnum.APPROVED) == 200
+        assert outcomes.count("rejected") == 200
+        stored = database_connection.get_many([account.account_id for account in accounts])
+        assert {(account.status, account.version) for account in stored.values()} == {(AccountStatusEnum.APPROVED, 1)}
+
+    def test_approve_fraud_record__version_keeps_changing__raises_concurrent_update_error(self, mocker):
+        database_connection = mocker.Mock(spec=DatabaseConnection)
+        account = Account(fraud_record=FraudRecordBuilder().build(), status=AccountStatusEnum.REVIEWED)
+        database_connection.get_fraud_record.return_value = account
+        database_connection.compare_and_store.return_value = False
+
+        with pytest.raises(ConcurrentUpdateError):
+            FraudDetectionService(mocker.Mock(spec=FraudAnalysisService), database_connection).approve_fraud_record(
+                account.account_id
+            )
+        assert database_connection.compare_and_store.call_count == MAX_UPDATE_ATTEMPTS
+        assert account.status is AccountStatusEnum.REVIEWED
+
+    def test_reapply_fraud_record__concurrent_change__analyzes_the_new_record_once(self, mocker):
+        mock_fraud_analysis_service = mocker.Mock(spec=FraudAnalysisService)
+        mock_fraud_analysis_service.analyze_fraud_record.return_value = {"IPAddressFraudAnalyzer": 0.4}
+        database_connection = DatabaseConnection()
+        declined = Account(fraud_record=FraudRecordBuilder().build(), status=AccountStatusEnum.DECLINED)
+        database_connection.store_fraud_record(declined.account_id, declined)
+        compare_and_store = database_connection.compare_and_store
+
+        def conflict_once(account_id, expected_version, fraud_record):
+            # Another worker stores a new version of the account before the first attempt lands
+            if database_connection.get_fraud_record(account_id).version == 0:
+                database_connection.store_fraud_record(account_id, dataclasses.replace(declined, version=1))
+            return compare_and_store(account_id, expected_version, fraud_record)
+
+        mocker.patch.object(database_connection, "compare_and_store", side_effect=conflict_once)
+        valid_record = build_valid_record()
+        reapplied = FraudDetectionService(mock_fraud_analysis_service, database_connection).reapply_fraud_record(
+            declined.account_id, valid_record
+        )
+
+        mock_fraud_analysis_service.analyze_fraud_record.assert_called_once_with(valid_record)
+        assert database_connection.compare_and_store.call_count == 2
+        assert (reapplied.status, reapplied.fraud_score, reapplied.version) == (AccountStatusEnum.REVIEWED, 0.4, 2)
+        assert reapplied.fraud_record is valid_record
+
+    @pytest.mark.parametrize("status", [AccountStatusEnum.APPROVED, AccountStatusEnum.PENDING])
+    def test_reapply_fraud_record__reapply_not_available__leaves_velocity_tracker_unchanged(self, status):
+        fraud_analysis_service = FraudAnalysisService()
+        database_connection = DatabaseConnection()
+        account = Account(fraud_record=build_valid_record(), status=status)
+        database_connection.store_fraud_record(account.account_id, account)
+        fraud_detection_service = FraudDetectionService(fraud_analysis_service, database_connection)
+
+        for _ in range(10):
+            with pytest.raises(AccountContextError, match="Reapply action is currently not available"):
+                fraud_detection_service.reapply_fraud_record(account.account_id, build_valid_record())
+        with pytest.raises(AccountContextError, match="Unknown account: acct_missing"):
+            fraud_detection_service.reapply_fraud_record("acct_missing", build_valid_record())
+
+        assert fraud_analysis_service.velocity_tracker.stats["keys"] == 0
+        assert database_connection.get_fraud_record(account.account_id) == account
+
+    def test_review_fraud_record__conflicting_store__analyzes_once_and_publishes_only_the_stored_change(self, mocker):
+        mock_fraud_analysis_service = mocker.Mock(spec=FraudAnalysisService)
+        mock_fraud_analysis_service.analyze_fraud_record.return_value = {"IPAddressFraudAnalyzer": 0.4}
+        database_connection = mocker.Mock(spec=DatabaseConnection)
+        database_connection.get_fraud_record.return_value = None
+        database_connection.compare_and_store.side_effect = [False, True]
+        event_bus = mocker.Mock(spec=EventBus, active=True)
+        account = Account(fraud_record=build_valid_record())
+
+        reviewed = FraudDetectionService(
+            mock_fraud_analysis_service, database_connection, event_bus=event_bus
+        ).review_fraud_record(account)
+
+        mock_fraud_analysis_service.analyze_fraud_record.assert_called_once_with(account.fraud_record)
+        database_connection.compare_and_store.assert_called_with(account.account_id, None, reviewed)
+        assert reviewed.status is AccountStatusEnum.REVIEWED
+        assert account.status is AccountStatusEnum.PENDING
+        assert event_bus.publish.call_count == 1
@@ -0,0 +1,57 @@
+from fraud_detection_system.fraud_analysis import FraudAnalysisService
+from fraud_detection_system.instrumentation import Instrumentation, LatencyHistogram, instrumentation
+from tests.fraud_detection_system.builder import FraudRecordBuilder
+
+
+class TestLatencyHistogram:
+    def test_snapshot__recorded_samples__returns_percentiles(self):
+        histogram = LatencyHistogram()
+        for elapsed in range(1, 101):
+            histogram.record(elapsed / 1000)
+        snapshot = histogram.snapshot()
+        assert snapshot["count"] == 100
+        assert snapshot["p50"] == 0.05
+        assert snapshot["p95"] == 0.095
+        assert snapshot["p99"] == 0.099
+        assert snapshot["max"] == 0.1
+
+    def test_record__more_samples_than_sample_size__keeps_exact_count(self):
+        histogram = LatencyHistogram(sample_size=10)
+        for elapsed in range(100):
+            histogram.record(float(elapsed))
+        snapshot = histogram.snapshot()
+        assert snapshot["count"] == 100
+        assert snapshot["p50"] >= 90.0
+
+
+class TestInstrumentation:
+    def test_span__disabled__records_nothing(self):
+        disabled = Instrumentation()
+        with disabled.span("analysis", "Noop"):
+            pass
+        assert disabled.span("analysis", "Noop") is disabled.span("handler", "Noop")
+        assert disabled.stats() == {}
+
+    def test_span__enabled__records_latency_and_calls_hooks(self, mocker):
+        enabled = Instrumentation(enabled=True)
+        hook = mocker.Mock()
+        enabled.add_hook(hook)
+        with enabled.span("analysis", "Fixed"):
+            pass
+        assert enabled.stats()["analysis.Fixed"]["count"] == 1
+        hook.assert_called_once()
+        assert hook.call_args.args[0] == "analysis.Fixed"
+
+    def test_span__enabled_for_pipeline__records_every_stage(self, mocker):
+        mocker.patch("fraud_detection_system.fraud_analysis.random.uniform", return_value=0.1)
+        instrumentation.enable()
+        try:
+            FraudAnalysisService().analyze_fraud_record(FraudRecordBuilder().build())
+            stats = instrumentation.stats()
+        finally:
+            instrumentation.disable()
+            instrumentation.reset()
+        assert stats["chain.sync"]["count"] == 1
+        assert stats["handler.EmailAnalysisHandler"]["count"] == 1
+        assert stats["analyzer.IPAddressFraudAnalyzer"]["count"] == 1
+        assert stats["analysis.GeoIPAddressFraudAnalysis"]["count"] == 1
@@ -0,0 +1,55 @@
+import pytest
+
+from fraud_detection_system.ip_index import IPPrefixIndex, IPPrefixIndexError
+
+
+NETWORKS = [
+    ("10.0.0.0/8", 0.1),
+    ("10.1.0.0/16", 0.5),
+    ("10.1.2.0/24", 0.9),
+    ("2001:db8::/32", 0.4),
+    ("2001:db8:1::/48", 0.8),
+]
+
+
+@pytest.fixture
+def ip_index(tmp_path):
+    csv_path = tmp_path / "networks.csv"
+    csv_path.write_text("network,score\n" + "".join(f"{network},{score}\n" for network, score in NETWORKS))
+    index_path = tmp_path / "networks.idx"
+    IPPrefixIndex.build_from_csv(str(csv_path), str(index_path))
+    index = IPPrefixIndex.load(str(index_path))
+    yield index
+    index.close()
+
+
+class TestIPPrefixIndex:
+    @pytest.mark.parametrize(
+        "ip_address, expected_score",
+        [
+            ("10.0.0.1", 0.1),
+            ("10.1.0.1", 0.5),
+            ("10.1.2.3", 0.9),
+            ("10.1.3.0", 0.5),
+            ("10.255.255.255", 0.1),
+            ("2001:db8::1", 0.4),
+            ("2001:db8:1::5", 0.8),
+            ("2001:db8:2::", 0.4),
+        ],
+    )
+    def test_score__address_in_nested_ranges__returns_most_specific_score(
+        self, ip_index, ip_address, expected_score
+    ):
+        assert ip_index.score(ip_address) == expected_score
+
+    @pytest.mark.parametrize("ip_address", ["9.255.255.255", "11.0.0.0", "::1"])
+    def test_score__address_outside_ranges__returns_none(self, ip_index, ip_address):
+        assert ip_index.score(ip_address) is None
+
+    def test_build__invalid_network__raise_ip_prefix_index_error(self):
+        with pytest.raises(IPPrefixIndexError):
+            IPPrefixIndex.build([("10.0.0.0/33", 0.1)])
+
+    def test_init__not_an_index__raise_ip_prefix_index_error(self):
+        with pytest.raises(IPPrefixIndexError):
+            IPPrefixIndex(b"not an index at all, just some bytes")
@@ -0,0 +1,149 @@
+import dataclasses
+import threading
+
+import pytest
+
+from fraud_detection_system.log_database import AppendOnlyLogDatabaseConnection
+from fraud_detection_system.models import Account, AccountStatusEnum, DeviceInfo
+from tests.fraud_detection_system.builder import FraudRecordBuilder
+
+
+@pytest.fixture
+def open_database(tmp_path):
+    databases = []
+
+    def open_database(**kwargs):
+        database = AppendOnlyLogDatabaseConnection(str(tmp_path), **kwargs)
+        databases.append(database)
+        return database
+
+    yield open_database
+    for database in databases:
+        database.close()
+
+
+class TestAppendOnlyLogDatabaseConnection:
+    def test_store_and_get_fraud_record__before_and_after_flush__returns_record(self, open_database):
+        database = open_database()
+        account = Account(fraud_record=FraudRecordBuilder().build())
+        database.store_fraud_record(account.account_id, account)
+        assert database.get_fraud_record(account.account_id) == account
+        database.sync()
+        assert database.get_fraud_record(account.account_id) == account
+        assert database.get_fraud_record("acct_missing") is None
+
+    def test_close_and_reopen__stored_records__recovers_latest_records(self, open_database):
+        database = open_database()
+        database.put_many({f"acct_{index}": FraudRecordBuilder().with_amount(index).build() for index in range(10)})
+        database.store_fraud_record("acct_3", FraudRecordBuilder().with_amount(300).build())
+        database.close()
+        reopened = open_database()
+        assert len(reopened) == 10
+        assert reopened.get_fraud_record("acct_3").amount == 300
+        assert reopened.get_many(["acct_0", "acct_9"]) == {
+            "acct_0": FraudRecordBuilder().with_amount(0).build(),
+            "acct_9": FraudRecordBuilder().with_amount(9).build(),
+        }
+
+    def test_snapshot__overwritten_records__compacts_and_recovers_from_snapshot(self, open_database, tmp_path):
+        database = open_database()
+        for amount in range(5):
+            database.store_fraud_record("acct_1", FraudRecordBuilder().with_amount(amount).build())
+        database.snapshot()
+        database.store_fraud_record("acct_2", FraudRecordBuilder().with_amount(20).build())
+        assert database.get_fraud_record("acct_1").amount == 4
+        database.close()
+        assert len(list(tmp_path.glob("snapshot-*.dat"))) == 1
+        reopened = open_database()
+        assert reopened.get_fraud_record("acct_1").amount == 4
+        assert reopened.get_fraud_record("acct_2").amount == 20
+
+    def test_snapshot__slow_background_snapshot__synchronous_commits_keep_going(
+        self, open_database, tmp_path, mocker
+    ):
+        database = open_database(synchronous_commit=True, snapshot_bytes=1)
+        snapshot_written, release = threading.Event(), threading.Event()
+
+        def block_snapshot():
+            snapshot_written.set()
+            release.wait(timeout=5)
+
+        mocker.patch.object(database, "_fsync_directory", side_effect=block_snapshot)
+        try:
+            # The first write is over snapshot_bytes, the snapshot thread takes over and stalls
+            database.store_fraud_record("acct_1", FraudRecordBuilder().build())
+            assert snapshot_written.wait(timeout=5)
+            committed = threading.Thread(
+                target=database.store_fraud_record, args=("acct_2", FraudRecordBuilder().with_amount(2).build())
+            )
+            committed.start()
+            committed.join(timeout=5)
+            assert not committed.is_alive()
+        finally:
+            release.set()
+        database.close()
+        assert len(list(tmp_path.glob("snapshot-*.dat"))) == 1
+        reopened = open_database()
+        assert reopened.get_fraud_record("acct_1") == FraudRecordBuilder().build()
+        assert reopened.get_fraud_record("acct_2").amount == 2
+
+    def test_reopen__torn_tail_record__drops_partial_record(self, open_database, tmp_path):
+        database = open_database()
+        database.store_fraud_record("acct_1", FraudRecordBuilder().build())
+        database.close()
+        segment_path = sorted(tmp_path.glob("segment-*.log"))[0]
+        with open(segment_path, "ab") as segment_file:
+            segment_file.write(b"\x40\x00\x00\x00torn")
+        reopened = open_database()
+        assert len(reopened) == 1
+        reopened.store_fraud_record("acct_2", FraudRecordBuilder().build())
+        assert reopened.get_fraud_record("acct_2") == FraudRecordBuilder().build()
+
+    def test_update_fraud_record__concurrent_synchronous_commits__applies_every_update(self, open_database):
+        database = open_database(synchronous_commit=True)
+        database.store_fraud_record("acct_counter", FraudRecordBuilder().with_amount(0).build())
+
+        def increment_amount(fraud_record):
+            fraud_record.amount += 1
+            return fraud_record
+
+        def worker():
+            for _ in range(50):
+                database.update_fraud_record("acct_counter", increment_amount)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert database.get_fraud_record("acct_counter").amount == 200
+
+    def test_find_by__replaced_and_recovered_records__returns_latest_matches(self, open_database):
+        database = open_database()
+        account = Account(fraud_record=FraudRecordBuilder().build())
+        database.store_fraud_record(account.account_id, account)
+        account.status = AccountStatusEnum.REVIEWED
+        account.fraud_record = FraudRecordBuilder().with_device_info(DeviceInfo(ip_address="10.0.0.2")).build()
+        database.store_fraud_record(account.account_id, account)
+        database.store_fraud_record("acct_record", FraudRecordBuilder().build())
+        database.close()
+        reopened = open_database()
+        assert reopened.find_by_ip("10.0.0.1").keys() == {"acct_record"}
+        assert reopened.find_by_ip("10.0.0.2") == {account.account_id: account}
+        assert reopened.find_by_status(AccountStatusEnum.REVIEWED).keys() == {account.account_id}
+        assert reopened.find_by_status(AccountStatusEnum.PENDING) == {}
+
+    def test_compare_and_store__queued_and_committed_versions__stores_only_on_match(self, open_database):
+        database = open_database()
+        account = Account(fraud_record=FraudRecordBuilder().build())
+        assert database.compare_and_store(account.account_id, None, account)
+        assert not database.compare_and_store(account.account_id, None, account)
+        database.sync()
+
+        updated = dataclasses.replace(account, version=1, status=AccountStatusEnum.REVIEWED)
+        assert not database.compare_and_store(account.account_id, 1, updated)
+        stored = database.compare_and_store_many({account.account_id: updated}, {account.account_id: 0})
+        assert stored == {account.account_id}
+        assert not database.compare_and_store(account.account_id, 0, updated)
+        database.sync()
+        assert database.get_fraud_record(account.account_id) == updated
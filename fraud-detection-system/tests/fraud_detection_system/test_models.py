@@ -0,0 +1,41 @@
+import dataclasses
+import uuid
+
+from fraud_detection_system.models import Account, AccountStatusEnum
+from tests.fraud_detection_system.builder import FraudRecordBuilder
+
+
+class TestAccount:
+    def test_init__no_account_id__packs_a_new_uuid(self):
+        account = Account(fraud_record=FraudRecordBuilder().build())
+        assert str(uuid.UUID(account.account_id)) == account.account_id
+        assert not hasattr(account, "__dict__")
+
+    def test_replace__changes__keeps_the_account_id(self):
+        account = Account(fraud_record=FraudRecordBuilder().build())
+        replaced = dataclasses.replace(account, version=1, status=AccountStatusEnum.REVIEWED)
+        assert replaced.account_id == account.account_id
+        assert (replaced.version, replaced.status) == (1, AccountStatusEnum.REVIEWED)
+
+    def test_replace__explicit_account_id__replaces_the_account_id(self):
+        account = Account(fraud_record=FraudRecordBuilder().build())
+        new_account_id = str(uuid.uuid4())
+        assert dataclasses.replace(account, account_id="acct_1").account_id == "acct_1"
+        assert dataclasses.replace(account, account_id=new_account_id).account_id == new_account_id
+
+    def test_asdict__account__returns_the_string_account_id(self):
+        fraud_record = FraudRecordBuilder().build()
+        account = Account(fraud_record=fraud_record, account_id="acct_1")
+        assert dataclasses.asdict(account) == {
+            "fraud_record": dataclasses.asdict(fraud_record),
+            "status": AccountStatusEnum.PENDING,
+            "fraud_score": 0.0,
+            "data_validation_errors": [],
+            "version": 0,
+            "account_id": "acct_1",
+        }
+
+    def test_eq__rebuilt_with_the_account_id__compares_equal(self):
+        fraud_record = FraudRecordBuilder().build()
+        account = Account(fraud_record=fraud_record)
+        assert Account(fraud_record=fraud_record, account_id=account.account_id) == account
@@ -0,0 +1,60 @@
+import pytest
+
+from fraud_detection_system.phone_index import (
+    PhoneNumberIndex,
+    PhoneNumberIndexError,
+    normalize_phone_number,
+)
+
+
+PHONE_NUMBERS = ["+15551234567", "(555) 123-4567", "+447700900123", "+12025550143", "not a number"]
+
+
+@pytest.fixture
+def phone_index(tmp_path):
+    csv_path = tmp_path / "spam.csv"
+    csv_path.write_text("phone_number\n" + "\n".join(f'"{number}"' for number in PHONE_NUMBERS) + "\n")
+    index_path = tmp_path / "spam.idx"
+    PhoneNumberIndex.build_from_csv(str(csv_path), str(index_path), chunk_size=2)
+    index = PhoneNumberIndex.load(str(index_path))
+    yield index
+    index.close()
+
+
+class TestNormalizePhoneNumber:
+    @pytest.mark.parametrize(
+        "phone_number, expected_number",
+        [
+            ("+1 (555) 123-4567", 15551234567),
+            ("555-123-4567", 15551234567),
+            ("+447700900123", 447700900123),
+            ("", None),
+            ("+1234567890123456", None),
+            ("+1 555 123 4567²", 15551234567),
+            ("٥٥٥", None),
+        ],
+    )
+    def test_normalize_phone_number__formatted_number__returns_e164_number(self, phone_number, expected_number):
+        assert normalize_phone_number(phone_number) == expected_number
+
+
+class TestPhoneNumberIndex:
+    def test_build_from_csv__duplicate_numbers_across_chunks__stores_unique_numbers(self, phone_index):
+        assert len(phone_index) == 3
+        assert list(phone_index._numbers) == [12025550143, 15551234567, 447700900123]
+
+    @pytest.mark.parametrize("phone_number", ["555 123 4567", "+44 7700 900123", "+1-202-555-0143"])
+    def test_contains__listed_number__returns_true(self, phone_index, phone_number):
+        assert phone_number in phone_index
+
+    @pytest.mark.parametrize("phone_number", ["+15551234568", "", "unknown"])
+    def test_contains__unlisted_number__returns_false(self, phone_index, phone_number):
+        assert phone_number not in phone_index
+
+    def test_contains_many__mixed_numbers__returns_results_in_input_order(self, phone_index):
+        results = phone_index.contains_many(["+447700900123", "+15550000000", "", "5551234567"])
+        assert results == [True, False, False, True]
+
+    def test_init__not_an_index__raise_phone_number_index_error(self):
+        with pytest.raises(PhoneNumberIndexError):
+            PhoneNumberIndex(b"this is not a phone number index")
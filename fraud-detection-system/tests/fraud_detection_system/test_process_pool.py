@@ -0,0 +1,108 @@
+import pytest
+
+from fraud_detection_system.domain_index import DomainSet
+from fraud_detection_system.fraud_analysis import (
+    DarkWebEmailDomainFraudAnalysis,
+    FraudAnalysisService,
+    FreeEmailDomainFraudAnalysis,
+    GeoIPAddressFraudAnalysis,
+    IPAddressRecordFraudAnalysis,
+    SpamRecordPhoneNumberFraudAnalysis,
+    VelocityFraudAnalysis,
+)
+from fraud_detection_system.ip_index import IPPrefixIndex
+from fraud_detection_system.models import DeviceInfo, PersonalInfo
+from fraud_detection_system.phone_index import PhoneNumberIndex
+from fraud_detection_system.process_pool import (
+    ProcessPoolError,
+    ProcessPoolFraudAnalysisService,
+    load_reference_data,
+)
+from tests.fraud_detection_system.builder import FraudRecordBuilder
+
+
+@pytest.fixture(scope="module")
+def reference_data(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("reference_data")
+    indexes = {
+        IPAddressRecordFraudAnalysis: ("ip.idx", IPPrefixIndex.build([("10.0.0.0/8", 0.2), ("10.0.1.0/24", 0.9)])),
+        GeoIPAddressFraudAnalysis: ("geo.idx", IPPrefixIndex.build([("10.0.0.0/8", 0.1)])),
+        FreeEmailDomainFraudAnalysis: ("free.set", DomainSet.build(["example.com"])),
+        DarkWebEmailDomainFraudAnalysis: ("dark_web.set", DomainSet.build(["evil.com"])),
+        SpamRecordPhoneNumberFraudAnalysis: ("spam.idx", PhoneNumberIndex.build(["+12345678900"])),
+    }
+    reference_data = {}
+    for analysis_cls, (name, data) in indexes.items():
+        (directory / name).write_bytes(data)
+        reference_data[analysis_cls] = str(directory / name)
+    return reference_data
+
+
+@pytest.fixture(scope="module")
+def process_pool_service(reference_data):
+    with ProcessPoolFraudAnalysisService(processes=2, chunk_size=7, reference_data=reference_data) as service:
+        yield service
+
+
+def build_fraud_records(count: int) -> list:
+    # Every fifth record repeats one SSN, so velocity short-circuits some of them
+    return [
+        FraudRecordBuilder()
+        .with_device_info(DeviceInfo(ip_address=f"10.0.{index % 3}.{index % 250}"))
+        .with_personal_info(
+            PersonalInfo(
+                name="John Doe",
+                age=30,
+                ssn="123-45-6789" if index % 5 == 0 else f"{index:03d}-45-6789",
+                email="jdoe@example.com" if index % 2 else "jdoe@evil.com",
+                phone_number="+12345678900" if index % 3 == 0 else "+12345678901",
+            )
+        )
+        .build()
+        for index in range(count)
+    ]
+
+
+class TestProcessPoolFraudAnalysisService:
+    def test_analyze_fraud_records__several_chunks__matches_in_process_analysis_in_input_order(
+        self, process_pool_service, reference_data, monkeypatch
+    ):
+        fraud_records = build_fraud_records(100)
+        analyses = process_pool_service.analyze_fraud_records(fraud_records)
+
+        # The in-process reference run loads the same indexes, patched so they are restored afterwards
+        with monkeypatch.context() as patch:
+            for analysis_cls, attribute in (
+                (IPAddressRecordFraudAnalysis, "ip_index"),
+                (GeoIPAddressFraudAnalysis, "ip_index"),
+                (FreeEmailDomainFraudAnalysis, "domain_set"),
+                (DarkWebEmailDomainFraudAnalysis, "domain_set"),
+                (SpamRecordPhoneNumberFraudAnalysis, "phone_index"),
+            ):
+                patch.setattr(analysis_cls, attribute, getattr(analysis_cls, attribute))
+            load_reference_data(reference_data)
+            expected = FraudAnalysisService().analyze_fraud_records(fraud_records)
+
+        assert analyses == expected
+        assert any("EmailDomainFraudAnalyzer" not in analysis for analysis in analyses)
+        assert process_pool_service.analyze_fraud_records([]) == []
+
+    def test_analyze_fraud_record__counts_velocity_in_the_parent_tracker(self, process_pool_service):
+        fraud_record = (
+            FraudRecordBuilder()
+            .with_device_info(DeviceInfo(ip_address="10.9.9.9"))
+            .with_personal_info(
+                PersonalInfo(
+                    name="Jane Doe", age=40, ssn="999-99-9999", email="jane@example.com", phone_number="+12345678901"
+                )
+            )
+            .build()
+        )
+        first = process_pool_service.analyze_fraud_record(fraud_record)
+        second = process_pool_service.analyze_fraud_record(fraud_record)
+        assert second["VelocityFraudAnalyzer"] > first["VelocityFraudAnalyzer"]
+        assert process_pool_service.velocity_tracker.stats["keys"] > 0
+
+    def test_load_reference_data__analysis_without_reference_data__raises_process_pool_error(self):
+        with pytest.raises(ProcessPoolError):
+            load_reference_data({VelocityFraudAnalysis: "velocity.idx"})
@@ -0,0 +1,126 @@
+import json
+import math
+
+import pytest
+
+from fraud_detection_system import risk_model
+from fraud_detection_system.database import DatabaseConnection
+from fraud_detection_system.fraud_analysis import FraudAnalysisService
+from fraud_detection_system.fraud_detection_service import FraudDetectionService
+from fraud_detection_system.models import Account, PersonalInfo
+from fraud_detection_system.risk_model import (
+    FeatureMatrix,
+    LogisticRiskModel,
+    MeanRiskModel,
+    RiskModelError,
+    WeightedRiskModel,
+    load_risk_model,
+)
+from tests.fraud_detection_system.builder import FraudRecordBuilder
+
+
+FEATURES = (
+    "IPAddressFraudAnalyzer",
+    "VelocityFraudAnalyzer",
+    "EmailDomainFraudAnalyzer",
+    "PhoneNumberFraudAnalyzer",
+)
+ANALYSES = [
+    {
+        "IPAddressFraudAnalyzer": 0.2,
+        "VelocityFraudAnalyzer": 0.0,
+        "EmailDomainFraudAnalyzer": 0.6,
+        "PhoneNumberFraudAnalyzer": 1.0,
+    },
+    {"IPAddressFraudAnalyzer": 0.4, "VelocityFraudAnalyzer": 0.9},
+    {"IPAddressFraudAnalyzer": 0.1, "UnknownAnalyzer": 1.0},
+]
+
+
+@pytest.fixture(params=["default", "pure_python"])
+def backend(request, monkeypatch):
+    # Runs with NumPy when it is installed, and always with the pure Python fallback
+    if request.param == "pure_python":
+        monkeypatch.setattr(risk_model, "numpy", None)
+    return request.param
+
+
+class TestFeatureMatrix:
+    def test_from_analyses__missing_and_unknown_analyzers__fills_missing_slots_with_nan(self):
+        matrix = FeatureMatrix.from_analyses(ANALYSES, FEATURES)
+        assert len(matrix) == 3
+        rows = matrix.rows()
+        assert rows[0] == [0.2, 0.0, 0.6, 1.0]
+        assert rows[1][:2] == [0.4, 0.9] and all(math.isnan(value) for value in rows[1][2:])
+        assert rows[2][0] == 0.1 and all(math.isnan(value) for value in rows[2][1:])
+
+
+class TestRiskModels:
+    def test_mean_risk_model__analyses__averages_present_scores_and_takes_the_max_with_velocity(self):
+        assert MeanRiskModel().score_many([*ANALYSES, {}]) == pytest.approx([0.6, 0.9, 0.55, 0.0])
+
+    def test_mean_risk_model__no_velocity__keeps_the_score_of_the_other_analyzers(self):
+        # A quiet velocity check used to count as a 0.0 in the mean, 0.8 came out as 0.6
+        analysis = dict.fromkeys(
+            ("IPAddressFraudAnalyzer", "EmailDomainFraudAnalyzer", "PhoneNumberFraudAnalyzer"), 0.8
+        )
+        assert MeanRiskModel().score({**analysis, "VelocityFraudAnalyzer": 0.0}) == pytest.approx(0.8)
+        assert MeanRiskModel(max_features=()).score({**analysis, "VelocityFraudAnalyzer": 0.0}) == pytest.approx(0.6)
+        assert MeanRiskModel().score({"VelocityFraudAnalyzer": 0.7}) == pytest.approx(0.7)
+
+    def test_weighted_risk_model__equal_weights__matches_mean_of_known_analyzers(self, backend):
+        model = WeightedRiskModel(dict.fromkeys(FEATURES, 1.0))
+        assert model.score_many(ANALYSES) == pytest.approx([0.45, 0.65, 0.1])
+
+    def test_weighted_risk_model__weights_and_bias__returns_clipped_weighted_mean(self, backend):
+        model = WeightedRiskModel(dict(zip(FEATURES, (1.0, 3.0, 0.0, 0.0))), bias=0.5)
+        assert model.score_many(ANALYSES) == pytest.approx([0.55, 1.0, 0.6])
+        assert model.score_many([{"UnknownAnalyzer": 1.0}]) == [0.5]
+
+    def test_logistic_risk_model__weights_and_bias__returns_sigmoid_of_weighted_sum(self, backend):
+        model = LogisticRiskModel(dict(zip(FEATURES, (2.0, 4.0, 1.0, 1.0))), bias=-3.0)
+        expected = [1 / (1 + math.exp(-logit)) for logit in (-3.0 + 0.4 + 0.6 + 1.0, -3.0 + 0.8 + 3.6, -3.0 + 0.2)]
+        assert model.score_many(ANALYSES) == pytest.approx(expected)
+        assert model.score({"IPAddressFraudAnalyzer": -1000.0}) == pytest.approx(0.0)
+
+    def test_weighted_risk_model__negative_weight__raises_risk_model_error(self):
+        with pytest.raises(RiskModelError):
+            WeightedRiskModel({"IPAddressFraudAnalyzer": -1.0})
+
+
+class TestLoadRiskModel:
+    def test_load_risk_model__logistic_weights_file__returns_logistic_model(self, tmp_path):
+        path = tmp_path / "risk_model.json"
+        path.write_text(json.dumps({"model": "logistic", "bias": -2.0, "weights": {"IPAddressFraudAnalyzer": 3.0}}))
+        model = load_risk_model(str(path))
+        assert isinstance(model, LogisticRiskModel)
+        assert model.weights == {"IPAddressFraudAnalyzer": 3.0}
+        assert model.bias == -2.0
+
+    @pytest.mark.parametrize(
+        "content",
+        ["not json", json.dumps({"model": "forest"}), json.dumps({"model": "weighted", "weights": {"a": "high"}})],
+    )
+    def test_load_risk_model__invalid_file__raises_risk_model_error(self, tmp_path, content):
+        path = tmp_path / "risk_model.json"
+        path.write_text(content)
+        with pytest.raises(RiskModelError):
+            load_risk_model(str(path))
+
+
+class TestFraudDetectionServiceRiskModel:
+    def test_review__weighted_risk_model__scores_single_and_batched_reviews_with_the_model(self, mocker):
+        mocker.patch("fraud_detection_system.fraud_analysis.random.uniform", return_value=0.5)
+        model = WeightedRiskModel({"IPAddressFraudAnalyzer": 1.0, "VelocityFraudAnalyzer": 1.0})
+        service = FraudDetectionService(FraudAnalysisService(), DatabaseConnection(), risk_model=model)
+        fraud_record = FraudRecordBuilder().with_personal_info(
+            PersonalInfo(
+                name="John Doe", age=30, ssn="123-45-6789", email="jdoe@example.com", phone_number="+12345678900"
+            )
+        ).build()
+        # IP scores 0.5, velocity 0.0 for the first application and 1/3 for the second
+        assert service.review_fraud_record(Account(fraud_record=fraud_record)).fraud_score == 0.25
+        reviewed = service.review_fraud_records(
+            [Account(fraud_record=fraud_record), Account(fraud_record=FraudRecordBuilder().build())]
+        )
+        assert [account.fraud_score for account in reviewed] == [0.42, 0.0]
@@ -0,0 +1,236 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from fraud_detection_system.database import DatabaseConnection
+from fraud_detection_system.fraud_analysis import FraudAnalysisService
+from fraud_detection_system.fraud_detection_service import FraudDetectionService
+from fraud_detection_system.server import FraudReviewServer, MicroBatcher
+
+
+RECORD = {
+    "amount": 100.0,
+    "personal_info": {
+        "name": "John Doe",
+        "age": 30,
+        "ssn": "123-45-6789",
+        "email": "jdoe@example.com",
+        "phone_number": "+12345678900",
+    },
+    "device_info": {"ip_address": "10.0.0.1"},
+    "payment_method": "ACH",
+    "bank_account": {"routing_number": 111000025, "account_number": 123456789},
+}
+
+
+@pytest.fixture(autouse=True)
+def low_fraud_scores(mocker):
+    mocker.patch("fraud_detection_system.fraud_analysis.random.uniform", return_value=0.1)
+
+
+async def exchange(port: int, requests: list[dict]) -> dict:
+    # Pipelines every request on one connection, returns the responses by id
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"".join(json.dumps(request).encode() + b"\n" for request in requests))
+    await writer.drain()
+    responses = [json.loads(await reader.readline()) for _ in requests]
+    writer.close()
+    await writer.wait_closed()
+    return {response.get("id"): response for response in responses}
+
+
+class TestMicroBatcher:
+    def test_submit__concurrent_items__scores_them_in_batches_of_max_batch_size(self):
+        batch_sizes = []
+
+        def process_batch(items):
+            batch_sizes.append(len(items))
+            return [item * 2 for item in items]
+
+        async def submit_all():
+            batcher = MicroBatcher(process_batch, max_batch_size=4, max_wait=1.0)
+            batcher.start()
+            try:
+                return await asyncio.gather(*(batcher.submit(item) for item in range(10)))
+            finally:
+                await batcher.stop()
+
+        assert asyncio.run(submit_all()) == [item * 2 for item in range(10)]
+        assert batch_sizes == [4, 4, 2]
+
+    def test_submit__full_queue__blocks_until_the_batcher_catches_up(self):
+        release = threading.Event()
+
+        def process_batch(items):
+            release.wait(5)
+            return items
+
+        async def submit_all():
+            batcher = MicroBatcher(process_batch, max_batch_size=1, max_wait=0, max_queue=2)
+            batcher.start()
+            try:
+                tasks = [asyncio.create_task(batcher.submit(item)) for item in range(4)]
+                await asyncio.sleep(0.05)
+                # One item is being scored, two fill the queue and the last one waits to enter it
+                assert batcher.stats["queued"] == 2
+                assert not any(task.done() for task in tasks)
+                release.set()
+                return await asyncio.gather(*tasks)
+            finally:
+                release.set()
+                await batcher.stop()
+
+        assert asyncio.run(submit_all()) == [0, 1, 2, 3]
+
+    def test_submit__exception_result__fails_only_its_item(self):
+        def process_batch(items):
+            return [ValueError("negative item") if item < 0 else item * 2 for item in items]
+
+        async def submit_all():
+            batcher = MicroBatcher(process_batch, max_batch_size=3, max_wait=1.0)
+            batcher.start()
+            try:
+                return await asyncio.gather(*(batcher.submit(item) for item in (1, -1, 2)), return_exceptions=True)
+            finally:
+                await batcher.stop()
+
+        first, failed, second = asyncio.run(submit_all())
+        assert (first, second) == (2, 4)
+        assert isinstance(failed, ValueError)
+
+    def test_submit__failing_batch__fails_every_item_without_processing_it_again(self):
+        batch_sizes = []
+
+        def process_batch(items):
+            batch_sizes.append(len(items))
+            raise RuntimeError("store unavailable")
+
+        async def submit_all():
+            batcher = MicroBatcher(process_batch, max_batch_size=3, max_wait=1.0)
+            batcher.start()
+            try:
+                return await asyncio.gather(*(batcher.submit(item) for item in (1, 2, 3)), return_exceptions=True)
+            finally:
+                await batcher.stop()
+
+        assert all(isinstance(result, RuntimeError) for result in asyncio.run(submit_all()))
+        assert batch_sizes == [3]
+
+
+class TestFraudReviewServer:
+    def test_handle_connection__review_then_approve__returns_account_and_next_actions(self):
+        async def run():
+            server = FraudReviewServer(
+                FraudDetectionService(
+                    fraud_analysis_service=FraudAnalysisService(), database_connection=DatabaseConnection()
+                ),
+                max_wait=0.01,
+            )
+            await server.start("127.0.0.1", 0)
+            try:
+                reviews = await exchange(
+                    server.port, [{"id": index, "action": "review", "record": RECORD} for index in range(20)]
+                )
+                account_id = reviews[0]["account"]["account_id"]
+                responses = await exchange(
+                    server.port,
+                    [
+                        {"id": "actions", "action": "next_actions", "account_id": account_id},
+                        {"id": "unknown", "action": "approve", "account_id": "acct_missing"},
+                        {"id": "invalid", "action": "review", "record": {"amount": 1}},
+                        {"id": "action", "action": "close", "account_id": account_id},
+                    ],
+                )
+                approved = await exchange(server.port, [{"id": 1, "action": "approve", "account_id": account_id}])
+                declined = await exchange(
+                    server.port,
+                    [
+                        {
+                            "id": 1,
+                            "action": "decline_many",
+                            "account_ids": [reviews[1]["account"]["account_id"], account_id, "acct_missing"],
+                        }
+                    ],
+                )
+                return reviews, responses, approved, declined, server.batcher.stats
+            finally:
+                await server.close()
+
+        reviews, responses, approved, declined, stats = asyncio.run(run())
+        assert sorted(reviews) == list(range(20))
+        assert all(response["ok"] for response in reviews.values())
+        assert reviews[0]["account"]["status"] == "reviewed"
+        assert reviews[0]["account"]["validation_errors"] == []
+        assert stats["batches"] < 20
+        assert responses["actions"] == {"id": "actions", "ok": True, "next_actions": ["approve", "decline", "reapply"]}
+        assert responses["unknown"] == {"id": "unknown", "ok": False, "error": "Unknown account: acct_missing"}
+        assert not responses["invalid"]["ok"]
+        assert responses["action"] == {"id": "action", "ok": False, "error": "Unknown action: 'close'"}
+        assert approved[1]["account"]["status"] == "approved"
+        assert [account["status"] for account in declined[1]["accounts"]] == ["declined"]
+        assert declined[1]["rejected"] == {
+            reviews[0]["account"]["account_id"]: "Decline action is currently not available",
+            "acct_missing": "Unknown account: acct_missing",
+        }
+
+    def test_handle_connection__bad_records_among_concurrent_reviews__fail_only_their_requests(self):
+        async def run():
+            server = FraudReviewServer(
+                FraudDetectionService(
+                    fraud_analysis_service=FraudAnalysisService(), database_connection=DatabaseConnection()
+                ),
+                max_wait=0.05,
+            )
+            await server.start("127.0.0.1", 0)
+            try:
+                bad_record = {**RECORD, "personal_info": {**RECORD["personal_info"], "age": "x"}}
+                return await asyncio.wait_for(
+                    asyncio.gather(
+                        exchange(server.port, [{"id": 1, "action": "review", "record": RECORD}]),
+                        exchange(server.port, [{"id": 2, "action": "review", "record": bad_record}]),
+                        exchange(server.port, [{"id": 3, "action": "review", "record": RECORD}]),
+                    ),
+                    timeout=5,
+                )
+            finally:
+                await server.close()
+
+        first, bad, third = asyncio.run(run())
+        assert first[1]["ok"] and third[3]["ok"]
+        assert not bad[2]["ok"]
+        assert "age" in bad[2]["error"]
+
+    def test_handle_connection__store_fails_once__reviews_every_record_once(self, mocker):
+        database_connection = DatabaseConnection()
+        fraud_analysis_service = FraudAnalysisService()
+        mocker.patch.object(database_connection, "compare_and_store_many", side_effect=RuntimeError("disk full"))
+
+        async def run():
+            server = FraudReviewServer(
+                FraudDetectionService(
+                    fraud_analysis_service=fraud_analysis_service, database_connection=database_connection
+                ),
+                max_batch_size=8,
+                max_wait=1.0,
+            )
+            await server.start("127.0.0.1", 0)
+            try:
+                return await exchange(
+                    server.port, [{"id": index, "action": "review", "record": RECORD} for index in range(8)]
+                )
+            finally:
+                await server.close()
+
+        reviews = asyncio.run(run())
+        assert all(response["ok"] for response in reviews.values())
+        assert fraud_analysis_service.velocity_tracker.counts(("ssn", "123-45-6789")) == (8, 8, 8)
+
+    def test_handle_request__unexpected_exception__returns_error_response(self, mocker):
+        async def run():
+            server = FraudReviewServer(FraudDetectionService(database_connection=DatabaseConnection()))
+            mocker.patch.object(server, "_dispatch", side_effect=RuntimeError("boom"))
+            return await server.handle_request({"action": "review"})
+
+        assert asyncio.run(run()) == {"ok": False, "error": "Internal error: RuntimeError('boom')"}
@@ -0,0 +1,195 @@
+import dataclasses
+import sqlite3
+import threading
+
+import pytest
+
+from fraud_detection_system.codec import CodecError
+from fraud_detection_system.fraud_detection_service import FraudDetectionService
+from fraud_detection_system.models import Account, AccountStatusEnum, DeviceInfo, PersonalInfo
+from fraud_detection_system.sqlite_database import SQLiteDatabaseConnection
+from tests.fraud_detection_system.builder import FraudRecordBuilder
+
+
+@pytest.fixture
+def database_path(tmp_path):
+    return str(tmp_path / "accounts.db")
+
+
+@pytest.fixture
+def database(database_path):
+    database = SQLiteDatabaseConnection(database_path)
+    yield database
+    database.close()
+
+
+class TestSQLiteDatabaseConnection:
+    def test_store_and_get_fraud_record__before_and_after_sync__returns_record(self, database):
+        account = Account(fraud_record=FraudRecordBuilder().build())
+        database.store_fraud_record(account.account_id, account)
+        assert database.get_fraud_record(account.account_id) == account
+        database.sync()
+        assert database.get_fraud_record(account.account_id) == account
+        assert database.get_fraud_record("acct_missing") is None
+
+    def test_put_many_and_get_many__committed_and_queued_records__returns_all_records(self, database):
+        committed = {f"acct_{index}": FraudRecordBuilder().with_amount(index).build() for index in range(600)}
+        database.put_many(committed)
+        database.sync()
+        database.store_fraud_record("acct_queued", FraudRecordBuilder().build())
+        retrieved = database.get_many([*committed, "acct_queued", "acct_missing"])
+        assert retrieved == {**committed, "acct_queued": FraudRecordBuilder().build()}
+
+    def test_close_and_reopen__stored_accounts__persists_status_and_fraud_score_columns(self, database_path):
+        database = SQLiteDatabaseConnection(database_path)
+        account = Account(
+            fraud_record=FraudRecordBuilder().build(), status=AccountStatusEnum.REVIEWED, fraud_score=0.42
+        )
+        database.store_fraud_record(account.account_id, account)
+        database.close()
+        reopened = SQLiteDatabaseConnection(database_path)
+        try:
+            assert reopened.get_fraud_record(account.account_id) == account
+        finally:
+            reopened.close()
+        with sqlite3.connect(database_path) as connection:
+            rows = connection.execute("SELECT status, fraud_score FROM accounts").fetchall()
+        assert rows == [("reviewed", 0.42)]
+
+    def test_find_by__queued_and_replaced_records__returns_latest_matches(self, database):
+        account = Account(fraud_record=FraudRecordBuilder().build())
+        database.store_fraud_record(account.account_id, account)
+        database.sync()
+        account.status = AccountStatusEnum.REVIEWED
+        account.fraud_record = FraudRecordBuilder().with_device_info(DeviceInfo(ip_address="10.0.0.2")).build()
+        database.store_fraud_record(account.account_id, account)
+        database.store_fraud_record("acct_record", FraudRecordBuilder().build())
+        assert database.find_by_ip("10.0.0.1").keys() == {"acct_record"}
+        assert database.find_by_ip("10.0.0.2") == {account.account_id: account}
+        assert database.find_by_ssn("123-45-6789").keys() == {account.account_id, "acct_record"}
+        assert database.find_by_status(AccountStatusEnum.REVIEWED).keys() == {account.account_id}
+
+    def test_update_fraud_record__concurrent_updates__applies_every_update(self, database):
+        database.store_fraud_record("acct_counter", FraudRecordBuilder().with_amount(0).build())
+
+        def increment_amount(fraud_record):
+            fraud_record.amount += 1
+            return fraud_record
+
+        def worker():
+            for _ in range(500):
+                database.update_fraud_record("acct_counter", increment_amount)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        database.sync()
+        assert database.get_fraud_record("acct_counter").amount == 2000
+
+    def test_fraud_detection_service__sqlite_database__approves_reviewed_account(self, database, mocker):
+        mocker.patch("fraud_detection_system.fraud_analysis.random.uniform", return_value=0.1)
+        fraud_detection_service = FraudDetectionService(database_connection=database)
+        account = fraud_detection_service.review_fraud_record(Account(fraud_record=FraudRecordBuilder().build()))
+        database.sync()
+        approved = fraud_detection_service.approve_fraud_record(account.account_id)
+        assert approved.status is AccountStatusEnum.APPROVED
+
+    def test_compare_and_store__queued_and_committed_versions__stores_only_on_match(self, database):
+        account = Account(fraud_record=FraudRecordBuilder().build())
+        assert database.compare_and_store(account.account_id, None, account)
+        assert not database.compare_and_store(account.account_id, None, account)
+        database.sync()
+
+        updated = dataclasses.replace(account, version=1, status=AccountStatusEnum.REVIEWED)
+        assert not database.compare_and_store(account.account_id, 1, updated)
+        stored = database.compare_and_store_many({account.account_id: updated}, {account.account_id: 0})
+        assert stored == {account.account_id}
+        assert not database.compare_and_store(account.account_id, 0, updated)
+        database.sync()
+        assert database.get_fraud_record(account.account_id) == updated
+
+    def test_store_fraud_record__unencodable_record__fails_the_write_only(self, database):
+        fraud_record = FraudRecordBuilder().with_personal_info(PersonalInfo(name="John", age="30", ssn="1")).build()
+        with pytest.raises(CodecError):
+            database.store_fraud_record("acct_invalid", fraud_record)
+        database.store_fraud_record("acct_valid", FraudRecordBuilder().build())
+        database.sync()
+        assert database.get_fraud_record("acct_invalid") is None
+        assert database.get_fraud_record("acct_valid") == FraudRecordBuilder().build()
+
+    def test_sync__failed_commit__requeues_records_and_raises_until_committed(self, database, database_path, mocker):
+        mocker.patch("fraud_detection_system.sqlite_database.UPSERT_ACCOUNT", "INSERT INTO missing VALUES (?)")
+        database.store_fraud_record("acct_retried", FraudRecordBuilder().build())
+        with pytest.raises(sqlite3.OperationalError):
+            database.sync()
+        assert database.get_fraud_record("acct_retried") == FraudRecordBuilder().build()
+
+        mocker.stopall()
+        database.sync()
+        with sqlite3.connect(database_path) as connection:
+            assert connection.execute("SELECT account_id FROM accounts").fetchall() == [("acct_retried",)]
+
+    def test_close__failed_last_commit__raises(self, database, mocker):
+        mocker.patch("fraud_detection_system.sqlite_database.UPSERT_ACCOUNT", "INSERT INTO missing VALUES (?)")
+        database.store_fraud_record("acct_lost", FraudRecordBuilder().build())
+        with pytest.raises(sqlite3.OperationalError):
+            database.close()
+
+    def test_sync__failing_record__commits_the_chunks_before_it(self, database_path):
+        database = SQLiteDatabaseConnection(database_path, flush_batch_size=2)
+        with sqlite3.connect(database_path) as connection:
+            connection.execute(
+                "CREATE TRIGGER reject_acct_4 BEFORE INSERT ON accounts WHEN NEW.account_id = 'acct_4' "
+                "BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+            )
+        fraud_records = {f"acct_{index}": FraudRecordBuilder().with_amount(index).build() for index in range(6)}
+        database.put_many(fraud_records)
+        with pytest.raises(sqlite3.IntegrityError):
+            database.sync()
+        with sqlite3.connect(database_path) as connection:
+            committed = {account_id for account_id, in connection.execute("SELECT account_id FROM accounts")}
+        assert committed == {"acct_0", "acct_1", "acct_2", "acct_3"}
+        assert database.get_many(fraud_records) == fraud_records
+        with pytest.raises(sqlite3.IntegrityError):
+            database.close()
+
+    def test_store_fraud_record__full_queue_and_failing_commits__raises_instead_of_queueing(
+        self, database_path, mocker
+    ):
+        database = SQLiteDatabaseConnection(database_path, flush_interval=60, max_pending=3)
+        mocker.patch("fraud_detection_system.sqlite_database.UPSERT_ACCOUNT", "INSERT INTO missing VALUES (?)")
+        for index in range(3):
+            database.store_fraud_record(f"acct_{index}", FraudRecordBuilder().build())
+        with pytest.raises(sqlite3.OperationalError):
+            database.sync()
+        with pytest.raises(sqlite3.OperationalError):
+            database.store_fraud_record("acct_3", FraudRecordBuilder().build())
+        assert database.get_fraud_record("acct_3") is None
+
+        mocker.stopall()
+        database.sync()
+        database.store_fraud_record("acct_3", FraudRecordBuilder().build())
+        database.close()
+        with sqlite3.connect(database_path) as connection:
+            assert connection.execute("SELECT COUNT(*) FROM accounts").fetchone() == (4,)
+
+    def test_store_fraud_record__many_writers__never_queue_more_than_max_pending(self, database_path):
+        database = SQLiteDatabaseConnection(database_path, flush_batch_size=5, max_pending=20)
+        queue_sizes = []
+
+        def worker(worker_index):
+            for index in range(200):
+                database.store_fraud_record(f"acct_{worker_index}_{index}", FraudRecordBuilder().build())
+                queue_sizes.append(len(database._pending))
+
+        threads = [threading.Thread(target=worker, args=(worker_index,)) for worker_index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        database.close()
+        assert max(queue_sizes) <= 20
+        with sqlite3.connect(database_path) as connection:
+            assert connection.execute("SELECT COUNT(*) FROM accounts").fetchone() == (800,)
@@ -0,0 +1,20 @@
+from fraud_detection_system.validators import (
+    PersonalInfoDataValidator,
+    PersonalInfoDataValidation,
+)
+from tests.fraud_detection_system.builder import FraudRecordBuilder
+
+
+class TestDataValidator:
+    def test_validate__multiple_records__reuses_created_validation(self, mocker):
+        create_validator = mocker.spy(PersonalInfoDataValidator, "create_validator")
+        validator = PersonalInfoDataValidator()
+        validator.validate(FraudRecordBuilder().build())
+        validator.validate(FraudRecordBuilder().build())
+        assert create_validator.call_count == 1
+
+
+class TestPersonalInfoDataValidation:
+    def test_validate__invalid_phone_number__returns_phone_number_error(self):
+        errors = PersonalInfoDataValidation().validate(FraudRecordBuilder().build())
+        assert [str(error) for error in errors] == ["Invalid phone number format"]
@@ -0,0 +1,45 @@
+from fraud_detection_system.velocity import VelocityTracker, VelocityWindow
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+WINDOWS = (VelocityWindow("1m", 60, limit=3), VelocityWindow("1h", 60 * 60, limit=10))
+
+
+class TestVelocityTracker:
+    def test_record__repeated_key__counts_events_per_window(self):
+        tracker = VelocityTracker(WINDOWS, clock=FakeClock())
+        assert tracker.record("10.0.0.1") == (1, 1)
+        assert tracker.record("10.0.0.1") == (2, 2)
+        assert tracker.record("10.0.0.2") == (1, 1)
+        assert tracker.counts("10.0.0.1") == (2, 2)
+        assert tracker.counts("10.0.0.3") == (0, 0)
+
+    def test_record__time_passes__drops_events_outside_window(self):
+        clock = FakeClock()
+        tracker = VelocityTracker(WINDOWS, clock=clock)
+        tracker.record("10.0.0.1")
+        clock.now = 30.0
+        tracker.record("10.0.0.1")
+        clock.now = 65.0
+        assert tracker.counts("10.0.0.1") == (1, 2)
+        clock.now = 95.0
+        assert tracker.counts("10.0.0.1") == (0, 2)
+        clock.now = 2 * 60 * 60
+        assert tracker.record("10.0.0.1") == (1, 1)
+
+    def test_record__more_keys_than_max_keys__evicts_least_recently_seen_key(self):
+        tracker = VelocityTracker(WINDOWS, max_keys=2, clock=FakeClock())
+        tracker.record("10.0.0.1")
+        tracker.record("10.0.0.2")
+        tracker.record("10.0.0.1")
+        tracker.record("10.0.0.3")
+        assert tracker.counts("10.0.0.1") == (2, 2)
+        assert tracker.counts("10.0.0.2") == (0, 0)
+        assert tracker.stats == {"keys": 2, "evictions": 1}